@@ -206,6 +206,12 @@ EMAIL_PORT = env('EMAIL_PORT')
 EMAIL_HOST_USER = env('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
 
+EMAIL_TIMEOUT = env.int('EMAIL_TIMEOUT', default=30)
+
+EMAIL_SESSION_MAX_MESSAGES = env.int('EMAIL_SESSION_MAX_MESSAGES', default=100)
+
+EMAIL_SESSION_IDLE_TIMEOUT = env.int('EMAIL_SESSION_IDLE_TIMEOUT', default=120)
+
 # Sessions
 
 SESSION_SERIALIZER = 'django.contrib.sessions.serializers.PickleSerializer'
@@ -234,4 +240,38 @@ GROUPS = {
 
 DOMAIN = env.str('DOMAIN', default='localhost')
 
-DEFAULT_SCHEMA = env.str('DEFAULT_SCHEMA', default='public')
\ No newline at end of file
+DEFAULT_SCHEMA = env.str('DEFAULT_SCHEMA', default='public')
+
+# SRI
+
+SRI_TIMEOUT = env.int('SRI_TIMEOUT', default=30)
+
+SRI_WARM_UP = env.bool('SRI_WARM_UP', default=False)
+
+SRI_SIGNER = env.str('SRI_SIGNER', default='xades')
+
+SRI_BATCH_SIZE = env.int('SRI_BATCH_SIZE', default=50)
+
+SRI_BASE_URL = env.str('SRI_BASE_URL', default='')
+
+SRI_XSD_VALIDATION = env.bool('SRI_XSD_VALIDATION', default=False)
+
+SRI_XSD_DIR = env.str('SRI_XSD_DIR', default=os.path.join(BASE_DIR, 'core/pos/resources/xsd'))
+
+VOUCHER_SEQUENCE_BLOCK_SIZE = env.int('VOUCHER_SEQUENCE_BLOCK_SIZE', default=1)
+
+VOUCHER_ARCHIVE = env.bool('VOUCHER_ARCHIVE', default=True)
+
+METRICS_FLUSH_INTERVAL = env.int('METRICS_FLUSH_INTERVAL', default=60)
+
+CATALOG_CACHE_DIR = env.str('CATALOG_CACHE_DIR', default=os.path.join(BASE_DIR, 'cache/catalog'))
+
+CATALOG_CACHE_TENANTS = env.int('CATALOG_CACHE_TENANTS', default=20)
+
+DATATABLES_EXACT_COUNT = env.int('DATATABLES_EXACT_COUNT', default=10000)
+
+DATATABLES_COUNT_TIMEOUT = env.int('DATATABLES_COUNT_TIMEOUT', default=60)
+
+STREAMING_CHUNK_SIZE = env.int('STREAMING_CHUNK_SIZE', default=2000)
+
+STREAMING_BUFFER_SIZE = env.int('STREAMING_BUFFER_SIZE', default=65536)
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.SRI_WARM_UP:
+    from core.pos.utilities.soap import sri_clients
+
+    sri_clients.warm_up()
@@ -2,12 +2,11 @@ import json
 from datetime import datetime
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Sum, FloatField
-from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from django.views.generic import TemplateView
 
-from core.pos.models import Product, Sale, Client, Provider, Category, Purchase
+from core.pos.models import Product, Sale, Client, Provider, Category
+from core.pos.utilities.summary import daily_summary
 from core.security.models import Dashboard
 
 
@@ -31,18 +30,11 @@ class DashboardView(LoginRequiredMixin, TemplateView):
                 for i in Product.objects.filter(stock__gt=0).order_by('-stock')[0:10]:
                     data.append([i.name, i.stock])
             elif action == 'get_graph_purchase_vs_sale':
-                data = []
-                year = datetime.now().year
-                rows = []
-                for month in range(1, 13):
-                    result = Sale.objects.filter(date_joined__month=month, date_joined__year=year).aggregate(result=Coalesce(Sum('total'), 0.00, output_field=FloatField()))['result']
-                    rows.append(float(result))
-                data.append({'name': 'Ventas', 'data': rows})
-                rows = []
-                for month in range(1, 13):
-                    result = Purchase.objects.filter(date_joined__month=month, date_joined__year=year).aggregate(result=Coalesce(Sum('subtotal'), 0.00, output_field=FloatField()))['result']
-                    rows.append(float(result))
-                data.append({'name': 'Compras', 'data': rows})
+                monthly = daily_summary.get_monthly(datetime.now().year, 'sale_total', 'purchase_total')
+                data = [
+                    {'name': 'Ventas', 'data': monthly['sale_total']},
+                    {'name': 'Compras', 'data': monthly['purchase_total']},
+                ]
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
@@ -1,5 +1,4 @@
 import json
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
@@ -15,6 +14,7 @@ from django.views.generic import FormView, RedirectView, TemplateView
 from config import settings
 from core.login.forms import ResetPasswordForm, UpdatePasswordForm
 from core.security.models import UserAccess
+from core.security.utilities.mailer import EmailDispatcher
 from core.user.models import User
 
 
@@ -87,11 +87,9 @@ class LoginResetPasswordView(FormView):
             html = render_to_string('login/password_reset_email.html', parameters)
             content = MIMEText(html, 'html')
             message.attach(content)
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
-            server.starttls()
-            server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-            server.sendmail(settings.EMAIL_HOST_USER, user.email, message.as_string())
-            server.quit()
+            email_dispatcher = EmailDispatcher()
+            email_dispatcher.enqueue(message)
+            transaction.on_commit(email_dispatcher.flush)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
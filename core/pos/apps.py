@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import pre_migrate, post_init, post_save, post_delete
+
+
+def create_extensions(using='default', **kwargs):
+    from django_tenants.utils import get_public_schema_name
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA {get_public_schema_name()}')
 
 
 class PosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.pos'
+
+    def ready(self):
+        pre_migrate.connect(create_extensions, sender=self)
+        from core.pos.utilities.catalog import invalidate_catalog
+        for model_name in ('Product', 'Category', 'Promotions', 'PromotionsDetail'):
+            post_save.connect(invalidate_catalog, sender=self.get_model(model_name))
+            post_delete.connect(invalidate_catalog, sender=self.get_model(model_name))
+        from core.pos.utilities.summary import remember_summary_state, save_summary, delete_summary
+        for model_name in ('Sale', 'CreditNote', 'Purchase', 'Expenses'):
+            post_init.connect(remember_summary_state, sender=self.get_model(model_name))
+            post_save.connect(save_summary, sender=self.get_model(model_name))
+            post_delete.connect(delete_summary, sender=self.get_model(model_name))
+        from core.pos.utilities.sri import revert_email_status
+        post_save.connect(revert_email_status, sender=self.apps.get_model('security', 'EmailOutbox'))
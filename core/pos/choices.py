@@ -65,3 +65,26 @@ INVOICE_STATUS = (
     ('canceled', 'Anulado'),
     ('sequential_registered_error', 'Error de secuencial registrado'),
 )
+
+OUTBOX_VOUCHER = (
+    ('sale', 'Venta'),
+    ('credit_note', 'Nota de Crédito'),
+)
+
+OUTBOX_STATUS = (
+    ('pending', 'Pendiente'),
+    ('processing', 'En proceso'),
+    ('done', 'Finalizado'),
+    ('failed', 'Fallido'),
+)
+
+STOCK_MOVEMENT_TYPE = (
+    ('initial', 'Stock inicial'),
+    ('sale', 'Venta'),
+    ('sale_return', 'Anulación de venta'),
+    ('purchase', 'Compra'),
+    ('purchase_return', 'Anulación de compra'),
+    ('credit_note', 'Nota de crédito'),
+    ('credit_note_return', 'Anulación de nota de crédito'),
+    ('adjustment', 'Ajuste de stock'),
+)
@@ -0,0 +1,75 @@
+import os
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.models import Sale, CreditNote
+from core.pos.utilities.archive import archive_storage
+
+VOUCHER_FIELDS = ('xml_authorized', 'pdf_authorized')
+
+
+class Command(BaseCommand):
+    help = "Moves the authorized XML and PDF files stored one by one in the media folder into the daily pack files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+        parser.add_argument('--start_date', nargs='?', type=str, default=None, help='Fecha de inicio')
+        parser.add_argument('--end_date', nargs='?', type=str, default=None, help='Fecha de fin')
+        parser.add_argument('--dry_run', action='store_true', help='Mostrar los archivos sin moverlos')
+
+    def get_names(self, model, options):
+        queryset = model.objects.filter()
+        if options['start_date']:
+            queryset = queryset.filter(date_joined__gte=options['start_date'])
+        if options['end_date']:
+            queryset = queryset.filter(date_joined__lte=options['end_date'])
+        for values in queryset.order_by('id').values_list(*VOUCHER_FIELDS).iterator():
+            for name in values:
+                if name:
+                    yield name
+
+    def archive(self, name, dry_run):
+        if archive_storage.is_packed(name):
+            return 'packed'
+        path = archive_storage.path(name)
+        if not os.path.isfile(path):
+            return 'missing'
+        if dry_run:
+            return 'archived'
+        with open(path, 'rb') as file:
+            data = file.read()
+        archive_storage.append(name, data)
+        if archive_storage.read(name) != data:
+            raise Exception(f'El archivo {name} no coincide con el contenido empaquetado')
+        os.remove(path)
+        try:
+            os.removedirs(os.path.dirname(path))
+        except OSError:
+            pass
+        return 'archived'
+
+    def handle(self, *args, **options):
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme').order_by('id')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        for company in companies:
+            response = {'archived': 0, 'packed': 0, 'missing': 0, 'failed': 0}
+            with schema_context(company.scheme.schema_name):
+                for model in (Sale, CreditNote):
+                    for name in self.get_names(model, options):
+                        try:
+                            response[self.archive(name, options['dry_run'])] += 1
+                        except Exception as e:
+                            response['failed'] += 1
+                            self.stderr.write(f'{company.scheme.schema_name}: {e}')
+            self.stdout.write(f"{company.scheme.schema_name}: {response['archived']} empaquetados, {response['packed']} ya empaquetados, {response['missing']} sin archivo, {response['failed']} fallidos")
+        if options['dry_run']:
+            self.stdout.write('Simulación: no se movió ningún archivo')
@@ -0,0 +1,179 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management import BaseCommand, CommandError
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connections
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.models import Sale, SaleDetail, Receipt, VOUCHER_TYPE, VOUCHER_STAGE, INVOICE_STATUS
+from core.pos.utilities.soap import sri_clients
+from core.pos.utilities.sri import SRI
+from core.pos.utilities.sri_stub import SRIStubConfig, start_server
+
+
+def timed(timings, failures, stage, callback):
+    start_time = time.perf_counter()
+    result = callback()
+    timings[stage].append(time.perf_counter() - start_time)
+    if not result['resp']:
+        failures[stage] += 1
+    return result
+
+
+def authorize(sri, instance, poll_interval, max_polls):
+    result = {'resp': False}
+    for index in range(max_polls):
+        result = sri.authorize_xml(instance=instance)
+        if not result.get('pending'):
+            break
+        time.sleep(poll_interval)
+    return result
+
+
+def run_pipeline(schema_name, base_url, ids, poll_interval, max_polls, send_email):
+    connections.close_all()
+    settings.SRI_BASE_URL = base_url
+    sri_clients.invalidate()
+    stages = [choice[0] for choice in VOUCHER_STAGE]
+    timings = {stage: [] for stage in stages}
+    failures = {stage: 0 for stage in stages}
+    sri = SRI()
+    with schema_context(schema_name):
+        for instance in Sale.objects.filter(id__in=ids).select_related('company__scheme', 'receipt', 'client__user').order_by('id'):
+            result = timed(timings, failures, stages[0], lambda: sri.create_xml(instance))
+            if not result['resp']:
+                continue
+            result = timed(timings, failures, stages[1], lambda: sri.firm_xml(instance=instance, xml=result['xml']))
+            if not result['resp']:
+                continue
+            result = timed(timings, failures, stages[2], lambda: sri.validate_xml(instance=instance, xml=result['xml']))
+            if not result['resp']:
+                continue
+            result = timed(timings, failures, stages[3], lambda: authorize(sri, instance, poll_interval, max_polls))
+            if not result['resp'] or not send_email:
+                continue
+            timed(timings, failures, stages[4], lambda: sri.notify_by_email(instance=instance, company=instance.company, client=instance.client))
+    connections.close_all()
+    return {'schema_name': schema_name, 'timings': timings, 'failures': failures}
+
+
+def percentile(values, percent):
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Drives concurrent tenants through create_xml, firm_xml, validate_xml, authorize_xml and notify_by_email against a SRI stand-in and reports latency per stage, using copies of the latest invoice that are deleted at the end"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', nargs='+', type=str, required=True, help='Esquemas a procesar')
+        parser.add_argument('--concurrency', nargs='?', type=int, default=4, help='Número de empresas en paralelo')
+        parser.add_argument('--vouchers', nargs='?', type=int, default=20, help='Ventas por empresa')
+        parser.add_argument('--stub', action='store_true', help='Iniciar el SRI de pruebas en este proceso')
+        parser.add_argument('--port', nargs='?', type=int, default=8089, help='Puerto del SRI de pruebas')
+        parser.add_argument('--latency', nargs='?', type=float, default=50, help='Latencia del SRI de pruebas en milisegundos')
+        parser.add_argument('--jitter', nargs='?', type=float, default=0, help='Variación de la latencia en milisegundos')
+        parser.add_argument('--devuelta_rate', nargs='?', type=float, default=0.00, help='Proporción de comprobantes DEVUELTA')
+        parser.add_argument('--rejected_rate', nargs='?', type=float, default=0.00, help='Proporción de comprobantes NO AUTORIZADO')
+        parser.add_argument('--outage_rate', nargs='?', type=float, default=0.00, help='Proporción de llamadas con error 503')
+        parser.add_argument('--pending_polls', nargs='?', type=int, default=0, help='Consultas sin autorización antes de autorizar')
+        parser.add_argument('--poll_interval', nargs='?', type=float, default=0.5, help='Segundos entre consultas de autorización')
+        parser.add_argument('--max_polls', nargs='?', type=int, default=10, help='Consultas de autorización por comprobante')
+        parser.add_argument('--issuing_point_code', nargs='?', type=str, default='999', help='Punto de emisión de las ventas de prueba')
+        parser.add_argument('--send_email', action='store_true', help='Encolar el correo de cada venta de prueba al cliente')
+
+    def create_sales(self, company, options):
+        template = Sale.objects.filter(receipt__voucher_type=VOUCHER_TYPE[0][0]).order_by('-id').first()
+        if template is None:
+            return None
+        receipt = Receipt.objects.create(voucher_type=VOUCHER_TYPE[0][0], establishment_code=company.establishment_code, issuing_point_code=options['issuing_point_code'], sequence=0)
+        details = list(template.saledetail_set.order_by('id'))
+        for index in range(options['vouchers']):
+            sale = Sale.objects.get(pk=template.pk)
+            sale.pk = None
+            sale.receipt = receipt
+            sale.voucher_number = f'{index + 1:09d}'
+            sale.voucher_number_full = sale.get_voucher_number_full()
+            sale.access_code = None
+            sale.authorization_date = None
+            sale.xml_authorized = None
+            sale.pdf_authorized = None
+            sale.create_electronic_invoice = False
+            sale.status = INVOICE_STATUS[0][0]
+            sale.save()
+            for detail in details:
+                detail.pk = None
+                detail.sale = sale
+            SaleDetail.objects.bulk_create(details)
+        return receipt
+
+    def delete_sales(self, receipt):
+        for sale in Sale.objects.filter(receipt=receipt):
+            sale.xml_authorized.delete(save=False)
+            sale.pdf_authorized.delete(save=False)
+        SaleDetail.objects.filter(sale__receipt=receipt).delete()
+        Sale.objects.filter(receipt=receipt).delete()
+        receipt.delete()
+
+    def get_tasks(self, options, receipts):
+        companies = Company.objects.filter(scheme__schema_name__in=options['tenants']).exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme').order_by('id')
+        tasks = []
+        for company in companies[:max(options['concurrency'], 1)]:
+            with schema_context(company.scheme.schema_name):
+                if Receipt.objects.filter(voucher_type=VOUCHER_TYPE[0][0], establishment_code=company.establishment_code, issuing_point_code=options['issuing_point_code']).exists():
+                    raise CommandError(f"El punto de emisión {options['issuing_point_code']} ya existe en {company.scheme.schema_name}, utilice otro con --issuing_point_code")
+                receipt = self.create_sales(company, options)
+                if receipt is None:
+                    continue
+                receipts[company.scheme.schema_name] = receipt
+                tasks.append((company.scheme.schema_name, list(Sale.objects.filter(receipt=receipt).values_list('id', flat=True))))
+        return tasks
+
+    def handle(self, *args, **options):
+        server = None
+        base_url = settings.SRI_BASE_URL
+        if options['stub']:
+            config = SRIStubConfig(latency=options['latency'], jitter=options['jitter'], devuelta_rate=options['devuelta_rate'], rejected_rate=options['rejected_rate'], outage_rate=options['outage_rate'], pending_polls=options['pending_polls'])
+            server = start_server(port=options['port'], config=config)
+            base_url = f"http://127.0.0.1:{options['port']}"
+        if not base_url:
+            raise CommandError('Configure SRI_BASE_URL o utilice --stub para no enviar comprobantes al SRI real')
+        receipts = {}
+        try:
+            tasks = self.get_tasks(options, receipts)
+            results = []
+            connections.close_all()
+            start_time = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+                futures = [executor.submit(run_pipeline, schema_name, base_url, ids, options['poll_interval'], options['max_polls'], options['send_email']) for schema_name, ids in tasks]
+                for future in as_completed(futures):
+                    results.append(future.result())
+            self.print_report(results, len(tasks), time.perf_counter() - start_time)
+        finally:
+            for schema_name, receipt in receipts.items():
+                with schema_context(schema_name):
+                    self.delete_sales(receipt)
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def print_report(self, results, concurrency, elapsed):
+        completed = 0
+        for stage, name in VOUCHER_STAGE:
+            timings = sorted(timing for result in results for timing in result['timings'][stage])
+            failures = sum(result['failures'][stage] for result in results)
+            if not timings:
+                self.stdout.write(f'{name}: sin datos')
+                continue
+            throughput = len(timings) / sum(timings) * concurrency if sum(timings) else 0.00
+            self.stdout.write(f'{name}: {len(timings)} llamadas, {failures} fallidas, p50 {percentile(timings, 50) * 1000:.2f}ms, p99 {percentile(timings, 99) * 1000:.2f}ms, {throughput:.2f} comprobantes/s')
+            completed = len(timings) - failures
+        throughput = completed / elapsed if elapsed else 0.00
+        self.stdout.write(f'Total: {completed} comprobantes completos con {concurrency} empresas en paralelo, {elapsed:.2f}s, {throughput:.2f} comprobantes/s')
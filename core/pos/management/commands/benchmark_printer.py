@@ -0,0 +1,59 @@
+import os
+import time
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.template.loader import get_template
+from django_tenants.utils import schema_context
+from weasyprint import CSS, HTML
+from core.pos.models import Sale
+from core.pos.utilities.printer import PDFRenderer
+
+TEMPLATE_NAME = 'sale/format/invoice.html'
+
+
+class Command(BaseCommand):
+    help = "Compares the cost per PDF of the uncached WeasyPrint rendering against the cached renderer and its batch API"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--sale_id', nargs='?', type=int, default=None, help='Venta a imprimir')
+        parser.add_argument('--iterations', nargs='?', type=int, default=20, help='Número de PDFs por modo')
+
+    def measure(self, name, iterations, callback):
+        timings = []
+        for index in range(iterations):
+            start_time = time.perf_counter()
+            callback()
+            timings.append((time.perf_counter() - start_time) * 1000)
+        timings.sort()
+        self.stdout.write(f'{name}: media {sum(timings) / len(timings):.2f}ms, p50 {timings[len(timings) // 2]:.2f}ms, max {timings[-1]:.2f}ms')
+
+    def render_uncached(self, context):
+        html = get_template(TEMPLATE_NAME).render(context).encode(encoding='UTF-8')
+        path_css = f'{settings.BASE_DIR}{settings.STATIC_URL}lib/bootstrap-4.6.0/css/bootstrap.min.css'
+        return HTML(string=html, base_url='.').write_pdf(stylesheets=[CSS(path_css)], presentational_hints=True)
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+        with schema_context(options['schema_name']):
+            queryset = Sale.objects.filter(id=options['sale_id']) if options['sale_id'] else Sale.objects.exclude(access_code__isnull=True).order_by('-id')
+            sale = queryset.select_related('company', 'client__user', 'receipt').first()
+            if sale is None:
+                self.stdout.write('No existen ventas para imprimir')
+                return
+            context = sale.get_context_pdf_authorized()
+            renderer = PDFRenderer()
+            self.measure('sin caché', iterations, lambda: self.render_uncached(context))
+            self.measure('renderer (primera carga)', 1, lambda: renderer.render(context, TEMPLATE_NAME))
+            self.measure('renderer', iterations, lambda: renderer.render(context, TEMPLATE_NAME))
+            start_time = time.perf_counter()
+            renderer.render_many([context] * iterations, TEMPLATE_NAME)
+            elapsed = (time.perf_counter() - start_time) * 1000
+            self.stdout.write(f'renderer por lote: {elapsed / iterations:.2f}ms por PDF ({iterations} PDFs en {elapsed:.2f}ms)')
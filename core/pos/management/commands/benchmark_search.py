@@ -0,0 +1,79 @@
+import os
+import random
+import time
+
+import django
+from django.core.management import BaseCommand, CommandError
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection, transaction
+from django_tenants.utils import schema_context
+from core.pos.models import Product, Category, Client
+from core.pos.utilities.search import product_search, client_search
+
+WORDS = ['arroz', 'azucar', 'aceite', 'atun', 'leche', 'queso', 'yogurt', 'pan', 'galleta', 'cafe', 'chocolate', 'fideo', 'harina', 'sal', 'jabon', 'detergente', 'shampoo', 'papel', 'servilleta', 'agua', 'gaseosa', 'jugo', 'cerveza', 'vino', 'sardina', 'mantequilla', 'mermelada', 'avena', 'lenteja', 'frejol']
+
+BRANDS = ['la favorita', 'supermaxi', 'toni', 'nestle', 'pronaca', 'real', 'don vittorio', 'facundo', 'san jorge', 'el cafe']
+
+SIZES = ['250g', '500g', '1kg', '2kg', '1l', '2l', '355ml', 'x6', 'x12', 'familiar']
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, percent):
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Loads synthetic products into a tenant inside a transaction that is rolled back and reports the latency of the product and client autocompletes for every keystroke of the search terms"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--products', nargs='?', type=int, default=100000, help='Cantidad de productos sintéticos')
+        parser.add_argument('--terms', nargs='*', type=str, default=['arroz', 'cafe nestle', 'detergente toni', '000123', 'jabon 500'], help='Términos a escribir letra por letra')
+        parser.add_argument('--repeat', nargs='?', type=int, default=5, help='Repeticiones por pulsación')
+
+    def create_products(self, quantity):
+        random.seed(quantity)
+        category = Category.objects.create(name=f'Benchmark {time.time_ns()}')
+        products = []
+        for index in range(quantity):
+            name = f'{random.choice(WORDS)} {random.choice(BRANDS)} {random.choice(SIZES)}'
+            products.append(Product(name=name.upper(), code=f'BN{index:09d}', category=category, pvp=random.randint(25, 2500) / 100))
+        Product.objects.bulk_create(products, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Product._meta.db_table}')
+
+    def measure(self, search, queryset, term, repeat):
+        timings = []
+        for index in range(1, len(term) + 1):
+            keystroke = term[:index]
+            for number in range(repeat):
+                start_time = time.perf_counter()
+                list(search.search(queryset, keystroke)[0:10])
+                timings.append(time.perf_counter() - start_time)
+        return sorted(timings)
+
+    def print_timings(self, name, term, timings):
+        self.stdout.write(f"{name} '{term}': {len(timings)} consultas, p50 {percentile(timings, 50) * 1000:.2f}ms, p95 {percentile(timings, 95) * 1000:.2f}ms, máx {timings[-1] * 1000:.2f}ms")
+
+    def handle(self, *args, **options):
+        if options['products'] < 0:
+            raise CommandError('La cantidad de productos no puede ser negativa')
+        with schema_context(options['schema_name']):
+            try:
+                with transaction.atomic():
+                    start_time = time.perf_counter()
+                    self.create_products(options['products'])
+                    self.stdout.write(f"{options['products']} productos sintéticos en {time.perf_counter() - start_time:.2f}s, {Product.objects.count()} productos y {Client.objects.count()} clientes en total")
+                    for term in options['terms']:
+                        self.print_timings('Productos', term, self.measure(product_search, Product.objects.filter(), term, options['repeat']))
+                    for term in options['terms']:
+                        self.print_timings('Clientes', term, self.measure(client_search, Client.objects.filter(), term, options['repeat']))
+                    raise Rollback()
+            except Rollback:
+                pass
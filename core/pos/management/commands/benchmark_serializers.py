@@ -0,0 +1,54 @@
+import json
+import os
+import time
+
+import django
+from django.core.management import BaseCommand
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_tenants.utils import schema_context
+from core.pos.models import Sale, SaleDetail, Purchase, CtasCollect, DebtsPay, Product, Client, Expenses
+from core.pos.serializers import SaleSerializer, SaleDetailSerializer, PurchaseSerializer, CtasCollectSerializer, DebtsPaySerializer, ProductSerializer, ClientSerializer, ExpensesSerializer
+from core.rrhh.models import Employee
+from core.rrhh.serializers import EmployeeSerializer
+from core.security.utilities.serializers import json_dumps
+
+SERIALIZERS = {
+    'sale': (Sale, SaleSerializer),
+    'sale_detail': (SaleDetail, SaleDetailSerializer),
+    'purchase': (Purchase, PurchaseSerializer),
+    'ctas_collect': (CtasCollect, CtasCollectSerializer),
+    'debts_pay': (DebtsPay, DebtsPaySerializer),
+    'product': (Product, ProductSerializer),
+    'client': (Client, ClientSerializer),
+    'expenses': (Expenses, ExpensesSerializer),
+    'employee': (Employee, EmployeeSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = "Compares the number of queries and the latency of the toJSON methods against the declarative serializers used by the list views"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--models', nargs='*', type=str, choices=list(SERIALIZERS.keys()), default=list(SERIALIZERS.keys()), help='Listados a comparar')
+        parser.add_argument('--limit', nargs='?', type=int, default=1000, help='Cantidad máxima de registros por listado')
+
+    def measure(self, callback):
+        start_time = time.perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            content = callback()
+        return len(context.captured_queries), time.perf_counter() - start_time, len(content)
+
+    def handle(self, *args, **options):
+        with schema_context(options['schema_name']):
+            for name in options['models']:
+                model, serializer_class = SERIALIZERS[name]
+                queryset = model.objects.filter().order_by('id')[:options['limit']]
+                before = self.measure(lambda: json.dumps([i.toJSON() for i in queryset]))
+                after = self.measure(lambda: json_dumps(serializer_class().serialize(queryset)))
+                self.stdout.write(f'{name}: {queryset.count()} registros, toJSON {before[0]} consultas {before[1] * 1000:.2f}ms {before[2]} bytes, serializador {after[0]} consultas {after[1] * 1000:.2f}ms {after[2]} bytes')
@@ -0,0 +1,46 @@
+import os
+import time
+
+import django
+from django.core.management import BaseCommand
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django_tenants.utils import schema_context
+from core.pos.models import Sale
+from core.pos.utilities.signer import XAdESSigner, key_store_cache
+from core.pos.utilities.sri import SRI
+
+
+class Command(BaseCommand):
+    help = "Compares the signing time of the java sri.jar backend against the in-process XAdES-BES signer"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--sale_id', nargs='?', type=int, default=None, help='Venta a firmar')
+        parser.add_argument('--iterations', nargs='?', type=int, default=20, help='Número de firmas por backend')
+
+    def measure(self, name, iterations, callback):
+        timings = []
+        for index in range(iterations):
+            start_time = time.perf_counter()
+            callback()
+            timings.append((time.perf_counter() - start_time) * 1000)
+        timings.sort()
+        self.stdout.write(f'{name}: media {sum(timings) / len(timings):.2f}ms, p50 {timings[len(timings) // 2]:.2f}ms, max {timings[-1]:.2f}ms')
+
+    def handle(self, *args, **options):
+        sri = SRI()
+        iterations = max(options['iterations'], 1)
+        with schema_context(options['schema_name']):
+            queryset = Sale.objects.filter(id=options['sale_id']) if options['sale_id'] else Sale.objects.order_by('-id')
+            sale = queryset.first()
+            if sale is None:
+                self.stdout.write('No existen ventas para firmar')
+                return
+            xml, access_code = sale.generate_xml()
+            self.measure('jar', iterations, lambda: sri.sign_with_jar(sale, xml))
+            key_store_cache.drop(sale.company_id)
+            self.measure('xades (primera carga)', 1, lambda: XAdESSigner(sri.get_key_store(sale.company)).sign(xml))
+            self.measure('xades', iterations, lambda: XAdESSigner(sri.get_key_store(sale.company)).sign(xml))
@@ -0,0 +1,54 @@
+import os
+import time
+import tracemalloc
+
+import django
+from django.core.management import BaseCommand
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django_tenants.utils import schema_context
+from config import settings
+from core.pos.models import Sale, Purchase, CtasCollect, DebtsPay, Expenses
+from core.pos.serializers import SaleSerializer, PurchaseSerializer, CtasCollectSerializer, DebtsPaySerializer, ExpensesSerializer
+from core.security.utilities.serializers import json_dumps
+from core.security.utilities.streaming import json_streaming_response
+
+SERIALIZERS = {
+    'sale': (Sale, SaleSerializer),
+    'purchase': (Purchase, PurchaseSerializer),
+    'ctas_collect': (CtasCollect, CtasCollectSerializer),
+    'debts_pay': (DebtsPay, DebtsPaySerializer),
+    'expenses': (Expenses, ExpensesSerializer),
+}
+
+
+class Command(BaseCommand):
+    help = "Compares the peak memory of the report exports built as one JSON document against the streaming responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--models', nargs='*', type=str, choices=list(SERIALIZERS.keys()), default=list(SERIALIZERS.keys()), help='Reportes a comparar')
+        parser.add_argument('--start_date', nargs='?', type=str, default='', help='Fecha de inicio (YYYY-MM-DD)')
+        parser.add_argument('--end_date', nargs='?', type=str, default='', help='Fecha de fin (YYYY-MM-DD)')
+
+    def measure(self, callback):
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        size = callback()
+        elapsed = time.perf_counter() - start_time
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return size, elapsed, peak
+
+    def handle(self, *args, **options):
+        with schema_context(options['schema_name']):
+            for name in options['models']:
+                model, serializer_class = SERIALIZERS[name]
+                queryset = model.objects.filter().order_by('date_joined', 'id')
+                if len(options['start_date']) and len(options['end_date']):
+                    queryset = queryset.filter(date_joined__range=[options['start_date'], options['end_date']])
+                before = self.measure(lambda: len(json_dumps(serializer_class().serialize(queryset))))
+                after = self.measure(lambda: sum(len(chunk) for chunk in json_streaming_response(serializer_class().iterate(queryset, settings.STREAMING_CHUNK_SIZE)).streaming_content))
+                self.stdout.write(f'{name}: {before[0]} bytes, documento {before[1] * 1000:.2f}ms pico {before[2] / 1024 / 1024:.2f}MB, streaming {after[1] * 1000:.2f}ms pico {after[2] / 1024 / 1024:.2f}MB')
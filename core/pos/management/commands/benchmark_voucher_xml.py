@@ -0,0 +1,246 @@
+import os
+import time
+from datetime import date, datetime
+from types import SimpleNamespace
+from xml.etree import ElementTree
+
+import django
+from django.core.management import BaseCommand
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from core.pos.choices import TAX_CODES, VOUCHER_TYPE
+from core.pos.utilities.voucher_xml import InvoiceXMLSerializer, CreditNoteXMLSerializer
+from core.tenant.choices import RETENTION_AGENT
+
+ACCESS_KEY = '0101202401179000000000110010010000000011234567811'
+
+
+def legacy_invoice_xml(instance, details, access_key):
+    root = ElementTree.Element('factura', id="comprobante", version="1.0.0")
+    # infoTributaria
+    xml_tax_info = ElementTree.SubElement(root, 'infoTributaria')
+    ElementTree.SubElement(xml_tax_info, 'ambiente').text = str(instance.company.environment_type)
+    ElementTree.SubElement(xml_tax_info, 'tipoEmision').text = str(instance.company.emission_type)
+    ElementTree.SubElement(xml_tax_info, 'razonSocial').text = instance.company.business_name
+    ElementTree.SubElement(xml_tax_info, 'nombreComercial').text = instance.company.tradename
+    ElementTree.SubElement(xml_tax_info, 'ruc').text = instance.company.ruc
+    ElementTree.SubElement(xml_tax_info, 'claveAcceso').text = access_key
+    ElementTree.SubElement(xml_tax_info, 'codDoc').text = instance.receipt.voucher_type
+    ElementTree.SubElement(xml_tax_info, 'estab').text = instance.receipt.establishment_code
+    ElementTree.SubElement(xml_tax_info, 'ptoEmi').text = instance.receipt.issuing_point_code
+    ElementTree.SubElement(xml_tax_info, 'secuencial').text = instance.voucher_number
+    ElementTree.SubElement(xml_tax_info, 'dirMatriz').text = instance.company.main_address
+    # infoFactura
+    xml_info_invoice = ElementTree.SubElement(root, 'infoFactura')
+    ElementTree.SubElement(xml_info_invoice, 'fechaEmision').text = datetime.now().strftime('%d/%m/%Y')
+    ElementTree.SubElement(xml_info_invoice, 'dirEstablecimiento').text = instance.company.establishment_address
+    ElementTree.SubElement(xml_info_invoice, 'obligadoContabilidad').text = instance.company.obligated_accounting
+    ElementTree.SubElement(xml_info_invoice, 'tipoIdentificacionComprador').text = instance.client.identification_type
+    ElementTree.SubElement(xml_info_invoice, 'razonSocialComprador').text = instance.client.user.names
+    ElementTree.SubElement(xml_info_invoice, 'identificacionComprador').text = instance.client.dni
+    ElementTree.SubElement(xml_info_invoice, 'direccionComprador').text = instance.client.address
+    ElementTree.SubElement(xml_info_invoice, 'totalSinImpuestos').text = f'{instance.get_full_subtotal():.2f}'
+    ElementTree.SubElement(xml_info_invoice, 'totalDescuento').text = f'{instance.total_dscto:.2f}'
+    # totalConImpuestos
+    xml_total_with_taxes = ElementTree.SubElement(xml_info_invoice, 'totalConImpuestos')
+    # totalImpuesto
+    if instance.subtotal_0 != 0.0000:
+        xml_total_tax_0 = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
+        ElementTree.SubElement(xml_total_tax_0, 'codigo').text = str(TAX_CODES[0][0])
+        ElementTree.SubElement(xml_total_tax_0, 'codigoPorcentaje').text = '0'
+        ElementTree.SubElement(xml_total_tax_0, 'baseImponible').text = f'{instance.subtotal_0:.2f}'
+        ElementTree.SubElement(xml_total_tax_0, 'valor').text = '0.00'
+    if instance.subtotal_12 != 0.0000:
+        xml_total_tax12 = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
+        ElementTree.SubElement(xml_total_tax12, 'codigo').text = str(TAX_CODES[0][0])
+        ElementTree.SubElement(xml_total_tax12, 'codigoPorcentaje').text = str(instance.company.vat_percentage)
+        ElementTree.SubElement(xml_total_tax12, 'baseImponible').text = f'{instance.subtotal_12:.2f}'
+        ElementTree.SubElement(xml_total_tax12, 'valor').text = f'{instance.total_iva:.2f}'
+    ElementTree.SubElement(xml_info_invoice, 'propina').text = '0.00'
+    ElementTree.SubElement(xml_info_invoice, 'importeTotal').text = f'{instance.total:.2f}'
+    ElementTree.SubElement(xml_info_invoice, 'moneda').text = 'DOLAR'
+    # pagos
+    xml_payments = ElementTree.SubElement(xml_info_invoice, 'pagos')
+    xml_payment = ElementTree.SubElement(xml_payments, 'pago')
+    ElementTree.SubElement(xml_payment, 'formaPago').text = instance.payment_method
+    ElementTree.SubElement(xml_payment, 'total').text = f'{instance.total:.2f}'
+    ElementTree.SubElement(xml_payment, 'plazo').text = str(instance.time_limit)
+    ElementTree.SubElement(xml_payment, 'unidadTiempo').text = 'dias'
+    # detalles
+    xml_details = ElementTree.SubElement(root, 'detalles')
+    for detail in details:
+        xml_detail = ElementTree.SubElement(xml_details, 'detalle')
+        ElementTree.SubElement(xml_detail, 'codigoPrincipal').text = detail.product.code
+        ElementTree.SubElement(xml_detail, 'descripcion').text = detail.product.name
+        ElementTree.SubElement(xml_detail, 'cantidad').text = f'{detail.cant:.2f}'
+        ElementTree.SubElement(xml_detail, 'precioUnitario').text = f'{detail.price:.2f}'
+        ElementTree.SubElement(xml_detail, 'descuento').text = f'{detail.total_dscto:.2f}'
+        ElementTree.SubElement(xml_detail, 'precioTotalSinImpuesto').text = f'{detail.total:.2f}'
+        xml_taxes = ElementTree.SubElement(xml_detail, 'impuestos')
+        xml_tax = ElementTree.SubElement(xml_taxes, 'impuesto')
+        ElementTree.SubElement(xml_tax, 'codigo').text = str(TAX_CODES[0][0])
+        if detail.product.with_tax:
+            ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = str(detail.product.vat_percentage)
+            ElementTree.SubElement(xml_tax, 'tarifa').text = f'{detail.iva * 100:.2f}'
+            ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
+            ElementTree.SubElement(xml_tax, 'valor').text = f'{detail.total_iva:.2f}'
+        else:
+            ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = "0"
+            ElementTree.SubElement(xml_tax, 'tarifa').text = "0"
+            ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
+            ElementTree.SubElement(xml_tax, 'valor').text = "0"
+    # infoAdicional
+    if len(instance.additional_info):
+        xml_additional_info = ElementTree.SubElement(root, 'infoAdicional')
+        for additional_info in instance.additional_info:
+            ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre=additional_info['name']).text = additional_info['value']
+    return ElementTree.tostring(root, xml_declaration=True, encoding='utf-8').decode('utf-8').replace("'", '"')
+
+
+def legacy_credit_note_xml(instance, details, access_key):
+    root = ElementTree.Element('notaCredito', id="comprobante", version="1.1.0")
+    # infoTributaria
+    xml_tax_info = ElementTree.SubElement(root, 'infoTributaria')
+    ElementTree.SubElement(xml_tax_info, 'ambiente').text = str(instance.company.environment_type)
+    ElementTree.SubElement(xml_tax_info, 'tipoEmision').text = str(instance.company.emission_type)
+    ElementTree.SubElement(xml_tax_info, 'razonSocial').text = instance.company.business_name
+    ElementTree.SubElement(xml_tax_info, 'nombreComercial').text = instance.company.tradename
+    ElementTree.SubElement(xml_tax_info, 'ruc').text = instance.company.ruc
+    ElementTree.SubElement(xml_tax_info, 'claveAcceso').text = access_key
+    ElementTree.SubElement(xml_tax_info, 'codDoc').text = instance.receipt.voucher_type
+    ElementTree.SubElement(xml_tax_info, 'estab').text = instance.receipt.establishment_code
+    ElementTree.SubElement(xml_tax_info, 'ptoEmi').text = instance.receipt.issuing_point_code
+    ElementTree.SubElement(xml_tax_info, 'secuencial').text = instance.voucher_number
+    ElementTree.SubElement(xml_tax_info, 'dirMatriz').text = instance.company.main_address
+    if instance.company.retention_agent == RETENTION_AGENT[0][0]:
+        ElementTree.SubElement(xml_tax_info, 'agenteRetencion').text = '1'
+    # infoNotaCredito
+    xml_info_invoice = ElementTree.SubElement(root, 'infoNotaCredito')
+    ElementTree.SubElement(xml_info_invoice, 'fechaEmision').text = datetime.now().strftime('%d/%m/%Y')
+    ElementTree.SubElement(xml_info_invoice, 'dirEstablecimiento').text = instance.company.establishment_address
+    ElementTree.SubElement(xml_info_invoice, 'tipoIdentificacionComprador').text = instance.sale.client.identification_type
+    ElementTree.SubElement(xml_info_invoice, 'razonSocialComprador').text = instance.sale.client.user.names
+    ElementTree.SubElement(xml_info_invoice, 'identificacionComprador').text = instance.sale.client.dni
+    if not instance.company.special_taxpayer == '000':
+        ElementTree.SubElement(xml_info_invoice, 'contribuyenteEspecial').text = instance.company.special_taxpayer
+    ElementTree.SubElement(xml_info_invoice, 'obligadoContabilidad').text = instance.company.obligated_accounting
+    ElementTree.SubElement(xml_info_invoice, 'rise').text = 'Contribuyente Régimen Simplificado RISE'
+    ElementTree.SubElement(xml_info_invoice, 'codDocModificado').text = instance.sale.receipt.voucher_type
+    ElementTree.SubElement(xml_info_invoice, 'numDocModificado').text = instance.sale.voucher_number_full
+    ElementTree.SubElement(xml_info_invoice, 'fechaEmisionDocSustento').text = instance.sale.date_joined.strftime('%d/%m/%Y')
+    ElementTree.SubElement(xml_info_invoice, 'totalSinImpuestos').text = f'{instance.get_full_subtotal():.2f}'
+    ElementTree.SubElement(xml_info_invoice, 'valorModificacion').text = f'{instance.total:.2f}'
+    ElementTree.SubElement(xml_info_invoice, 'moneda').text = 'DOLAR'
+    # totalConImpuestos
+    xml_total_with_taxes = ElementTree.SubElement(xml_info_invoice, 'totalConImpuestos')
+    # totalImpuesto
+    if instance.subtotal_0 != 0.0000:
+        xml_total_tax = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
+        ElementTree.SubElement(xml_total_tax, 'codigo').text = str(TAX_CODES[0][0])
+        ElementTree.SubElement(xml_total_tax, 'codigoPorcentaje').text = '0'
+        ElementTree.SubElement(xml_total_tax, 'baseImponible').text = f'{instance.subtotal_0:.2f}'
+        ElementTree.SubElement(xml_total_tax, 'valor').text = f'{0:.2f}'
+    if instance.subtotal_12 != 0.0000:
+        xml_total_tax2 = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
+        ElementTree.SubElement(xml_total_tax2, 'codigo').text = str(TAX_CODES[0][0])
+        ElementTree.SubElement(xml_total_tax2, 'codigoPorcentaje').text = str(instance.company.vat_percentage)
+        ElementTree.SubElement(xml_total_tax2, 'baseImponible').text = f'{instance.subtotal_12:.2f}'
+        ElementTree.SubElement(xml_total_tax2, 'valor').text = f'{instance.total_iva:.2f}'
+    ElementTree.SubElement(xml_info_invoice, 'motivo').text = instance.motive
+    # detalles
+    xml_details = ElementTree.SubElement(root, 'detalles')
+    for detail in details:
+        xml_detail = ElementTree.SubElement(xml_details, 'detalle')
+        ElementTree.SubElement(xml_detail, 'codigoInterno').text = detail.product.code
+        ElementTree.SubElement(xml_detail, 'descripcion').text = detail.product.name
+        ElementTree.SubElement(xml_detail, 'cantidad').text = f'{detail.cant:.2f}'
+        ElementTree.SubElement(xml_detail, 'precioUnitario').text = f'{detail.price:.2f}'
+        ElementTree.SubElement(xml_detail, 'descuento').text = f'{detail.total_dscto:.2f}'
+        ElementTree.SubElement(xml_detail, 'precioTotalSinImpuesto').text = f'{detail.total:.2f}'
+        xml_taxes = ElementTree.SubElement(xml_detail, 'impuestos')
+        xml_tax = ElementTree.SubElement(xml_taxes, 'impuesto')
+        ElementTree.SubElement(xml_tax, 'codigo').text = str(TAX_CODES[0][0])
+        if detail.product.with_tax:
+            ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = str(detail.product.vat_percentage)
+            ElementTree.SubElement(xml_tax, 'tarifa').text = f'{detail.iva * 100:.2f}'
+            ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
+            ElementTree.SubElement(xml_tax, 'valor').text = f'{detail.total_iva:.2f}'
+        else:
+            ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = "0"
+            ElementTree.SubElement(xml_tax, 'tarifa').text = "0"
+            ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
+            ElementTree.SubElement(xml_tax, 'valor').text = "0"
+    # infoAdicional
+    xml_additional_info = ElementTree.SubElement(root, 'infoAdicional')
+    ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre='dirCliente').text = instance.sale.client.address
+    ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre='telfCliente').text = instance.sale.client.mobile
+    ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre='Observacion').text = f'NOTA_CREDITO # {instance.voucher_number}'
+    return ElementTree.tostring(root, xml_declaration=True, encoding='UTF-8').decode('UTF-8').replace("'", '"')
+
+
+
+def create_company():
+    return SimpleNamespace(environment_type=1, emission_type=1, business_name='ALGORISOFT S.A.', tradename='Algorisoft & Cía', ruc='1790000000001', main_address='Av. Amazonas <N34>', establishment_address='Av. Amazonas', obligated_accounting='SI', vat_percentage=2, retention_agent=RETENTION_AGENT[0][0], special_taxpayer='000')
+
+
+def create_client():
+    return SimpleNamespace(identification_type='05', user=SimpleNamespace(names="María O'Connor"), dni='0912345678', address=None, mobile='0999999999')
+
+
+def create_details(lines):
+    details = []
+    for index in range(lines):
+        with_tax = index % 3 != 0
+        product = SimpleNamespace(code=f'P{index:05d}', name=f'Producto {index} & "extra"', with_tax=with_tax, vat_percentage=2)
+        total = 10.5 * (index % 7 + 1)
+        details.append(SimpleNamespace(product=product, cant=index % 7 + 1, price=10.5, total_dscto=0.0, total=total, iva=0.12 if with_tax else 0.0, total_iva=total * 0.12 if with_tax else 0.0))
+    return details
+
+
+def create_sale(lines):
+    receipt = SimpleNamespace(voucher_type=VOUCHER_TYPE[0][0], establishment_code='001', issuing_point_code='001')
+    sale = SimpleNamespace(company=create_company(), client=create_client(), receipt=receipt, voucher_number='000000001', voucher_number_full='001-001-000000001', subtotal_0=100.0, subtotal_12=200.0, total_iva=24.0, total_dscto=0.0, total=324.0, payment_method='01', time_limit=0, date_joined=date.today())
+    sale.get_full_subtotal = lambda: 300.0
+    sale.additional_info = [{'name': 'Dirección', 'value': 'Quito'}, {'name': 'Email', 'value': 'cliente@correo.com'}]
+    return sale
+
+
+def create_credit_note(lines):
+    sale = create_sale(lines)
+    receipt = SimpleNamespace(voucher_type=VOUCHER_TYPE[1][0], establishment_code='001', issuing_point_code='001')
+    credit_note = SimpleNamespace(company=sale.company, sale=sale, receipt=receipt, voucher_number='000000001', subtotal_0=0.0, subtotal_12=200.0, total_iva=24.0, total=224.0, motive='Devolución')
+    credit_note.get_full_subtotal = lambda: 200.0
+    return credit_note
+
+
+class Command(BaseCommand):
+    help = "Compares the legacy ElementTree voucher XML against the streaming serializer at 10, 100 and 1000 detail lines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', nargs='?', type=int, default=50, help='Documentos por medición')
+        parser.add_argument('--lines', nargs='*', type=int, default=[10, 100, 1000], help='Número de detalles')
+
+    def measure(self, iterations, callback):
+        start_time = time.perf_counter()
+        for index in range(iterations):
+            callback()
+        return (time.perf_counter() - start_time) * 1000 / iterations
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+        vouchers = [
+            ('factura', create_sale, legacy_invoice_xml, InvoiceXMLSerializer),
+            ('nota de crédito', create_credit_note, legacy_credit_note_xml, CreditNoteXMLSerializer),
+        ]
+        for name, create_voucher, legacy, serializer in vouchers:
+            for lines in options['lines']:
+                instance = create_voucher(lines)
+                details = create_details(lines)
+                expected = legacy(instance, details, ACCESS_KEY)
+                result = serializer(instance, ACCESS_KEY).to_string(details)
+                before = self.measure(iterations, lambda: legacy(instance, details, ACCESS_KEY))
+                after = self.measure(iterations, lambda: serializer(instance, ACCESS_KEY).to_string(details))
+                status = 'idéntico' if expected == result else 'DIFERENTE'
+                self.stdout.write(f'{name} {lines} detalles: ElementTree {before:.2f}ms, serializador {after:.2f}ms, {before / after:.1f}x, {status}')
@@ -0,0 +1,44 @@
+import os
+import time
+
+import django
+from django.core.management import BaseCommand, CommandError
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_tenants.utils import schema_context
+from core.pos.models import Product
+from core.pos.utilities.catalog import product_catalog
+
+
+class Command(BaseCommand):
+    help = "Checks that barcode lookups through the product catalog cache run no queries once the catalog of the tenant is loaded"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--scans', nargs='?', type=int, default=1000, help='Cantidad de lecturas de códigos')
+
+    def handle(self, *args, **options):
+        schema_name = options['schema_name']
+        with schema_context(schema_name):
+            codes = list(Product.objects.values_list('code', flat=True).order_by('id')[:100])
+            if not len(codes):
+                raise CommandError('El esquema no tiene productos')
+            product_catalog.drop(schema_name)
+            start_time = time.perf_counter()
+            with CaptureQueriesContext(connection) as context:
+                product_catalog.get(schema_name, codes[0])
+            self.stdout.write(f'Carga del catálogo: {len(context.captured_queries)} consultas, {(time.perf_counter() - start_time) * 1000:.2f}ms')
+            start_time = time.perf_counter()
+            with CaptureQueriesContext(connection) as context:
+                for index in range(options['scans']):
+                    if product_catalog.get(schema_name, codes[index % len(codes)]) is None:
+                        raise CommandError(f'No se encontró el producto {codes[index % len(codes)]} en el catálogo')
+            elapsed = time.perf_counter() - start_time
+        self.stdout.write(f"{options['scans']} lecturas: {len(context.captured_queries)} consultas, {elapsed / max(options['scans'], 1) * 1000:.3f}ms por lectura")
+        if len(context.captured_queries):
+            raise CommandError('Las lecturas de códigos consultan la base de datos')
+        self.stdout.write('OK')
@@ -0,0 +1,58 @@
+import os
+import time
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import close_old_connections
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.utilities.outbox import OutboxDispatcher
+from core.security.utilities.mailer import EmailDispatcher
+
+
+class Command(BaseCommand):
+    help = "Sends the vouchers and emails registered in the outboxes outside of the checkout request"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+        parser.add_argument('--limit', nargs='?', type=int, default=50, help='Comprobantes por esquema en cada ciclo')
+        parser.add_argument('--interval', nargs='?', type=float, default=2.0, help='Segundos de espera entre ciclos')
+        parser.add_argument('--loop', action='store_true', help='Ejecutar de forma continua')
+
+    def dispatch_emails(self, email_dispatcher, schema_name, options):
+        with schema_context(schema_name):
+            response = email_dispatcher.dispatch(limit=options['limit'])
+        if response['processed']:
+            self.stdout.write(f"{schema_name}: {response['sent']} correos enviados, {response['failed']} fallidos")
+        return response['processed']
+
+    def dispatch(self, dispatcher, email_dispatcher, options):
+        processed = self.dispatch_emails(email_dispatcher, settings.DEFAULT_SCHEMA, options)
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                response = dispatcher.dispatch(limit=options['limit'])
+            if response['processed']:
+                self.stdout.write(f"{company.scheme.schema_name}: {response['processed']} procesados, {response['done']} finalizados, {response['failed']} fallidos")
+            processed += response['processed']
+            processed += self.dispatch_emails(email_dispatcher, company.scheme.schema_name, options)
+        return processed
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher()
+        email_dispatcher = EmailDispatcher()
+        while True:
+            close_old_connections()
+            processed = self.dispatch(dispatcher, email_dispatcher, options)
+            if not options['loop']:
+                break
+            if processed == 0:
+                time.sleep(options['interval'])
@@ -1,4 +1,6 @@
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 import django
@@ -9,10 +11,95 @@ from config import settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
+from django.db import connections
 from django_tenants.utils import schema_context
 from core.tenant.models import Company
-from core.pos.models import Sale, CreditNote, INVOICE_STATUS, VOUCHER_TYPE
+from core.pos.models import Sale, CreditNote, VoucherOutbox, INVOICE_STATUS, VOUCHER_TYPE, OUTBOX_STATUS
+from core.pos.utilities.outbox import OutboxDispatcher
 from core.pos.utilities.sri import SRI
+from core.security.utilities.mailer import EmailDispatcher
+
+EXCLUDED_INVOICE_STATES = [INVOICE_STATUS[2][0], INVOICE_STATUS[3][0], INVOICE_STATUS[4][0]]
+
+VOUCHER_MODELS = {
+    'sale': Sale,
+    'credit_note': CreditNote,
+}
+
+
+def get_voucher_queryset(model_name, date_joined):
+    if model_name == 'sale':
+        queryset = Sale.objects.filter(date_joined=date_joined, receipt__voucher_type=VOUCHER_TYPE[0][0], create_electronic_invoice=True)
+    else:
+        queryset = CreditNote.objects.filter(date_joined=date_joined, create_electronic_invoice=True)
+    return queryset.exclude(status__in=EXCLUDED_INVOICE_STATES).exclude(id__in=get_outbox_ids(model_name)).order_by('id')
+
+
+def get_outbox_ids(model_name):
+    return VoucherOutbox.objects.filter(voucher_type=model_name, status__in=[OUTBOX_STATUS[0][0], OUTBOX_STATUS[1][0]]).values_list('voucher_id', flat=True)
+
+
+def get_task_queryset(model_name, ids, status=None):
+    queryset = VOUCHER_MODELS[model_name].objects.filter(id__in=ids)
+    if status is None:
+        queryset = queryset.exclude(status__in=EXCLUDED_INVOICE_STATES)
+    else:
+        queryset = queryset.filter(status__in=status)
+    return queryset.exclude(id__in=get_outbox_ids(model_name))
+
+
+def process_voucher(sri, instance):
+    if instance.status == INVOICE_STATUS[0][0]:
+        return instance.generate_electronic_invoice()['resp']
+    elif instance.status in [INVOICE_STATUS[1][0], INVOICE_STATUS[2][0]]:
+        client = instance.client if isinstance(instance, Sale) else instance.sale.client
+        return sri.notify_by_email(instance=instance, company=instance.company, client=client)['resp']
+    return True
+
+
+def process_batch(sri, model_name, instances):
+    failed = 0
+    dispatcher = OutboxDispatcher()
+    responses = sri.send_batch(instances)
+    for instance in instances:
+        if responses[instance.id]['resp']:
+            dispatcher.schedule_authorization(model_name, instance)
+        else:
+            failed += 1
+    return failed
+
+
+def process_vouchers(schema_name, model_name, ids, batch=False, status=None):
+    response = {'schema_name': schema_name, 'processed': 0, 'failed': 0, 'elapsed': 0.00}
+    start_time = time.perf_counter()
+    sri = SRI()
+    try:
+        with schema_context(schema_name):
+            instances = list(get_task_queryset(model_name, ids, status).select_related('company', 'receipt').order_by('id'))
+            if batch:
+                pending = [instance for instance in instances if instance.status == INVOICE_STATUS[0][0]]
+                if len(pending):
+                    try:
+                        response['failed'] += process_batch(sri, model_name, pending)
+                    except Exception:
+                        response['failed'] += len(pending)
+                    response['processed'] += len(pending)
+                instances = [instance for instance in instances if instance.status != INVOICE_STATUS[0][0]]
+            for instance in instances:
+                try:
+                    if not process_voucher(sri, instance):
+                        response['failed'] += 1
+                except Exception:
+                    response['failed'] += 1
+                response['processed'] += 1
+            EmailDispatcher().flush()
+    finally:
+        response['elapsed'] = time.perf_counter() - start_time
+    return response
+
+
+def close_connections():
+    connections.close_all()
 
 
 class Command(BaseCommand):
@@ -20,20 +107,53 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--date_joined', nargs='?', type=str, default=None, help='Fecha de registro')
+        parser.add_argument('--workers', nargs='?', type=int, default=1, help='Número de procesos en paralelo')
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+        parser.add_argument('--chunk_size', nargs='?', type=int, default=50, help='Comprobantes por tarea')
+        parser.add_argument('--batch', action='store_true', help='Enviar los comprobantes al SRI en lotes masivos')
+
+    def get_tasks(self, companies, date_joined, chunk_size, batch=False):
+        tasks = []
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                for model_name in VOUCHER_MODELS:
+                    ids = list(get_voucher_queryset(model_name, date_joined).values_list('id', flat=True))
+                    for index in range(0, len(ids), chunk_size):
+                        tasks.append((company.scheme.schema_name, model_name, ids[index:index + chunk_size], batch))
+        return tasks
 
     def handle(self, *args, **options):
-        sri = SRI()
         date_joined = options['date_joined'] if options['date_joined'] else datetime.now().date()
-        excluded_invoice_states = [INVOICE_STATUS[2][0], INVOICE_STATUS[3][0], INVOICE_STATUS[4][0]]
-        for company in Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA):
-            with schema_context(company.scheme.schema_name):
-                for instance in Sale.objects.filter(date_joined=date_joined, receipt__voucher_type=VOUCHER_TYPE[0][0], create_electronic_invoice=True).exclude(status__in=excluded_invoice_states):
-                    if instance.status == INVOICE_STATUS[0][0]:
-                        instance.generate_electronic_invoice()
-                    elif instance.status == INVOICE_STATUS[1][0]:
-                        sri.notify_by_email(instance=instance, company=instance.company, client=instance.client)
-                for instance in CreditNote.objects.filter(date_joined=date_joined, create_electronic_invoice=True).exclude(status__in=excluded_invoice_states):
-                    if instance.status == INVOICE_STATUS[0][0]:
-                        instance.generate_electronic_invoice()
-                    elif instance.status == INVOICE_STATUS[1][0]:
-                        sri.notify_by_email(instance=instance, company=instance.company, client=instance.client)
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        tasks = self.get_tasks(companies, date_joined, max(options['chunk_size'], 1), options['batch'])
+        summary = {}
+        start_time = time.perf_counter()
+        if options['workers'] > 1 and len(tasks) > 1:
+            close_connections()
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=close_connections) as executor:
+                futures = [executor.submit(process_vouchers, *task) for task in tasks]
+                for future in as_completed(futures):
+                    self.add_to_summary(summary, future.result())
+        else:
+            for task in tasks:
+                self.add_to_summary(summary, process_vouchers(*task))
+        self.print_summary(summary, time.perf_counter() - start_time)
+
+    def add_to_summary(self, summary, result):
+        item = summary.setdefault(result['schema_name'], {'processed': 0, 'failed': 0, 'elapsed': 0.00})
+        item['processed'] += result['processed']
+        item['failed'] += result['failed']
+        item['elapsed'] += result['elapsed']
+
+    def print_summary(self, summary, elapsed):
+        total = 0
+        failed = 0
+        for schema_name, item in sorted(summary.items()):
+            throughput = item['processed'] / item['elapsed'] if item['elapsed'] else 0.00
+            self.stdout.write(f"{schema_name}: {item['processed']} comprobantes, {item['failed']} fallidos, {item['elapsed']:.2f}s, {throughput:.2f} comprobantes/s")
+            total += item['processed']
+            failed += item['failed']
+        throughput = total / elapsed if elapsed else 0.00
+        self.stdout.write(f'Total: {total} comprobantes, {failed} fallidos en {len(summary)} empresas, {elapsed:.2f}s, {throughput:.2f} comprobantes/s')
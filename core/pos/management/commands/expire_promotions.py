@@ -0,0 +1,37 @@
+import os
+from datetime import datetime
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import transaction
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.models import Promotions, Product
+
+
+class Command(BaseCommand):
+    help = "Deactivates the promotions that reached their end date and updates the promotion price stored in the products"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date_joined', nargs='?', type=str, default=None, help='Fecha de vencimiento (por defecto la fecha actual)')
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+        parser.add_argument('--rebuild', action='store_true', help='Recalcular el precio de promoción de todos los productos')
+
+    def handle(self, *args, **options):
+        date_joined = options['date_joined'] if options['date_joined'] else datetime.now().date()
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme').order_by('id')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                with transaction.atomic():
+                    count = Promotions.expire(date_joined)
+                    if options['rebuild']:
+                        Promotions.update_prices(list(Product.objects.values_list('id', flat=True)))
+            self.stdout.write(f'{company.scheme.schema_name}: {count} promociones vencidas al {date_joined}')
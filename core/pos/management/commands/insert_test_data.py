@@ -98,8 +98,7 @@ class Command(BaseCommand):
                     detail.price = detail.product.pvp
                     detail.subtotal = float(detail.price) * detail.cant
                     detail.save()
-                    detail.product.stock += detail.cant
-                    detail.product.save()
+                purchase.increase_stock(purchase.purchasedetail_set.all())
                 purchase.calculate_invoice()
 
             user_data = [
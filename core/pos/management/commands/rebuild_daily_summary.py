@@ -0,0 +1,31 @@
+import os
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.utilities.summary import daily_summary
+
+
+class Command(BaseCommand):
+    help = "Recalculates the daily summary of sales, credit notes, purchases and expenses from the vouchers of each tenant"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start_date', nargs='?', type=str, default=None, help='Fecha de inicio (YYYY-MM-DD)')
+        parser.add_argument('--end_date', nargs='?', type=str, default=None, help='Fecha de fin (YYYY-MM-DD)')
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme').order_by('id')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                count = daily_summary.rebuild(options['start_date'], options['end_date'])
+            self.stdout.write(f'{company.scheme.schema_name}: {count} días recalculados')
@@ -0,0 +1,148 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connections, close_old_connections
+from django.db.models import Q
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.models import Sale, CreditNote, INVOICE_STATUS
+
+VOUCHER_MODELS = {
+    'sale': Sale,
+    'credit_note': CreditNote,
+}
+
+
+def get_voucher_queryset(model_name, start_date=None, end_date=None):
+    queryset = VOUCHER_MODELS[model_name].objects.filter(status__in=[INVOICE_STATUS[1][0], INVOICE_STATUS[2][0]], create_electronic_invoice=True)
+    queryset = queryset.filter(Q(pdf_authorized='') | Q(pdf_authorized__isnull=True))
+    if start_date:
+        queryset = queryset.filter(date_joined__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date_joined__lte=end_date)
+    return queryset.order_by('id')
+
+
+def render_vouchers(schema_name, model_name, ids):
+    response = {'schema_name': schema_name, 'model_name': model_name, 'processed': 0, 'failed': 0, 'rendered_ids': [], 'failed_ids': [], 'elapsed': 0.00}
+    start_time = time.perf_counter()
+    try:
+        with schema_context(schema_name):
+            queryset = VOUCHER_MODELS[model_name].objects.filter(id__in=ids).select_related('company', 'receipt')
+            for instance in queryset.order_by('id'):
+                try:
+                    instance.generate_pdf_authorized()
+                    response['rendered_ids'].append(instance.id)
+                except Exception:
+                    response['failed'] += 1
+                    response['failed_ids'].append(instance.id)
+                response['processed'] += 1
+    finally:
+        response['elapsed'] = time.perf_counter() - start_time
+    return response
+
+
+def close_connections():
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Renders the missing PDF of the authorized vouchers in a process pool, separately from the SRI authorization"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start_date', nargs='?', type=str, default=None, help='Fecha de inicio')
+        parser.add_argument('--end_date', nargs='?', type=str, default=None, help='Fecha de fin')
+        parser.add_argument('--workers', nargs='?', type=int, default=os.cpu_count() or 1, help='Número de procesos en paralelo')
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+        parser.add_argument('--chunk_size', nargs='?', type=int, default=20, help='Comprobantes por tarea')
+        parser.add_argument('--interval', nargs='?', type=float, default=2.0, help='Segundos de espera entre ciclos')
+        parser.add_argument('--loop', action='store_true', help='Ejecutar de forma continua')
+        parser.add_argument('--backoff', nargs='?', type=float, default=60.0, help='Segundos de espera inicial antes de reintentar un comprobante fallido')
+        parser.add_argument('--max_backoff', nargs='?', type=float, default=3600.0, help='Segundos de espera máxima antes de reintentar un comprobante fallido')
+
+    def get_tasks(self, options):
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        chunk_size = max(options['chunk_size'], 1)
+        tasks = []
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                for model_name in VOUCHER_MODELS:
+                    ids = [id for id in get_voucher_queryset(model_name, options['start_date'], options['end_date']).values_list('id', flat=True) if not self.is_backing_off((company.scheme.schema_name, model_name, id))]
+                    for index in range(0, len(ids), chunk_size):
+                        tasks.append((company.scheme.schema_name, model_name, ids[index:index + chunk_size]))
+        return tasks
+
+    def is_backing_off(self, key):
+        item = self.failures.get(key)
+        return item is not None and item['retry_at'] > time.monotonic()
+
+    def register_failures(self, result, options):
+        for id in result['rendered_ids']:
+            self.failures.pop((result['schema_name'], result['model_name'], id), None)
+        for id in result['failed_ids']:
+            key = (result['schema_name'], result['model_name'], id)
+            delay = options['backoff']
+            if key in self.failures:
+                delay = min(self.failures[key]['delay'] * 2, options['max_backoff'])
+            self.failures[key] = {'delay': delay, 'retry_at': time.monotonic() + delay}
+
+    def run(self, executor, tasks, options):
+        summary = {}
+        if executor is None:
+            results = (render_vouchers(*task) for task in tasks)
+        else:
+            results = (future.result() for future in as_completed([executor.submit(render_vouchers, *task) for task in tasks]))
+        for result in results:
+            self.add_to_summary(summary, result)
+            self.register_failures(result, options)
+        return summary
+
+    def handle(self, *args, **options):
+        self.failures = {}
+        executor = None
+        if options['workers'] > 1:
+            close_connections()
+            executor = ProcessPoolExecutor(max_workers=options['workers'], initializer=close_connections)
+        try:
+            while True:
+                close_old_connections()
+                start_time = time.perf_counter()
+                tasks = self.get_tasks(options)
+                summary = self.run(executor, tasks, options)
+                if summary or not options['loop']:
+                    self.print_summary(summary, time.perf_counter() - start_time)
+                if not options['loop']:
+                    break
+                if not sum(item['processed'] - item['failed'] for item in summary.values()):
+                    time.sleep(options['interval'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def add_to_summary(self, summary, result):
+        item = summary.setdefault(result['schema_name'], {'processed': 0, 'failed': 0, 'elapsed': 0.00})
+        item['processed'] += result['processed']
+        item['failed'] += result['failed']
+        item['elapsed'] += result['elapsed']
+
+    def print_summary(self, summary, elapsed):
+        total = 0
+        failed = 0
+        for schema_name, item in sorted(summary.items()):
+            throughput = item['processed'] / item['elapsed'] if item['elapsed'] else 0.00
+            self.stdout.write(f"{schema_name}: {item['processed']} PDFs, {item['failed']} fallidos, {item['elapsed']:.2f}s, {throughput:.2f} PDFs/s")
+            total += item['processed']
+            failed += item['failed']
+        throughput = total / elapsed if elapsed else 0.00
+        self.stdout.write(f'Total: {total} PDFs, {failed} fallidos en {len(summary)} empresas, {elapsed:.2f}s, {throughput:.2f} PDFs/s')
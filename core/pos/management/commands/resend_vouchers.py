@@ -0,0 +1,164 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import django
+from django.core.management import BaseCommand, CommandError
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.models import Sale, CreditNote, INVOICE_STATUS, VOUCHER_TYPE
+from core.pos.management.commands.electronic_billing import VOUCHER_MODELS, process_vouchers, close_connections, get_outbox_ids
+
+RESEND_STATES = [INVOICE_STATUS[0][0], INVOICE_STATUS[1][0], INVOICE_STATUS[2][0]]
+
+
+def get_voucher_queryset(model_name, start_date, end_date, status):
+    if model_name == 'sale':
+        queryset = Sale.objects.filter(receipt__voucher_type=VOUCHER_TYPE[0][0], create_electronic_invoice=True)
+    else:
+        queryset = CreditNote.objects.filter(create_electronic_invoice=True)
+    queryset = queryset.filter(date_joined__range=[start_date, end_date], status__in=status)
+    return queryset.exclude(id__in=get_outbox_ids(model_name)).order_by('id')
+
+
+class Checkpoint:
+    """JSON file with the planned tasks of a run and the ones already completed, rewritten atomically after each task."""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+
+    def load(self):
+        if self.path and os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as file:
+                self.data = json.load(file)
+        return self.data
+
+    def create(self, parameters, tasks):
+        self.data = {'parameters': parameters, 'tasks': tasks, 'completed': [], 'results': []}
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        path_temp = f'{self.path}.tmp'
+        with open(path_temp, 'w', encoding='utf-8') as file:
+            json.dump(self.data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path_temp, self.path)
+
+    def get_pending(self):
+        completed = set(self.data['completed'])
+        return [(index, task) for index, task in enumerate(self.data['tasks']) if index not in completed]
+
+    def complete(self, index, result):
+        self.data['completed'].append(index)
+        self.data['results'].append(result)
+        self.save()
+
+    def remove(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Command(BaseCommand):
+    help = "Regenerates and resends the electronic vouchers of a date range with bounded parallelism, resuming from a checkpoint file when a run is interrupted"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start_date', nargs='?', type=str, required=True, help='Fecha de inicio')
+        parser.add_argument('--end_date', nargs='?', type=str, required=True, help='Fecha de fin')
+        parser.add_argument('--status', nargs='*', type=str, choices=RESEND_STATES, default=RESEND_STATES[0:2], help='Estados de los comprobantes')
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+        parser.add_argument('--workers', nargs='?', type=int, default=1, help='Número de procesos en paralelo')
+        parser.add_argument('--chunk_size', nargs='?', type=int, default=50, help='Comprobantes por tarea')
+        parser.add_argument('--batch', action='store_true', help='Enviar los comprobantes al SRI en lotes masivos')
+        parser.add_argument('--checkpoint', nargs='?', type=str, default=os.path.join(settings.BASE_DIR, 'resend_vouchers.json'), help='Archivo de control para reanudar la ejecución')
+        parser.add_argument('--restart', action='store_true', help='Descartar el archivo de control y empezar de nuevo')
+        parser.add_argument('--dry_run', action='store_true', help='Mostrar la cantidad de comprobantes por empresa sin procesarlos')
+
+    def get_parameters(self, options):
+        return {name: options[name] for name in ['start_date', 'end_date', 'status', 'tenants', 'chunk_size', 'batch']}
+
+    def get_tasks(self, options):
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme').order_by('id')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        chunk_size = max(options['chunk_size'], 1)
+        tasks = []
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                for model_name in VOUCHER_MODELS:
+                    ids = list(get_voucher_queryset(model_name, options['start_date'], options['end_date'], options['status']).values_list('id', flat=True))
+                    for index in range(0, len(ids), chunk_size):
+                        tasks.append([company.scheme.schema_name, model_name, ids[index:index + chunk_size], options['batch'], options['status']])
+        return tasks
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.print_volume(self.get_tasks(options))
+            return
+        checkpoint = Checkpoint(options['checkpoint'])
+        if options['restart']:
+            checkpoint.remove()
+        if checkpoint.load() is None:
+            checkpoint.create(self.get_parameters(options), self.get_tasks(options))
+        elif checkpoint.data['parameters'] != self.get_parameters(options):
+            raise CommandError(f"El archivo de control {options['checkpoint']} pertenece a otra ejecución, utilice --restart para descartarlo")
+        else:
+            self.stdout.write(f"Reanudando: {len(checkpoint.data['completed'])} de {len(checkpoint.data['tasks'])} tareas completadas")
+        start_time = time.perf_counter()
+        self.run(checkpoint, max(options['workers'], 1))
+        summary = {}
+        for result in checkpoint.data['results']:
+            self.add_to_summary(summary, result)
+        self.print_summary(summary, time.perf_counter() - start_time)
+        checkpoint.remove()
+
+    def run(self, checkpoint, workers):
+        pending = checkpoint.get_pending()
+        if workers == 1:
+            for index, task in pending:
+                checkpoint.complete(index, process_vouchers(*task))
+            return
+        close_connections()
+        with ProcessPoolExecutor(max_workers=workers, initializer=close_connections) as executor:
+            futures = {}
+            while pending or futures:
+                while pending and len(futures) < workers:
+                    index, task = pending.pop(0)
+                    futures[executor.submit(process_vouchers, *task)] = index
+                done, not_done = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    checkpoint.complete(futures.pop(future), future.result())
+
+    def print_volume(self, tasks):
+        volume = {}
+        for schema_name, model_name, ids, batch, status in tasks:
+            item = volume.setdefault(schema_name, {name: 0 for name in VOUCHER_MODELS})
+            item[model_name] += len(ids)
+        for schema_name, item in volume.items():
+            self.stdout.write(f"{schema_name}: {item['sale']} facturas, {item['credit_note']} notas de crédito")
+        self.stdout.write(f'Total: {sum(len(task[2]) for task in tasks)} comprobantes en {len(volume)} empresas, {len(tasks)} tareas')
+
+    def add_to_summary(self, summary, result):
+        item = summary.setdefault(result['schema_name'], {'processed': 0, 'failed': 0, 'elapsed': 0.00})
+        item['processed'] += result['processed']
+        item['failed'] += result['failed']
+        item['elapsed'] += result['elapsed']
+
+    def print_summary(self, summary, elapsed):
+        total = 0
+        failed = 0
+        for schema_name, item in sorted(summary.items()):
+            self.stdout.write(f"{schema_name}: {item['processed']} comprobantes, {item['failed']} fallidos, {item['elapsed']:.2f}s")
+            total += item['processed']
+            failed += item['failed']
+        self.stdout.write(f'Total: {total} comprobantes, {failed} fallidos en {len(summary)} empresas, {elapsed:.2f}s')
@@ -0,0 +1,28 @@
+from django.core.management import BaseCommand
+
+from core.pos.utilities.sri_stub import SRIStubConfig, create_server
+
+
+class Command(BaseCommand):
+    help = "Runs a local stand-in of the SRI reception and authorization web services for offline tests and benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', nargs='?', type=str, default='127.0.0.1', help='Dirección de escucha')
+        parser.add_argument('--port', nargs='?', type=int, default=8089, help='Puerto de escucha')
+        parser.add_argument('--latency', nargs='?', type=float, default=50, help='Latencia por llamada en milisegundos')
+        parser.add_argument('--jitter', nargs='?', type=float, default=0, help='Variación de la latencia en milisegundos')
+        parser.add_argument('--devuelta_rate', nargs='?', type=float, default=0.00, help='Proporción de comprobantes DEVUELTA')
+        parser.add_argument('--rejected_rate', nargs='?', type=float, default=0.00, help='Proporción de comprobantes NO AUTORIZADO')
+        parser.add_argument('--outage_rate', nargs='?', type=float, default=0.00, help='Proporción de llamadas con error 503')
+        parser.add_argument('--pending_polls', nargs='?', type=int, default=0, help='Consultas sin autorización antes de autorizar')
+
+    def handle(self, *args, **options):
+        config = SRIStubConfig(latency=options['latency'], jitter=options['jitter'], devuelta_rate=options['devuelta_rate'], rejected_rate=options['rejected_rate'], outage_rate=options['outage_rate'], pending_polls=options['pending_polls'])
+        server = create_server(options['host'], options['port'], config)
+        self.stdout.write(f"SRI de pruebas en http://{options['host']}:{options['port']}/ (SRI_BASE_URL)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,34 @@
+import os
+from datetime import datetime, timedelta
+
+import django
+from django.core.management import BaseCommand
+
+from config import settings
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import transaction
+from django_tenants.utils import schema_context
+from core.tenant.models import Company
+from core.pos.utilities.kardex import kardex
+
+
+class Command(BaseCommand):
+    help = "Stores the stock of every product at the end of a day so that the kardex only has to add the movements after the last snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date_joined', nargs='?', type=str, default=None, help='Fecha de corte (por defecto el día anterior)')
+        parser.add_argument('--tenants', nargs='*', type=str, default=None, help='Esquemas a procesar')
+
+    def handle(self, *args, **options):
+        date_joined = options['date_joined'] if options['date_joined'] else datetime.now().date() - timedelta(days=1)
+        companies = Company.objects.filter().exclude(scheme__schema_name=settings.DEFAULT_SCHEMA).select_related('scheme').order_by('id')
+        if options['tenants']:
+            companies = companies.filter(scheme__schema_name__in=options['tenants'])
+        for company in companies:
+            with schema_context(company.scheme.schema_name):
+                with transaction.atomic():
+                    snapshots = kardex.take_snapshots(date_joined)
+            self.stdout.write(f'{company.scheme.schema_name}: {len(snapshots)} productos al {date_joined}')
@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management import BaseCommand, CommandError
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.db import connections, transaction
+from django_tenants.utils import schema_context
+from core.pos.models import Receipt, VOUCHER_TYPE
+from core.pos.utilities.sequence import SequenceAllocator
+
+
+def allocate_numbers(schema_name, receipt_id, allocations, block_size, rollback_every):
+    connections.close_all()
+    allocator = SequenceAllocator(block_size=block_size)
+    numbers = []
+    with schema_context(schema_name):
+        receipt = Receipt.objects.get(pk=receipt_id)
+        for index in range(allocations):
+            try:
+                with transaction.atomic():
+                    number = allocator.allocate(receipt)
+                    if rollback_every and (index + 1) % rollback_every == 0:
+                        raise RuntimeError('rollback')
+                    numbers.append(number)
+            except RuntimeError:
+                pass
+    allocator.close()
+    connections.close_all()
+    return numbers
+
+
+class Command(BaseCommand):
+    help = "Allocates voucher numbers from parallel processes on a temporary Receipt and checks for duplicates and gaps"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema_name', nargs='?', type=str, required=True, help='Nombre del esquema')
+        parser.add_argument('--workers', nargs='?', type=int, default=8, help='Número de procesos en paralelo')
+        parser.add_argument('--allocations', nargs='?', type=int, default=200, help='Secuenciales por proceso')
+        parser.add_argument('--block_size', nargs='?', type=int, default=1, help='Tamaño del bloque reservado por proceso')
+        parser.add_argument('--rollback_every', nargs='?', type=int, default=0, help='Revertir una de cada N transacciones')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        with schema_context(options['schema_name']):
+            receipt = Receipt.objects.create(voucher_type=VOUCHER_TYPE[0][0], establishment_code='999', issuing_point_code='999', sequence=0)
+        try:
+            connections.close_all()
+            start_time = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(allocate_numbers, options['schema_name'], receipt.id, options['allocations'], options['block_size'], options['rollback_every']) for index in range(workers)]
+                numbers = [number for future in futures for number in future.result()]
+            elapsed = time.perf_counter() - start_time
+            with schema_context(options['schema_name']):
+                sequence = Receipt.objects.get(pk=receipt.id).sequence
+            duplicates = len(numbers) - len(set(numbers))
+            gaps = sequence - len(set(numbers))
+            self.stdout.write(f'{len(numbers)} secuenciales en {elapsed:.2f}s ({len(numbers) / elapsed:.2f}/s), secuencia final {sequence}')
+            self.stdout.write(f'Duplicados: {duplicates}, huecos: {gaps}')
+            if duplicates:
+                raise CommandError('Se encontraron secuenciales duplicados')
+            if gaps and options['block_size'] <= 1:
+                raise CommandError('Se encontraron huecos en la secuencia con bloqueo por fila')
+            self.stdout.write('OK')
+        finally:
+            with schema_context(options['schema_name']):
+                Receipt.objects.filter(pk=receipt.id).delete()
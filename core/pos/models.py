@@ -1,29 +1,34 @@
 import base64
 import math
-import tempfile
-import time
 from datetime import datetime
+from decimal import Decimal
 from io import BytesIO
-from xml.etree import ElementTree
 
 import barcode
 import unicodedata
 from barcode import writer
 from crum import get_current_request
-from django.core.files import File
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.files.base import ContentFile
 from django.db import models
+from django.db.backends.utils import format_number
 from django.db.models import FloatField
-from django.db.models import Sum
-from django.db.models.functions import Coalesce
+from django.db.models import Sum, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Upper
 from django.forms import model_to_dict
+from django.utils import timezone
 
 from config import settings
 from core.pos.choices import *
 from core.pos.utilities import printer
+from core.pos.utilities.archive import archive_storage
+from core.pos.utilities.catalog import product_catalog
+from core.pos.utilities.kardex import kardex
+from core.pos.utilities.outbox import OutboxDispatcher
+from core.pos.utilities.sequence import sequence_allocator
 from core.pos.utilities.sri import SRI
+from core.pos.utilities.voucher_xml import InvoiceXMLSerializer, CreditNoteXMLSerializer
 from core.security.fields import CustomImageField, CustomFileField
-from core.tenant.choices import RETENTION_AGENT
 from core.tenant.models import Company, ENVIRONMENT_TYPE
 from core.user.models import User
 
@@ -77,6 +82,7 @@ class Product(models.Model):
     barcode = CustomImageField(folder='barcode', null=True, blank=True, verbose_name='Código de barra')
     inventoried = models.BooleanField(default=True, verbose_name='¿Es inventariado?')
     stock = models.IntegerField(default=0)
+    price_promotion = models.DecimalField(max_digits=9, decimal_places=2, default=0.00, editable=False, verbose_name='Precio de Promoción')
     with_tax = models.BooleanField(default=True, verbose_name='¿Se cobra impuesto?')
     vat_percentage = models.IntegerField(choices=VAT_PERCENTAGE, default=VAT_PERCENTAGE[3][0], verbose_name='Porcentaje del IVA')
 
@@ -95,10 +101,7 @@ class Product(models.Model):
         return 'No inventariado'
 
     def get_price_promotion(self):
-        promotions = self.promotionsdetail_set.filter(promotion__state=True).first()
-        if promotions:
-            return promotions.price_final
-        return 0.00
+        return self.price_promotion
 
     def get_price_current(self):
         price_promotion = self.get_price_promotion()
@@ -142,7 +145,11 @@ class Product(models.Model):
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         self.generate_barcode()
-        super(Product, self).save()
+        if self._state.adding:
+            super(Product, self).save()
+            kardex.register([kardex.movement(self, STOCK_MOVEMENT_TYPE[0][0], self.stock)], update_stock=False)
+        else:
+            super(Product, self).save(update_fields=[field.name for field in self._meta.concrete_fields if not field.primary_key and field.name not in ['stock', 'price_promotion']])
 
     class Meta:
         verbose_name = 'Producto'
@@ -155,6 +162,10 @@ class Product(models.Model):
             ('delete_product', 'Can delete Producto'),
             ('adjust_product_stock', 'Can adjust_product_stock Producto'),
         )
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='pos_product_name_trgm'),
+            GinIndex(OpClass(Upper('code'), name='gin_trgm_ops'), name='pos_product_code_trgm'),
+        ]
 
 
 class Purchase(models.Model):
@@ -175,12 +186,14 @@ class Purchase(models.Model):
         self.subtotal = subtotal
         self.save()
 
+    def increase_stock(self, details):
+        kardex.register([kardex.movement(detail.product_id, STOCK_MOVEMENT_TYPE[3][0], detail.cant, self.number) for detail in details])
+
     def delete(self, using=None, keep_parents=False):
         try:
-            for i in self.purchasedetail_set.all():
-                i.product.stock -= i.cant
-                i.product.save()
-                i.delete()
+            details = list(self.purchasedetail_set.all())
+            kardex.register([kardex.movement(detail.product_id, STOCK_MOVEMENT_TYPE[4][0], -detail.cant, self.number) for detail in details])
+            self.purchasedetail_set.all().delete()
         except:
             pass
         super(Purchase, self).delete()
@@ -203,6 +216,9 @@ class Purchase(models.Model):
             ('add_purchase', 'Can add Compra'),
             ('delete_purchase', 'Can delete Compra'),
         )
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),
+        ]
 
 
 class PurchaseDetail(models.Model):
@@ -266,6 +282,9 @@ class Client(models.Model):
     class Meta:
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
+        indexes = [
+            GinIndex(OpClass(Upper('dni'), name='gin_trgm_ops'), name='pos_client_dni_trgm'),
+        ]
 
 
 class Receipt(models.Model):
@@ -290,6 +309,11 @@ class Receipt(models.Model):
     def get_sequence(self):
         return f'{self.sequence:09d}'
 
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        super(Receipt, self).save()
+        sequence_allocator.drop(self.pk)
+
     def toJSON(self):
         item = model_to_dict(self)
         item['name'] = self.name
@@ -326,8 +350,8 @@ class Sale(models.Model):
     environment_type = models.PositiveIntegerField(choices=ENVIRONMENT_TYPE, default=ENVIRONMENT_TYPE[0][0])
     access_code = models.CharField(max_length=49, null=True, blank=True, verbose_name='Clave de acceso')
     authorization_date = models.DateField(null=True, blank=True, verbose_name='Fecha de emisión')
-    xml_authorized = CustomFileField(null=True, blank=True, verbose_name='XML Autorizado')
-    pdf_authorized = CustomFileField(folder='pdf_authorized', null=True, blank=True, verbose_name='PDF Autorizado')
+    xml_authorized = CustomFileField(null=True, blank=True, storage=archive_storage, verbose_name='XML Autorizado')
+    pdf_authorized = CustomFileField(folder='pdf_authorized', null=True, blank=True, storage=archive_storage, verbose_name='PDF Autorizado')
     create_electronic_invoice = models.BooleanField(default=True, verbose_name='Crear factura electrónica')
     status = models.CharField(max_length=50, choices=INVOICE_STATUS, default=INVOICE_STATUS[0][0], verbose_name='Estado')
 
@@ -357,12 +381,12 @@ class Sale(models.Model):
 
     def get_xml_authorized(self):
         if self.xml_authorized:
-            return f'{settings.MEDIA_URL}/{self.xml_authorized}'
+            return self.xml_authorized.url
         return None
 
     def get_pdf_authorized(self):
         if self.pdf_authorized:
-            return f'{settings.MEDIA_URL}/{self.pdf_authorized}'
+            return self.pdf_authorized.url
         return None
 
     def get_voucher_number_full(self):
@@ -374,6 +398,10 @@ class Sale(models.Model):
         number = self.receipt.sequence + 1 if increase else self.receipt.sequence
         return f'{number:09d}'
 
+    def allocate_voucher_number(self):
+        self.voucher_number = f'{sequence_allocator.allocate(self.receipt):09d}'
+        self.voucher_number_full = self.get_voucher_number_full()
+
     def generate_voucher_number_full(self):
         request = get_current_request()
         if self.company_id is None:
@@ -383,98 +411,29 @@ class Sale(models.Model):
         self.voucher_number = self.generate_voucher_number()
         return self.get_voucher_number_full()
 
-    def generate_pdf_authorized(self):
+    def get_context_pdf_authorized(self):
         rv = BytesIO()
         barcode.Code128(self.access_code, writer=barcode.writer.ImageWriter()).write(rv, options={'text_distance': 3.0, 'font_size': 6})
         file = base64.b64encode(rv.getvalue()).decode("ascii")
-        context = {'sale': self, 'access_code_barcode': f"data:image/png;base64,{file}"}
-        pdf_file = printer.create_pdf(context=context, template_name='sale/format/invoice.html')
-        with tempfile.NamedTemporaryFile(delete=True) as file_temp:
-            file_temp.write(pdf_file)
-            file_temp.flush()
-            self.pdf_authorized.save(name=f'{self.receipt.get_name_xml()}_{self.access_code}.pdf', content=File(file_temp))
-
-    def generate_xml(self):
+        return {'sale': self, 'access_code_barcode': f"data:image/png;base64,{file}"}
+
+    def generate_pdf_authorized(self):
+        pdf_file = printer.create_pdf(context=self.get_context_pdf_authorized(), template_name='sale/format/invoice.html')
+        self.save_pdf_authorized(pdf_file)
+
+    def save_pdf_authorized(self, pdf_file):
+        self.pdf_authorized.save(name=f'{self.receipt.get_name_xml()}_{self.access_code}.pdf', content=ContentFile(pdf_file), save=False)
+        type(self).objects.filter(pk=self.pk).update(pdf_authorized=self.pdf_authorized.name)
+
+    def get_details_xml(self):
+        return self.saledetail_set.select_related('product').order_by('id')
+
+    def generate_xml(self, stream=None):
         access_key = SRI().create_access_key(self)
-        root = ElementTree.Element('factura', id="comprobante", version="1.0.0")
-        # infoTributaria
-        xml_tax_info = ElementTree.SubElement(root, 'infoTributaria')
-        ElementTree.SubElement(xml_tax_info, 'ambiente').text = str(self.company.environment_type)
-        ElementTree.SubElement(xml_tax_info, 'tipoEmision').text = str(self.company.emission_type)
-        ElementTree.SubElement(xml_tax_info, 'razonSocial').text = self.company.business_name
-        ElementTree.SubElement(xml_tax_info, 'nombreComercial').text = self.company.tradename
-        ElementTree.SubElement(xml_tax_info, 'ruc').text = self.company.ruc
-        ElementTree.SubElement(xml_tax_info, 'claveAcceso').text = access_key
-        ElementTree.SubElement(xml_tax_info, 'codDoc').text = self.receipt.voucher_type
-        ElementTree.SubElement(xml_tax_info, 'estab').text = self.receipt.establishment_code
-        ElementTree.SubElement(xml_tax_info, 'ptoEmi').text = self.receipt.issuing_point_code
-        ElementTree.SubElement(xml_tax_info, 'secuencial').text = self.voucher_number
-        ElementTree.SubElement(xml_tax_info, 'dirMatriz').text = self.company.main_address
-        # infoFactura
-        xml_info_invoice = ElementTree.SubElement(root, 'infoFactura')
-        ElementTree.SubElement(xml_info_invoice, 'fechaEmision').text = datetime.now().strftime('%d/%m/%Y')
-        ElementTree.SubElement(xml_info_invoice, 'dirEstablecimiento').text = self.company.establishment_address
-        ElementTree.SubElement(xml_info_invoice, 'obligadoContabilidad').text = self.company.obligated_accounting
-        ElementTree.SubElement(xml_info_invoice, 'tipoIdentificacionComprador').text = self.client.identification_type
-        ElementTree.SubElement(xml_info_invoice, 'razonSocialComprador').text = self.client.user.names
-        ElementTree.SubElement(xml_info_invoice, 'identificacionComprador').text = self.client.dni
-        ElementTree.SubElement(xml_info_invoice, 'direccionComprador').text = self.client.address
-        ElementTree.SubElement(xml_info_invoice, 'totalSinImpuestos').text = f'{self.get_full_subtotal():.2f}'
-        ElementTree.SubElement(xml_info_invoice, 'totalDescuento').text = f'{self.total_dscto:.2f}'
-        # totalConImpuestos
-        xml_total_with_taxes = ElementTree.SubElement(xml_info_invoice, 'totalConImpuestos')
-        # totalImpuesto
-        if self.subtotal_0 != 0.0000:
-            xml_total_tax_0 = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
-            ElementTree.SubElement(xml_total_tax_0, 'codigo').text = str(TAX_CODES[0][0])
-            ElementTree.SubElement(xml_total_tax_0, 'codigoPorcentaje').text = '0'
-            ElementTree.SubElement(xml_total_tax_0, 'baseImponible').text = f'{self.subtotal_0:.2f}'
-            ElementTree.SubElement(xml_total_tax_0, 'valor').text = '0.00'
-        if self.subtotal_12 != 0.0000:
-            xml_total_tax12 = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
-            ElementTree.SubElement(xml_total_tax12, 'codigo').text = str(TAX_CODES[0][0])
-            ElementTree.SubElement(xml_total_tax12, 'codigoPorcentaje').text = str(self.company.vat_percentage)
-            ElementTree.SubElement(xml_total_tax12, 'baseImponible').text = f'{self.subtotal_12:.2f}'
-            ElementTree.SubElement(xml_total_tax12, 'valor').text = f'{self.total_iva:.2f}'
-        ElementTree.SubElement(xml_info_invoice, 'propina').text = '0.00'
-        ElementTree.SubElement(xml_info_invoice, 'importeTotal').text = f'{self.total:.2f}'
-        ElementTree.SubElement(xml_info_invoice, 'moneda').text = 'DOLAR'
-        # pagos
-        xml_payments = ElementTree.SubElement(xml_info_invoice, 'pagos')
-        xml_payment = ElementTree.SubElement(xml_payments, 'pago')
-        ElementTree.SubElement(xml_payment, 'formaPago').text = self.payment_method
-        ElementTree.SubElement(xml_payment, 'total').text = f'{self.total:.2f}'
-        ElementTree.SubElement(xml_payment, 'plazo').text = str(self.time_limit)
-        ElementTree.SubElement(xml_payment, 'unidadTiempo').text = 'dias'
-        # detalles
-        xml_details = ElementTree.SubElement(root, 'detalles')
-        for detail in self.saledetail_set.all():
-            xml_detail = ElementTree.SubElement(xml_details, 'detalle')
-            ElementTree.SubElement(xml_detail, 'codigoPrincipal').text = detail.product.code
-            ElementTree.SubElement(xml_detail, 'descripcion').text = detail.product.name
-            ElementTree.SubElement(xml_detail, 'cantidad').text = f'{detail.cant:.2f}'
-            ElementTree.SubElement(xml_detail, 'precioUnitario').text = f'{detail.price:.2f}'
-            ElementTree.SubElement(xml_detail, 'descuento').text = f'{detail.total_dscto:.2f}'
-            ElementTree.SubElement(xml_detail, 'precioTotalSinImpuesto').text = f'{detail.total:.2f}'
-            xml_taxes = ElementTree.SubElement(xml_detail, 'impuestos')
-            xml_tax = ElementTree.SubElement(xml_taxes, 'impuesto')
-            ElementTree.SubElement(xml_tax, 'codigo').text = str(TAX_CODES[0][0])
-            if detail.product.with_tax:
-                ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = str(detail.product.vat_percentage)
-                ElementTree.SubElement(xml_tax, 'tarifa').text = f'{detail.iva * 100:.2f}'
-                ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
-                ElementTree.SubElement(xml_tax, 'valor').text = f'{detail.total_iva:.2f}'
-            else:
-                ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = "0"
-                ElementTree.SubElement(xml_tax, 'tarifa').text = "0"
-                ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
-                ElementTree.SubElement(xml_tax, 'valor').text = "0"
-        # infoAdicional
-        if len(self.additional_info):
-            xml_additional_info = ElementTree.SubElement(root, 'infoAdicional')
-            for additional_info in self.additional_info:
-                ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre=additional_info['name']).text = additional_info['value']
-        return ElementTree.tostring(root, xml_declaration=True, encoding='utf-8').decode('utf-8').replace("'", '"'), access_key
+        serializer = InvoiceXMLSerializer(self, access_key)
+        if stream is not None:
+            return serializer.write(stream, self.get_details_xml().iterator(chunk_size=500)), access_key
+        return serializer.to_string(self.get_details_xml()), access_key
 
     def is_invoice(self):
         return self.receipt.voucher_type == VOUCHER_TYPE[0][0]
@@ -508,22 +467,43 @@ class Sale(models.Model):
 
     def calculate_detail(self):
         for detail in self.saledetail_set.filter():
-            detail.price = float(detail.price)
-            detail.iva = float(self.iva)
-            detail.price_with_vat = detail.price + (detail.price * detail.iva)
-            detail.subtotal = detail.price * detail.cant
-            detail.total_dscto = detail.subtotal * float(detail.dscto)
-            detail.total_iva = (detail.subtotal - detail.total_dscto) * detail.iva
-            detail.total = detail.subtotal - detail.total_dscto
+            detail.calculate(self.iva)
             detail.save()
 
-    def calculate_invoice(self):
-        self.subtotal_0 = float(self.saledetail_set.filter(product__with_tax=False).aggregate(result=Coalesce(Sum('total'), 0.00, output_field=FloatField()))['result'])
-        self.subtotal_12 = float(self.saledetail_set.filter(product__with_tax=True).aggregate(result=Coalesce(Sum('total'), 0.00, output_field=FloatField()))['result'])
-        self.total_iva = float(self.saledetail_set.filter(product__with_tax=True).aggregate(result=Coalesce(Sum('total_iva'), 0.00, output_field=FloatField()))['result'])
-        self.total_dscto = float(self.saledetail_set.filter().aggregate(result=Coalesce(Sum('total_dscto'), 0.00, output_field=FloatField()))['result'])
+    def calculate_totals(self, details):
+        self.subtotal_0 = float(sum(detail.total for detail in details if not detail.product.with_tax))
+        self.subtotal_12 = float(sum(detail.total for detail in details if detail.product.with_tax))
+        self.total_iva = float(sum(detail.total_iva for detail in details if detail.product.with_tax))
+        self.total_dscto = float(sum(detail.total_dscto for detail in details))
         self.total = float(self.get_full_subtotal()) + float(self.total_iva)
+
+    def calculate_invoice(self):
+        self.calculate_totals(list(self.saledetail_set.select_related('product')))
+        self.save()
+
+    def decrease_stock(self, details):
+        kardex.register([kardex.movement(detail.product_id, STOCK_MOVEMENT_TYPE[1][0], -detail.cant, self.voucher_number_full) for detail in details if detail.product.inventoried])
+
+    def save_with_details(self, products):
+        catalog = Product.objects.in_bulk([int(i['id']) for i in products])
+        details = []
+        for i in products:
+            detail = SaleDetail()
+            detail.product = catalog[int(i['id'])]
+            detail.cant = int(i['cant'])
+            detail.price = float(i['price_current'])
+            detail.dscto = float(i['dscto']) / 100
+            detail.round_decimals()
+            detail.calculate(self.iva)
+            detail.round_decimals()
+            details.append(detail)
+        self.calculate_totals(details)
         self.save()
+        for detail in details:
+            detail.sale = self
+        SaleDetail.objects.bulk_create(details)
+        self.decrease_stock(details)
+        return details
 
     def edit(self):
         super(Sale, self).save()
@@ -531,16 +511,14 @@ class Sale(models.Model):
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         if self.pk is None:
-            self.receipt.sequence = int(self.voucher_number)
-            self.receipt.save()
+            Receipt.objects.filter(pk=self.receipt_id, sequence__lt=int(self.voucher_number)).update(sequence=int(self.voucher_number))
         super(Sale, self).save()
 
     def delete(self, using=None, keep_parents=False):
         try:
-            for i in self.saledetail_set.filter(product__inventoried=True):
-                i.product.stock += i.cant
-                i.product.save()
-                i.delete()
+            details = list(self.saledetail_set.filter(product__inventoried=True))
+            kardex.register([kardex.movement(detail.product_id, STOCK_MOVEMENT_TYPE[2][0], detail.cant, self.voucher_number_full) for detail in details])
+            self.saledetail_set.filter(id__in=[detail.id for detail in details]).delete()
         except:
             pass
         super(Sale, self).delete()
@@ -554,13 +532,11 @@ class Sale(models.Model):
                 result = sri.validate_xml(instance=self, xml=result['xml'])
                 if result['resp']:
                     result = sri.authorize_xml(instance=self)
-                    index = 1
-                    while not result['resp'] and index < 3:
-                        time.sleep(1)
-                        result = sri.authorize_xml(instance=self)
-                        index += 1
                     if result['resp']:
                         result['print_url'] = self.get_pdf_authorized()
+                    elif result.get('pending'):
+                        OutboxDispatcher().schedule_authorization(OUTBOX_VOUCHER[0][0], self)
+                        result['error'] = 'El comprobante fue recibido por el SRI y se encuentra pendiente de autorización'
                     return result
         return result
 
@@ -574,6 +550,9 @@ class Sale(models.Model):
             ('delete_sale', 'Can delete Venta'),
             ('view_sale_client', 'Can view_sale_client Venta'),
         )
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),
+        ]
 
 
 class SaleDetail(models.Model):
@@ -595,6 +574,21 @@ class SaleDetail(models.Model):
     def get_iva_percent(self):
         return int(self.iva * 100)
 
+    def calculate(self, iva):
+        self.price = float(self.price)
+        self.iva = float(iva)
+        self.price_with_vat = self.price + (self.price * self.iva)
+        self.subtotal = self.price * self.cant
+        self.total_dscto = self.subtotal * float(self.dscto)
+        self.total_iva = (self.subtotal - self.total_dscto) * self.iva
+        self.total = self.subtotal - self.total_dscto
+
+    def round_decimals(self):
+        for field in self._meta.concrete_fields:
+            if isinstance(field, models.DecimalField):
+                value = field.to_python(getattr(self, field.attname))
+                setattr(self, field.attname, Decimal(format_number(value, field.max_digits, field.decimal_places)))
+
     def toJSON(self, args=None):
         item = model_to_dict(self, exclude=['sale'])
         item['product'] = self.product.toJSON()
@@ -657,6 +651,9 @@ class CtasCollect(models.Model):
             ('add_ctas_collect', 'Can add Cuenta por cobrar'),
             ('delete_ctas_collect', 'Can delete Cuenta por cobrar'),
         )
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),
+        ]
 
 
 class PaymentsCtaCollect(models.Model):
@@ -729,6 +726,9 @@ class DebtsPay(models.Model):
             ('add_debts_pay', 'Can add Cuenta por pagar'),
             ('delete_debts_pay', 'Can delete Cuenta por pagar'),
         )
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),
+        ]
 
 
 class PaymentsDebtsPay(models.Model):
@@ -809,6 +809,9 @@ class Expenses(models.Model):
     class Meta:
         verbose_name = 'Gasto'
         verbose_name_plural = 'Gastos'
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),
+        ]
 
 
 class Promotions(models.Model):
@@ -825,6 +828,28 @@ class Promotions(models.Model):
         item['end_date'] = self.end_date.strftime('%Y-%m-%d')
         return item
 
+    def get_product_ids(self):
+        return list(self.promotionsdetail_set.values_list('product_id', flat=True))
+
+    @staticmethod
+    def update_prices(product_ids):
+        price_promotion = PromotionsDetail.objects.filter(product_id=OuterRef('pk'), promotion__state=True).order_by('id').values('price_final')[:1]
+        Product.objects.filter(id__in=product_ids).update(price_promotion=Coalesce(Subquery(price_promotion), Value(Decimal('0.00'))))
+        product_catalog.invalidate()
+
+    @classmethod
+    def expire(cls, date_joined):
+        promotions = cls.objects.filter(end_date__lte=date_joined, state=True)
+        product_ids = list(PromotionsDetail.objects.filter(promotion__in=promotions).values_list('product_id', flat=True))
+        count = promotions.update(state=False)
+        cls.update_prices(product_ids)
+        return count
+
+    def delete(self, using=None, keep_parents=False):
+        product_ids = self.get_product_ids()
+        super(Promotions, self).delete()
+        self.update_prices(product_ids)
+
     class Meta:
         verbose_name = 'Promoción'
         verbose_name_plural = 'Promociones'
@@ -909,8 +934,8 @@ class CreditNote(models.Model):
     environment_type = models.PositiveIntegerField(choices=ENVIRONMENT_TYPE, default=ENVIRONMENT_TYPE[0][0])
     access_code = models.CharField(max_length=49, null=True, blank=True, verbose_name='Clave de acceso')
     authorization_date = models.DateTimeField(null=True, blank=True, verbose_name='Fecha de autorización')
-    xml_authorized = CustomFileField(null=True, blank=True, verbose_name='XML Autorizado')
-    pdf_authorized = CustomFileField(upload_to='pdf_authorized', verbose_name='PDF Autorizado')
+    xml_authorized = CustomFileField(null=True, blank=True, storage=archive_storage, verbose_name='XML Autorizado')
+    pdf_authorized = CustomFileField(upload_to='pdf_authorized', storage=archive_storage, verbose_name='PDF Autorizado')
     create_electronic_invoice = models.BooleanField(default=True, verbose_name='Crear factura electrónica')
     status = models.CharField(max_length=50, choices=INVOICE_STATUS, default=INVOICE_STATUS[0][0], verbose_name='Estado')
 
@@ -934,12 +959,12 @@ class CreditNote(models.Model):
 
     def get_xml_authorized(self):
         if self.xml_authorized:
-            return f'{settings.MEDIA_URL}/{self.xml_authorized}'
+            return self.xml_authorized.url
         return None
 
     def get_pdf_authorized(self):
         if self.pdf_authorized:
-            return f'{settings.MEDIA_URL}/{self.pdf_authorized}'
+            return self.pdf_authorized.url
         return None
 
     def get_voucher_number_full(self):
@@ -949,6 +974,10 @@ class CreditNote(models.Model):
         number = int(self.receipt.get_sequence()) + 1
         return f'{number:09d}'
 
+    def allocate_voucher_number(self):
+        self.voucher_number = f'{sequence_allocator.allocate(self.receipt):09d}'
+        self.voucher_number_full = self.get_voucher_number_full()
+
     def generate_voucher_number_full(self):
         request = get_current_request()
         self.company = request.tenant.company
@@ -956,97 +985,29 @@ class CreditNote(models.Model):
         self.voucher_number = self.generate_voucher_number()
         return self.get_voucher_number_full()
 
-    def generate_pdf_authorized(self):
+    def get_context_pdf_authorized(self):
         rv = BytesIO()
         barcode.Code128(self.access_code, writer=barcode.writer.ImageWriter()).write(rv, options={'text_distance': 3.0, 'font_size': 6})
         file = base64.b64encode(rv.getvalue()).decode("ascii")
-        context = {'credit_note': self, 'access_code_barcode': f"data:image/png;base64,{file}"}
-        pdf_file = printer.create_pdf(context=context, template_name='credit_note/format/invoice.html')
-        with tempfile.NamedTemporaryFile(delete=True) as file_temp:
-            file_temp.write(pdf_file)
-            file_temp.flush()
-            self.pdf_authorized.save(name=f'{self.receipt.get_name_xml()}_{self.access_code}.pdf', content=File(file_temp))
-
-    def generate_xml(self):
+        return {'credit_note': self, 'access_code_barcode': f"data:image/png;base64,{file}"}
+
+    def generate_pdf_authorized(self):
+        pdf_file = printer.create_pdf(context=self.get_context_pdf_authorized(), template_name='credit_note/format/invoice.html')
+        self.save_pdf_authorized(pdf_file)
+
+    def save_pdf_authorized(self, pdf_file):
+        self.pdf_authorized.save(name=f'{self.receipt.get_name_xml()}_{self.access_code}.pdf', content=ContentFile(pdf_file), save=False)
+        type(self).objects.filter(pk=self.pk).update(pdf_authorized=self.pdf_authorized.name)
+
+    def get_details_xml(self):
+        return self.creditnotedetail_set.select_related('product').order_by('id')
+
+    def generate_xml(self, stream=None):
         access_key = SRI().create_access_key(self)
-        root = ElementTree.Element('notaCredito', id="comprobante", version="1.1.0")
-        # infoTributaria
-        xml_tax_info = ElementTree.SubElement(root, 'infoTributaria')
-        ElementTree.SubElement(xml_tax_info, 'ambiente').text = str(self.company.environment_type)
-        ElementTree.SubElement(xml_tax_info, 'tipoEmision').text = str(self.company.emission_type)
-        ElementTree.SubElement(xml_tax_info, 'razonSocial').text = self.company.business_name
-        ElementTree.SubElement(xml_tax_info, 'nombreComercial').text = self.company.tradename
-        ElementTree.SubElement(xml_tax_info, 'ruc').text = self.company.ruc
-        ElementTree.SubElement(xml_tax_info, 'claveAcceso').text = access_key
-        ElementTree.SubElement(xml_tax_info, 'codDoc').text = self.receipt.voucher_type
-        ElementTree.SubElement(xml_tax_info, 'estab').text = self.receipt.establishment_code
-        ElementTree.SubElement(xml_tax_info, 'ptoEmi').text = self.receipt.issuing_point_code
-        ElementTree.SubElement(xml_tax_info, 'secuencial').text = self.voucher_number
-        ElementTree.SubElement(xml_tax_info, 'dirMatriz').text = self.company.main_address
-        if self.company.retention_agent == RETENTION_AGENT[0][0]:
-            ElementTree.SubElement(xml_tax_info, 'agenteRetencion').text = '1'
-        # infoNotaCredito
-        xml_info_invoice = ElementTree.SubElement(root, 'infoNotaCredito')
-        ElementTree.SubElement(xml_info_invoice, 'fechaEmision').text = datetime.now().strftime('%d/%m/%Y')
-        ElementTree.SubElement(xml_info_invoice, 'dirEstablecimiento').text = self.company.establishment_address
-        ElementTree.SubElement(xml_info_invoice, 'tipoIdentificacionComprador').text = self.sale.client.identification_type
-        ElementTree.SubElement(xml_info_invoice, 'razonSocialComprador').text = self.sale.client.user.names
-        ElementTree.SubElement(xml_info_invoice, 'identificacionComprador').text = self.sale.client.dni
-        if not self.company.special_taxpayer == '000':
-            ElementTree.SubElement(xml_info_invoice, 'contribuyenteEspecial').text = self.company.special_taxpayer
-        ElementTree.SubElement(xml_info_invoice, 'obligadoContabilidad').text = self.company.obligated_accounting
-        ElementTree.SubElement(xml_info_invoice, 'rise').text = 'Contribuyente Régimen Simplificado RISE'
-        ElementTree.SubElement(xml_info_invoice, 'codDocModificado').text = self.sale.receipt.voucher_type
-        ElementTree.SubElement(xml_info_invoice, 'numDocModificado').text = self.sale.voucher_number_full
-        ElementTree.SubElement(xml_info_invoice, 'fechaEmisionDocSustento').text = self.sale.date_joined.strftime('%d/%m/%Y')
-        ElementTree.SubElement(xml_info_invoice, 'totalSinImpuestos').text = f'{self.get_full_subtotal():.2f}'
-        ElementTree.SubElement(xml_info_invoice, 'valorModificacion').text = f'{self.total:.2f}'
-        ElementTree.SubElement(xml_info_invoice, 'moneda').text = 'DOLAR'
-        # totalConImpuestos
-        xml_total_with_taxes = ElementTree.SubElement(xml_info_invoice, 'totalConImpuestos')
-        # totalImpuesto
-        if self.subtotal_0 != 0.0000:
-            xml_total_tax = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
-            ElementTree.SubElement(xml_total_tax, 'codigo').text = str(TAX_CODES[0][0])
-            ElementTree.SubElement(xml_total_tax, 'codigoPorcentaje').text = '0'
-            ElementTree.SubElement(xml_total_tax, 'baseImponible').text = f'{self.subtotal_0:.2f}'
-            ElementTree.SubElement(xml_total_tax, 'valor').text = f'{0:.2f}'
-        if self.subtotal_12 != 0.0000:
-            xml_total_tax2 = ElementTree.SubElement(xml_total_with_taxes, 'totalImpuesto')
-            ElementTree.SubElement(xml_total_tax2, 'codigo').text = str(TAX_CODES[0][0])
-            ElementTree.SubElement(xml_total_tax2, 'codigoPorcentaje').text = str(self.company.vat_percentage)
-            ElementTree.SubElement(xml_total_tax2, 'baseImponible').text = f'{self.subtotal_12:.2f}'
-            ElementTree.SubElement(xml_total_tax2, 'valor').text = f'{self.total_iva:.2f}'
-        ElementTree.SubElement(xml_info_invoice, 'motivo').text = self.motive
-        # detalles
-        xml_details = ElementTree.SubElement(root, 'detalles')
-        for detail in self.creditnotedetail_set.all():
-            xml_detail = ElementTree.SubElement(xml_details, 'detalle')
-            ElementTree.SubElement(xml_detail, 'codigoInterno').text = detail.product.code
-            ElementTree.SubElement(xml_detail, 'descripcion').text = detail.product.name
-            ElementTree.SubElement(xml_detail, 'cantidad').text = f'{detail.cant:.2f}'
-            ElementTree.SubElement(xml_detail, 'precioUnitario').text = f'{detail.price:.2f}'
-            ElementTree.SubElement(xml_detail, 'descuento').text = f'{detail.total_dscto:.2f}'
-            ElementTree.SubElement(xml_detail, 'precioTotalSinImpuesto').text = f'{detail.total:.2f}'
-            xml_taxes = ElementTree.SubElement(xml_detail, 'impuestos')
-            xml_tax = ElementTree.SubElement(xml_taxes, 'impuesto')
-            ElementTree.SubElement(xml_tax, 'codigo').text = str(TAX_CODES[0][0])
-            if detail.product.with_tax:
-                ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = str(detail.product.vat_percentage)
-                ElementTree.SubElement(xml_tax, 'tarifa').text = f'{detail.iva * 100:.2f}'
-                ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
-                ElementTree.SubElement(xml_tax, 'valor').text = f'{detail.total_iva:.2f}'
-            else:
-                ElementTree.SubElement(xml_tax, 'codigoPorcentaje').text = "0"
-                ElementTree.SubElement(xml_tax, 'tarifa').text = "0"
-                ElementTree.SubElement(xml_tax, 'baseImponible').text = f'{detail.total:.2f}'
-                ElementTree.SubElement(xml_tax, 'valor').text = "0"
-        # infoAdicional
-        xml_additional_info = ElementTree.SubElement(root, 'infoAdicional')
-        ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre='dirCliente').text = self.sale.client.address
-        ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre='telfCliente').text = self.sale.client.mobile
-        ElementTree.SubElement(xml_additional_info, 'campoAdicional', nombre='Observacion').text = f'NOTA_CREDITO # {self.voucher_number}'
-        return ElementTree.tostring(root, xml_declaration=True, encoding='UTF-8').decode('UTF-8').replace("'", '"'), access_key
+        serializer = CreditNoteXMLSerializer(self, access_key)
+        if stream is not None:
+            return serializer.write(stream, self.get_details_xml().iterator(chunk_size=500)), access_key
+        return serializer.to_string(self.get_details_xml()), access_key
 
     def toJSON(self):
         item = model_to_dict(self)
@@ -1078,7 +1039,10 @@ class CreditNote(models.Model):
             if result['resp']:
                 result = sri.validate_xml(instance=self, xml=result['xml'])
                 if result['resp']:
-                    return sri.authorize_xml(instance=self)
+                    result = sri.authorize_xml(instance=self)
+                    if result.get('pending'):
+                        OutboxDispatcher().schedule_authorization(OUTBOX_VOUCHER[1][0], self)
+                        result['error'] = 'El comprobante fue recibido por el SRI y se encuentra pendiente de autorización'
         return result
 
     def calculate_detail(self):
@@ -1108,16 +1072,17 @@ class CreditNote(models.Model):
         if self.motive is None:
             self.motive = 'Sin detalles'
         if self.pk is None:
-            self.receipt.sequence = int(self.voucher_number)
-            self.receipt.save()
+            Receipt.objects.filter(pk=self.receipt_id, sequence__lt=int(self.voucher_number)).update(sequence=int(self.voucher_number))
         super(CreditNote, self).save()
 
+    def increase_stock(self, details):
+        kardex.register([kardex.movement(detail.product_id, STOCK_MOVEMENT_TYPE[5][0], detail.cant, self.voucher_number_full) for detail in details if detail.product.inventoried])
+
     def delete(self, using=None, keep_parents=False):
         try:
-            for i in self.creditnotedetail_set.filter(product__inventoried=True):
-                i.product.stock += i.cant
-                i.product.save()
-                i.delete()
+            details = list(self.creditnotedetail_set.filter(product__inventoried=True))
+            kardex.register([kardex.movement(detail.product_id, STOCK_MOVEMENT_TYPE[6][0], -detail.cant, self.voucher_number_full) for detail in details])
+            self.creditnotedetail_set.filter(id__in=[detail.id for detail in details]).delete()
         except:
             pass
         super(CreditNote, self).delete()
@@ -1132,6 +1097,9 @@ class CreditNote(models.Model):
             ('delete_credit_note', 'Can delete Nota de Credito'),
             ('view_credit_note_client', 'Can view_credit_note_client Nota de Credito'),
         )
+        indexes = [
+            models.Index(fields=['date_joined', 'id']),
+        ]
 
 
 class CreditNoteDetail(models.Model):
@@ -1171,3 +1139,122 @@ class CreditNoteDetail(models.Model):
         verbose_name = 'Detalle Devolución Ventas'
         verbose_name_plural = 'Detalle Devoluciones Ventas'
         default_permissions = ()
+
+
+class VoucherOutbox(models.Model):
+    voucher_type = models.CharField(max_length=20, choices=OUTBOX_VOUCHER, default=OUTBOX_VOUCHER[0][0], verbose_name='Tipo de comprobante')
+    voucher_id = models.PositiveIntegerField(verbose_name='Comprobante')
+    stage = models.CharField(max_length=20, choices=VOUCHER_STAGE, default=VOUCHER_STAGE[0][0], verbose_name='Etapa')
+    status = models.CharField(max_length=20, choices=OUTBOX_STATUS, default=OUTBOX_STATUS[0][0], verbose_name='Estado')
+    xml = models.TextField(null=True, blank=True, verbose_name='XML')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    next_attempt = models.DateTimeField(default=timezone.now, verbose_name='Próximo intento')
+    errors = models.JSONField(default=dict, verbose_name='Errores')
+    datetime_joined = models.DateTimeField(default=timezone.now, verbose_name='Fecha y hora de registro')
+    datetime_updated = models.DateTimeField(auto_now=True, verbose_name='Fecha y hora de actualización')
+
+    def __str__(self):
+        return f'{self.get_voucher_type_display()} {self.voucher_id}'
+
+    def get_voucher(self):
+        if self.voucher_type == OUTBOX_VOUCHER[1][0]:
+            return CreditNote.objects.select_related('company', 'receipt', 'sale__client__user').get(pk=self.voucher_id)
+        return Sale.objects.select_related('company', 'receipt', 'client__user').get(pk=self.voucher_id)
+
+    def is_finished(self):
+        return self.status in [OUTBOX_STATUS[2][0], OUTBOX_STATUS[3][0]]
+
+    def toJSON(self):
+        item = model_to_dict(self, exclude=['xml'])
+        item['voucher_type'] = {'id': self.voucher_type, 'name': self.get_voucher_type_display()}
+        item['stage'] = {'id': self.stage, 'name': self.get_stage_display()}
+        item['status'] = {'id': self.status, 'name': self.get_status_display()}
+        item['next_attempt'] = timezone.localtime(self.next_attempt).strftime('%Y-%m-%d %H:%M:%S')
+        item['datetime_joined'] = timezone.localtime(self.datetime_joined).strftime('%Y-%m-%d %H:%M:%S')
+        return item
+
+    class Meta:
+        verbose_name = 'Envío de Comprobante'
+        verbose_name_plural = 'Envíos de Comprobantes'
+        default_permissions = ()
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+            models.Index(fields=['voucher_type', 'voucher_id']),
+        ]
+
+
+class StockMovement(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Producto')
+    movement_type = models.CharField(max_length=20, choices=STOCK_MOVEMENT_TYPE, verbose_name='Tipo de movimiento')
+    quantity = models.IntegerField(default=0, verbose_name='Cantidad')
+    reference = models.CharField(max_length=50, null=True, blank=True, verbose_name='Referencia')
+    date_joined = models.DateField(default=datetime.now, verbose_name='Fecha de registro')
+    datetime_joined = models.DateTimeField(default=timezone.now, verbose_name='Fecha y hora de registro')
+
+    def __str__(self):
+        return f'{self.product.name} {self.get_movement_type_display()} {self.quantity}'
+
+    def toJSON(self):
+        item = model_to_dict(self)
+        item['movement_type'] = {'id': self.movement_type, 'name': self.get_movement_type_display()}
+        item['date_joined'] = self.date_joined.strftime('%Y-%m-%d')
+        item['datetime_joined'] = timezone.localtime(self.datetime_joined).strftime('%Y-%m-%d %H:%M:%S')
+        return item
+
+    class Meta:
+        verbose_name = 'Movimiento de Inventario'
+        verbose_name_plural = 'Movimientos de Inventario'
+        default_permissions = ()
+        indexes = [
+            models.Index(fields=['product', 'date_joined']),
+        ]
+
+
+class StockSnapshot(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Producto')
+    date_joined = models.DateField(verbose_name='Fecha de corte')
+    stock = models.IntegerField(default=0, verbose_name='Stock')
+
+    def __str__(self):
+        return f'{self.product.name} {self.date_joined} {self.stock}'
+
+    def toJSON(self):
+        item = model_to_dict(self)
+        item['date_joined'] = self.date_joined.strftime('%Y-%m-%d')
+        return item
+
+    class Meta:
+        verbose_name = 'Corte de Inventario'
+        verbose_name_plural = 'Cortes de Inventario'
+        default_permissions = ()
+        unique_together = ('product', 'date_joined')
+
+
+class DailySummary(models.Model):
+    date_joined = models.DateField(unique=True, verbose_name='Fecha')
+    sale_count = models.IntegerField(default=0, verbose_name='Cantidad de ventas')
+    sale_subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Subtotal de ventas')
+    sale_dscto = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Descuento de ventas')
+    sale_iva = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Iva de ventas')
+    sale_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Total de ventas')
+    credit_note_count = models.IntegerField(default=0, verbose_name='Cantidad de notas de crédito')
+    credit_note_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Total de notas de crédito')
+    purchase_count = models.IntegerField(default=0, verbose_name='Cantidad de compras')
+    purchase_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Total de compras')
+    expenses_count = models.IntegerField(default=0, verbose_name='Cantidad de gastos')
+    expenses_total = models.DecimalField(max_digits=14, decimal_places=2, default=0.00, verbose_name='Total de gastos')
+
+    def __str__(self):
+        return self.date_joined.strftime('%Y-%m-%d')
+
+    def toJSON(self):
+        item = model_to_dict(self)
+        item['date_joined'] = self.date_joined.strftime('%Y-%m-%d')
+        for name in ['sale_subtotal', 'sale_dscto', 'sale_iva', 'sale_total', 'credit_note_total', 'purchase_total', 'expenses_total']:
+            item[name] = float(getattr(self, name))
+        return item
+
+    class Meta:
+        verbose_name = 'Resumen Diario'
+        verbose_name_plural = 'Resúmenes Diarios'
+        default_permissions = ()
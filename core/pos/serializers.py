@@ -0,0 +1,112 @@
+from config import settings
+from core.pos.models import Category, Product, Provider, Client, Receipt, Sale, SaleDetail, Purchase, PurchaseDetail, CtasCollect, DebtsPay, TypeExpense, Expenses, VOUCHER_TYPE
+from core.security.utilities.serializers import Serializer, Choice, Method, Nested
+from core.user.serializers import UserSerializer, get_image
+
+
+def get_full_subtotal(subtotal_0, subtotal_12):
+    return float(subtotal_0) + float(subtotal_12)
+
+
+def get_price_current(pvp, price_promotion):
+    if price_promotion > 0:
+        return float(price_promotion)
+    return float(pvp)
+
+
+def get_barcode(barcode):
+    if barcode:
+        return f'{settings.MEDIA_URL}/{barcode}'
+    return f'{settings.STATIC_URL}img/default/empty.png'
+
+
+class CategorySerializer(Serializer):
+    model = Category
+    fields = ('id', 'name')
+
+
+class ProductSerializer(Serializer):
+    model = Product
+    fields = ('id', 'name', 'code', 'description', 'price', 'pvp', 'price_promotion', 'inventoried', 'stock', 'with_tax', 'vat_percentage')
+    category = Nested(CategorySerializer)
+    full_name = Method(lambda name, code, category_name: f'{name} ({code}) ({category_name})', 'name', 'code', 'category__name')
+    short_name = Method(lambda name, category_name: f'{name} ({category_name})', 'name', 'category__name')
+    price_current = Method(get_price_current, 'pvp', 'price_promotion')
+    image = Method(get_image, 'image')
+    barcode = Method(get_barcode, 'barcode')
+
+
+class ProviderSerializer(Serializer):
+    model = Provider
+    fields = ('id', 'name', 'ruc', 'mobile', 'email', 'address')
+
+
+class ClientSerializer(Serializer):
+    model = Client
+    fields = ('id', 'dni', 'mobile', 'birthdate', 'address', 'send_email_invoice')
+    user = Nested(UserSerializer)
+    identification_type = Choice()
+    text = Method(lambda names, dni: f'{names} ({dni})', 'user__names', 'dni')
+
+
+class ReceiptSerializer(Serializer):
+    model = Receipt
+    fields = ('id', 'establishment_code', 'issuing_point_code', 'sequence')
+    voucher_type = Choice()
+    name = Method(dict(VOUCHER_TYPE).get, 'voucher_type')
+
+
+class SaleSerializer(Serializer):
+    model = Sale
+    fields = ('id', 'voucher_number', 'voucher_number_full', 'time_limit', 'creation_date', 'date_joined', 'end_credit', 'subtotal_0', 'subtotal_12', 'total_dscto', 'iva', 'total_iva', 'total', 'cash', 'change', 'access_code', 'xml_authorized', 'pdf_authorized', 'create_electronic_invoice')
+    client = Nested(ClientSerializer)
+    receipt = Nested(ReceiptSerializer)
+    payment_type = Choice()
+    payment_method = Choice()
+    environment_type = Choice()
+    status = Choice()
+    subtotal = Method(get_full_subtotal, 'subtotal_0', 'subtotal_12')
+    authorization_date = Method(lambda authorization_date: '' if authorization_date is None else authorization_date.strftime('%Y-%m-%d'), 'authorization_date')
+
+
+class SaleDetailSerializer(Serializer):
+    model = SaleDetail
+    fields = ('id', 'cant', 'price', 'price_with_vat', 'subtotal', 'iva', 'total_iva', 'total_dscto', 'total')
+    product = Nested(ProductSerializer)
+    dscto = Method(lambda dscto: float(dscto) * 100, 'dscto')
+
+
+class PurchaseSerializer(Serializer):
+    model = Purchase
+    fields = ('id', 'number', 'date_joined', 'end_credit', 'subtotal')
+    provider = Nested(ProviderSerializer)
+    payment_type = Choice()
+
+
+class PurchaseDetailSerializer(Serializer):
+    model = PurchaseDetail
+    fields = ('id', 'cant', 'price', 'dscto', 'subtotal')
+    product = Nested(ProductSerializer)
+
+
+class CtasCollectSerializer(Serializer):
+    model = CtasCollect
+    fields = ('id', 'date_joined', 'end_date', 'debt', 'saldo', 'state')
+    sale = Nested(SaleSerializer)
+
+
+class DebtsPaySerializer(Serializer):
+    model = DebtsPay
+    fields = ('id', 'date_joined', 'end_date', 'debt', 'saldo', 'state')
+    purchase = Nested(PurchaseSerializer)
+
+
+class TypeExpenseSerializer(Serializer):
+    model = TypeExpense
+    fields = ('id', 'name')
+
+
+class ExpensesSerializer(Serializer):
+    model = Expenses
+    fields = ('id', 'description', 'date_joined', 'valor')
+    type_expense = Nested(TypeExpenseSerializer)
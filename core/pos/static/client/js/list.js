@@ -4,17 +4,9 @@ var client = {
             autoWidth: false,
             destroy: true,
             deferRender: true,
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken
-                },
-                data: {
-                    'action': 'search'
-                },
-                dataSrc: ""
-            },
+            serverSide: true,
+            ajax: server_side_ajax({'action': 'search'}),
+            order: [[0, "desc"]],
             columns: [
                 {"data": "id"},
                 {"data": "user.names"},
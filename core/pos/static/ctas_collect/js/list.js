@@ -15,15 +15,9 @@ var ctas_collect = {
         tblCtasCollect = $('#data').DataTable({
             autoWidth: false,
             destroy: true,
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken
-                },
-                data: parameters,
-                dataSrc: ""
-            },
+            serverSide: true,
+            ajax: server_side_ajax(parameters),
+            order: [[2, "desc"]],
             columns: [
                 {data: "sale.voucher_number"},
                 {data: "sale.client"},
@@ -14,15 +14,9 @@ var expenses = {
             autoWidth: false,
             destroy: true,
             deferRender: true,
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken
-                },
-                data: parameters,
-                dataSrc: ""
-            },
+            serverSide: true,
+            ajax: server_side_ajax(parameters),
+            order: [[2, "desc"]],
             columns: [
                 {data: "id"},
                 {data: "type_expense.name"},
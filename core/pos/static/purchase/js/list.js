@@ -16,15 +16,8 @@ var purchase = {
             destroy: true,
             deferRender: true,
             order: [[0, 'desc']],
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken
-                },
-                data: parameters,
-                dataSrc: ""
-            },
+            serverSide: true,
+            ajax: server_side_ajax(parameters),
             columns: [
                 {data: "id"},
                 {data: "number"},
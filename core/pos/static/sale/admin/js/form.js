@@ -223,6 +223,31 @@ var sale = {
             }
         });
     },
+    waitVoucherAuthorization: function (request, list_url, attempts = 15) {
+        loading({'text': 'Autorizando el comprobante...'});
+        $.ajax({
+            url: request.status_url,
+            type: 'GET',
+            dataType: 'json',
+            success: function (status) {
+                if (status.print_url) {
+                    window.open(status.print_url, '_blank');
+                } else if (attempts > 0 && ['pending', 'processing'].includes(status.status)) {
+                    setTimeout(function () {
+                        sale.waitVoucherAuthorization(request, list_url, attempts - 1);
+                    }, 2000);
+                    return false;
+                } else {
+                    window.open(request.print_url, '_blank');
+                }
+                location.href = list_url;
+            },
+            error: function (jqXHR, textStatus, errorThrown) {
+                window.open(request.print_url, '_blank');
+                location.href = list_url;
+            }
+        });
+    },
     listAdditionalInfo: function () {
         tblAdditionalInfo = $('#tblAdditionalInfo').DataTable({
             autoWidth: false,
@@ -616,7 +641,10 @@ document.addEventListener('DOMContentLoaded', function (e) {
                     dialog_action({
                         'content': '¿Desea Imprimir el Comprobante?',
                         'success': function () {
-                            console.log(request);
+                            if (request.hasOwnProperty('status_url')) {
+                                sale.waitVoucherAuthorization(request, list_url);
+                                return false;
+                            }
                             window.open(request.print_url, '_blank');
                             location.href = list_url;
                         },
@@ -15,16 +15,9 @@ var sale = {
             autoWidth: false,
             destroy: true,
             deferRender: true,
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken
-                },
-                data: parameters,
-                dataSrc: ""
-            },
-            order: [[0, "desc"], [5, "desc"]],
+            serverSide: true,
+            ajax: server_side_ajax(parameters),
+            order: [[2, "desc"]],
             columns: [
                 {data: "id"},
                 {data: "voucher_number_full"},
@@ -1,3 +1,151 @@
-from django.test import TestCase
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import TenantTestCase
+
+from config import settings
+from core.pos.models import Sale, SaleDetail, CreditNote, CreditNoteDetail, Product, Category, Client, Receipt, VOUCHER_TYPE, PAYMENT_TYPE
+from core.pos.utilities.sequence import sequence_allocator
+from core.pos.utilities.voucher_xml import InvoiceXMLSerializer, CreditNoteXMLSerializer
+from core.pos.utilities.xsd import VoucherSchemaValidator
+from core.tenant.models import Company, Plan
+from core.user.models import User
+
+
+class SaleFixtures:
+    @classmethod
+    def setup_tenant(cls, tenant):
+        tenant.name = 'test'
+
+    @classmethod
+    def create_fixtures(cls):
+        cls.company = Company(ruc='0900000000001', business_name='Empresa de prueba', tradename='Empresa de prueba', main_address='Matriz', establishment_address='Matriz', establishment_code='001', issuing_point_code='001', special_taxpayer='000', mobile='0900000000', phone='000000000', email='empresa@test.com', website='test.com', iva=12.00, electronic_signature_key='test', email_host_user='empresa@test.com', email_host_password='test', scheme=cls.tenant, plan=Plan.objects.create(name='Prueba', quantity=1000))
+        cls.company.edit()
+        cls.receipt = Receipt.objects.create(voucher_type=VOUCHER_TYPE[0][0], establishment_code=cls.company.establishment_code, issuing_point_code=cls.company.issuing_point_code, sequence=0)
+        cls.final_consumer = Client.objects.create(user=User.objects.create(names='Consumidor final', username='9999999999999', email='cliente@test.com'), dni='9999999999999', mobile='0999999999', address='Ciudad')
+        cls.employee = User.objects.create(names='Empleado', username='empleado', email='empleado@test.com')
+        category = Category.objects.create(name='General')
+        Product.objects.bulk_create([Product(name=f'Producto {index}', code=f'P{index:05d}', category=category, price=1.00, pvp=2.00, stock=1000) for index in range(100)])
+        cls.products = list(Product.objects.order_by('id'))
+
+    def create_sale(self, lines):
+        sale = Sale()
+        sale.company = self.company
+        sale.environment_type = self.company.environment_type
+        sale.receipt = Receipt.objects.get(pk=self.receipt.pk)
+        sale.allocate_voucher_number()
+        sale.client = self.final_consumer
+        sale.employee = self.employee
+        sale.iva = float(self.company.iva) / 100
+        sale.payment_type = PAYMENT_TYPE[0][0]
+        sale.create_electronic_invoice = False
+        products = [{'id': product.id, 'cant': 1, 'price_current': float(product.pvp), 'dscto': 0} for product in self.products[:lines]]
+        return sale, products
+
+
+class CheckoutQueriesTest(SaleFixtures, TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_fixtures()
+
+    def count_queries(self, lines):
+        sale, products = self.create_sale(lines)
+        with CaptureQueriesContext(connection) as context:
+            sale.save_with_details(products)
+        return len(context.captured_queries)
+
+    def test_checkout_queries_do_not_depend_on_lines(self):
+        self.count_queries(1)
+        expected = self.count_queries(1)
+        for lines in (1, 10, 100):
+            sale, products = self.create_sale(lines)
+            with self.assertNumQueries(expected):
+                sale.save_with_details(products)
+
+
+class ConcurrentCheckoutTest(SaleFixtures, TenantTestCase):
+    workers = 8
+    checkouts = 10
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.create_fixtures()
+
+    @classmethod
+    def tearDownClass(cls):
+        plan = cls.company.plan
+        cls.company.delete()
+        plan.delete()
+        super().tearDownClass()
+
+    def checkout(self, worker):
+        connection.set_tenant(self.tenant)
+        numbers = []
+        try:
+            for index in range(self.checkouts):
+                with transaction.atomic():
+                    sale, products = self.create_sale(1)
+                    sale.save_with_details(products)
+                numbers.append(int(sale.voucher_number))
+        finally:
+            sequence_allocator.close()
+            connection.close()
+        return numbers
+
+    def run_checkouts(self):
+        sequence_allocator.drop()
+        start = Receipt.objects.get(pk=self.receipt.pk).sequence
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            numbers = [number for result in executor.map(self.checkout, range(self.workers)) for number in result]
+        self.assertEqual(len(numbers), self.workers * self.checkouts)
+        self.assertEqual(len(numbers), len(set(numbers)))
+        self.assertTrue(all(number > start for number in numbers))
+        return start, numbers
+
+    def test_row_lock_numbers_are_unique_and_consecutive(self):
+        with mock.patch.object(sequence_allocator, 'block_size', 1):
+            start, numbers = self.run_checkouts()
+        self.assertEqual(sorted(numbers), list(range(start + 1, start + len(numbers) + 1)))
+
+    def test_block_numbers_are_unique(self):
+        with mock.patch.object(sequence_allocator, 'block_size', 5):
+            self.run_checkouts()
+        sequence_allocator.drop()
+
+
+class TranscribedSchemaValidator(VoucherSchemaValidator):
+    schema_names = {
+        'factura': 'factura_V1.0.0.transcribed.xsd',
+        'notaCredito': 'notaCredito_V1.1.0.transcribed.xsd',
+    }
+
+
+class VoucherSchemaTest(SimpleTestCase):
+    access_key = '0101202401179000000000110010010000000011234567811'
+
+    def setUp(self):
+        self.validator = TranscribedSchemaValidator(os.path.join(settings.BASE_DIR, 'core/pos/resources/xsd'))
+        self.company = Company(ruc='0900000000001', business_name='Empresa de prueba', tradename='Empresa & Cía', main_address='Matriz <centro>', establishment_address='Matriz', establishment_code='001', issuing_point_code='001', special_taxpayer='000')
+        self.client = Client(user=User(names="María O'Connor"), dni='0912345678', mobile='0999999999', address='Ciudad')
+        self.sale = Sale(company=self.company, client=self.client, receipt=Receipt(voucher_type=VOUCHER_TYPE[0][0], establishment_code='001', issuing_point_code='001'), voucher_number='000000001', voucher_number_full='001-001-000000001', subtotal_0=10.00, subtotal_12=20.00, total_iva=2.40, total=32.40)
+        self.products = [Product(name='Producto sin iva', code='P00001', with_tax=False), Product(name='Producto "con" iva', code='P00002', with_tax=True)]
+
+    def create_details(self, model):
+        return [
+            model(product=self.products[0], cant=1, price=10.00, total=10.00, iva=0.00, total_iva=0.00),
+            model(product=self.products[1], cant=2, price=10.00, total=20.00, iva=0.12, total_iva=2.40),
+        ]
+
+    def test_invoice_matches_schema(self):
+        xml = InvoiceXMLSerializer(self.sale, self.access_key).to_string(self.create_details(SaleDetail))
+        self.assertEqual(self.validator.validate(xml), [])
+
+    def test_credit_note_matches_schema(self):
+        credit_note = CreditNote(company=self.company, sale=self.sale, motive='Devolución', receipt=Receipt(voucher_type=VOUCHER_TYPE[1][0], establishment_code='001', issuing_point_code='001'), voucher_number='000000001', subtotal_0=10.00, subtotal_12=20.00, total_iva=2.40, total=32.40)
+        xml = CreditNoteXMLSerializer(credit_note, self.access_key).to_string(self.create_details(CreditNoteDetail))
+        self.assertEqual(self.validator.validate(xml), [])
@@ -14,7 +14,9 @@ from core.pos.views.purchase.views import *
 from core.pos.views.receipt.views import *
 from core.pos.views.sale.views import *
 from core.pos.views.type_expense.views import *
+from core.pos.views.voucher_archive.views import *
 from core.pos.views.voucher_errors.views import *
+from core.pos.views.voucher_outbox.views import *
 
 urlpatterns = [
     # company
@@ -89,4 +91,8 @@ urlpatterns = [
     # voucher_errors
     path('voucher/errors/', VoucherErrorsListView.as_view(), name='voucher_errors_list'),
     path('voucher/errors/delete/<int:pk>/', VoucherErrorsDeleteView.as_view(), name='voucher_errors_delete'),
+    # voucher_outbox
+    path('voucher/outbox/status/<int:pk>/', VoucherOutboxStatusView.as_view(), name='voucher_outbox_status'),
+    # voucher_archive
+    path('voucher/archive/<path:name>', VoucherArchiveView.as_view(), name='voucher_archive'),
 ]
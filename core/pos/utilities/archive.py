@@ -0,0 +1,124 @@
+import fcntl
+import os
+import threading
+import zlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+
+from config import settings
+
+
+class ArchiveStorage(FileSystemStorage):
+    """Filesystem storage that appends the authorized documents of each day to a compressed pack file with an index of offsets."""
+
+    compress_level = 6
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def get_pack_paths(self, name):
+        directory = os.path.dirname(name)
+        return self.path(f'{directory}.pack'), self.path(f'{directory}.idx')
+
+    def get_index(self, name):
+        index_path = self.get_pack_paths(name)[1]
+        try:
+            stat = os.stat(index_path)
+        except FileNotFoundError:
+            return {}
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            cached = self.indexes.get(index_path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        index = {}
+        with open(index_path, encoding='utf-8') as file:
+            for line in file:
+                values = line.rstrip('\n').split('\t')
+                if len(values) != 4:
+                    continue
+                filename, offset, length, size = values
+                if int(offset) < 0:
+                    index.pop(filename, None)
+                else:
+                    index[filename] = (int(offset), int(length), int(size))
+        with self.lock:
+            self.indexes[index_path] = (key, index)
+        return index
+
+    def get_entry(self, name):
+        return self.get_index(name).get(os.path.basename(name))
+
+    def is_packed(self, name):
+        return self.get_entry(name) is not None
+
+    def write_index(self, name, data=None):
+        pack_path, index_path = self.get_pack_paths(name)
+        os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+        with open(pack_path, 'ab') as pack:
+            fcntl.flock(pack, fcntl.LOCK_EX)
+            try:
+                offset, length, size = -1, 0, 0
+                if data is not None:
+                    compressed = zlib.compress(data, self.compress_level)
+                    pack.seek(0, os.SEEK_END)
+                    offset, length, size = pack.tell(), len(compressed), len(data)
+                    pack.write(compressed)
+                    pack.flush()
+                    os.fsync(pack.fileno())
+                with open(index_path, 'a', encoding='utf-8') as index:
+                    index.write(f'{os.path.basename(name)}\t{offset}\t{length}\t{size}\n')
+            finally:
+                fcntl.flock(pack, fcntl.LOCK_UN)
+
+    def append(self, name, data):
+        self.write_index(name, data)
+        return name
+
+    def read(self, name):
+        entry = self.get_entry(name)
+        if entry is None:
+            with super()._open(name, 'rb') as file:
+                return file.read()
+        offset, length, size = entry
+        with open(self.get_pack_paths(name)[0], 'rb') as pack:
+            pack.seek(offset)
+            return zlib.decompress(pack.read(length))
+
+    def _open(self, name, mode='rb'):
+        if self.is_packed(name):
+            return ContentFile(self.read(name), name=name)
+        return super()._open(name, mode)
+
+    def _save(self, name, content):
+        if not settings.VOUCHER_ARCHIVE:
+            return super()._save(name, content)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return self.append(name, b''.join(content.chunks()))
+
+    def exists(self, name):
+        return self.is_packed(name) or super().exists(name)
+
+    def delete(self, name):
+        if self.is_packed(name):
+            self.write_index(name)
+        super().delete(name)
+
+    def size(self, name):
+        entry = self.get_entry(name)
+        if entry is not None:
+            return entry[2]
+        return super().size(name)
+
+    def url(self, name):
+        if self.is_packed(name):
+            return reverse('voucher_archive', kwargs={'name': name})
+        return super().url(name)
+
+
+archive_storage = ArchiveStorage()
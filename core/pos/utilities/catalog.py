@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import connection, transaction
+
+from config import settings
+
+
+class ProductCatalog:
+    """Serialized products of each tenant indexed by code, kept in the worker memory and reloaded when any process touches the version file of the tenant; stock changes only drop the stock of the products listed in the stock log."""
+
+    max_stock_log = 1048576
+
+    def __init__(self, cache_dir=None, max_tenants=None):
+        self.cache_dir = cache_dir
+        self.max_tenants = max_tenants
+        self.catalogs = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_path(self, schema_name, name):
+        return os.path.join(self.cache_dir or settings.CATALOG_CACHE_DIR, f'{schema_name}.{name}')
+
+    def get_version(self, schema_name, name):
+        try:
+            stat = os.stat(self.get_path(schema_name, name))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def get_stock_position(self, schema_name):
+        try:
+            stat = os.stat(self.get_path(schema_name, 'stock'))
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def touch(self, schema_name, name, content=None):
+        path = self.get_path(schema_name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        path_temp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(path_temp, 'w') as file:
+            file.write(str(time.time_ns()) if content is None else content)
+        os.replace(path_temp, path)
+
+    def append_stock(self, schema_name, product_ids):
+        path = self.get_path(schema_name, 'stock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, f"{' '.join(str(product_id) for product_id in product_ids)}\n".encode())
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self.max_stock_log:
+            self.touch(schema_name, 'stock', content='')
+
+    def load(self, version, stock_position):
+        from core.pos.models import Product
+        products = {}
+        stock = {}
+        for product in Product.objects.select_related('category').order_by('id').iterator():
+            item = product.toJSON()
+            products[product.code] = json.dumps(item)
+            stock[product.id] = product.stock
+        return {'version': version, 'stock_position': stock_position, 'products': products, 'stock': stock}
+
+    def load_stock(self, catalog, stock_position):
+        from core.pos.models import Product
+        stock = dict(Product.objects.values_list('id', 'stock'))
+        return {**catalog, 'stock_position': stock_position, 'stock': stock}
+
+    def refresh_stock(self, schema_name, catalog):
+        inode, offset = catalog['stock_position']
+        try:
+            with open(self.get_path(schema_name, 'stock'), 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if stat.st_ino != inode or stat.st_size < offset:
+                    return self.load_stock(catalog, (stat.st_ino, stat.st_size))
+                if stat.st_size == offset:
+                    return catalog
+                file.seek(offset)
+                data = file.read(stat.st_size - offset)
+        except FileNotFoundError:
+            if inode is None:
+                return catalog
+            return self.load_stock(catalog, (None, 0))
+        data = data[:data.rfind(b'\n') + 1]
+        for product_id in data.split():
+            catalog['stock'].pop(int(product_id), None)
+        return {**catalog, 'stock_position': (inode, offset + len(data))}
+
+    def get_catalog(self, schema_name):
+        version = self.get_version(schema_name, 'catalog')
+        catalog = self.catalogs.get(schema_name)
+        if catalog is None or catalog['version'] != version:
+            catalog = self.load(version, self.get_stock_position(schema_name))
+        else:
+            catalog = self.refresh_stock(schema_name, catalog)
+        with self.lock:
+            self.catalogs[schema_name] = catalog
+            self.catalogs.move_to_end(schema_name)
+            while len(self.catalogs) > (self.max_tenants or settings.CATALOG_CACHE_TENANTS):
+                self.catalogs.popitem(last=False)
+        return catalog
+
+    def get_stock(self, catalog, product_id, default):
+        from core.pos.models import Product
+        stock = catalog['stock'].get(product_id)
+        if stock is None:
+            stock = Product.objects.filter(pk=product_id).values_list('stock', flat=True).first()
+            if stock is None:
+                return default
+            catalog['stock'][product_id] = stock
+        return stock
+
+    def get(self, schema_name, code):
+        catalog = self.get_catalog(schema_name)
+        data = catalog['products'].get(code)
+        if data is None:
+            return None
+        item = json.loads(data)
+        item['stock'] = self.get_stock(catalog, item['id'], item['stock'])
+        return item
+
+    def invalidate(self, schema_name=None):
+        schema_name = schema_name or connection.schema_name
+        transaction.on_commit(lambda: self.touch(schema_name, 'catalog'))
+
+    def invalidate_stock(self, product_ids, schema_name=None):
+        schema_name = schema_name or connection.schema_name
+        product_ids = sorted(product_ids)
+        transaction.on_commit(lambda: self.append_stock(schema_name, product_ids))
+
+    def drop(self, schema_name=None):
+        with self.lock:
+            if schema_name is None:
+                self.catalogs.clear()
+            else:
+                self.catalogs.pop(schema_name, None)
+
+
+product_catalog = ProductCatalog()
+
+
+def invalidate_catalog(sender, **kwargs):
+    product_catalog.invalidate()
@@ -0,0 +1,101 @@
+from datetime import date, datetime, timedelta
+
+from django.db import models
+from django.db.models import F, Case, When, Value, Sum
+from django.db.models.functions import Coalesce
+
+from core.pos.choices import STOCK_MOVEMENT_TYPE
+from core.pos.utilities.catalog import product_catalog
+
+
+class Kardex:
+    """Append-only ledger of StockMovement rows; Product.stock is only changed through atomic increments of the registered quantities."""
+
+    def movement(self, product, movement_type, quantity, reference=None):
+        from core.pos.models import StockMovement
+        movement = StockMovement(movement_type=movement_type, quantity=quantity, reference=reference)
+        if isinstance(product, int):
+            movement.product_id = product
+        else:
+            movement.product = product
+        return movement
+
+    def register(self, movements, update_stock=True):
+        from core.pos.models import Product, StockMovement
+        movements = [movement for movement in movements if movement.quantity]
+        if not len(movements):
+            return movements
+        StockMovement.objects.bulk_create(movements)
+        if update_stock:
+            quantities = {}
+            for movement in movements:
+                quantities[movement.product_id] = quantities.get(movement.product_id, 0) + movement.quantity
+            quantity = Case(*[When(id=product_id, then=Value(value)) for product_id, value in quantities.items()], output_field=models.IntegerField())
+            Product.objects.filter(id__in=list(quantities.keys())).update(stock=F('stock') + quantity)
+            product_catalog.invalidate_stock(quantities.keys())
+        return movements
+
+    def adjust(self, product_id, stock, reference=None):
+        from core.pos.models import Product
+        current_stock = Product.objects.select_for_update().values_list('stock', flat=True).get(pk=product_id)
+        return self.register([self.movement(product_id, STOCK_MOVEMENT_TYPE[7][0], int(stock) - current_stock, reference)])
+
+    def get_quantity(self, queryset):
+        return queryset.aggregate(result=Coalesce(Sum('quantity'), 0))['result']
+
+    def get_stock_at(self, product_id, date_joined):
+        from core.pos.models import Product, StockMovement, StockSnapshot
+        date_joined = self.get_date(date_joined)
+        movements = StockMovement.objects.filter(product_id=product_id)
+        snapshot = StockSnapshot.objects.filter(product_id=product_id, date_joined__lte=date_joined).order_by('-date_joined').first()
+        if snapshot is None:
+            stock = Product.objects.values_list('stock', flat=True).get(pk=product_id)
+            return stock - self.get_quantity(movements.filter(date_joined__gt=date_joined))
+        return snapshot.stock + self.get_quantity(movements.filter(date_joined__gt=snapshot.date_joined, date_joined__lte=date_joined))
+
+    def get_movements(self, product_id, start_date, end_date):
+        from core.pos.models import StockMovement
+        start_date = self.get_date(start_date)
+        stock = self.get_stock_at(product_id, start_date - timedelta(days=1))
+        response = {'initial_stock': stock, 'movements': []}
+        queryset = StockMovement.objects.filter(product_id=product_id, date_joined__range=[start_date, self.get_date(end_date)]).order_by('date_joined', 'id')
+        for movement in queryset:
+            stock += movement.quantity
+            item = movement.toJSON()
+            item['stock'] = stock
+            response['movements'].append(item)
+        response['final_stock'] = stock
+        return response
+
+    def take_snapshots(self, date_joined):
+        from core.pos.models import Product, StockMovement, StockSnapshot
+        date_joined = self.get_date(date_joined)
+        previous = {snapshot.product_id: snapshot for snapshot in StockSnapshot.objects.filter(date_joined__lt=date_joined).order_by('product_id', '-date_joined').distinct('product_id')}
+        movements = StockMovement.objects.filter(date_joined__lte=date_joined)
+        if len(previous):
+            movements = movements.filter(date_joined__gt=min(snapshot.date_joined for snapshot in previous.values()))
+        daily = {}
+        for item in movements.values('product_id', 'date_joined').annotate(result=Sum('quantity')):
+            daily.setdefault(item['product_id'], []).append((item['date_joined'], item['result']))
+        later = {item['product_id']: item['result'] for item in StockMovement.objects.filter(date_joined__gt=date_joined).values('product_id').annotate(result=Sum('quantity'))}
+        snapshots = []
+        for product_id, stock in Product.objects.values_list('id', 'stock').iterator():
+            snapshot = previous.get(product_id)
+            if snapshot is None:
+                stock -= later.get(product_id, 0)
+            else:
+                stock = snapshot.stock + sum(quantity for day, quantity in daily.get(product_id, []) if day > snapshot.date_joined)
+            snapshots.append(StockSnapshot(product_id=product_id, date_joined=date_joined, stock=stock))
+        StockSnapshot.objects.filter(date_joined=date_joined).delete()
+        StockSnapshot.objects.bulk_create(snapshots)
+        return snapshots
+
+    def get_date(self, value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+kardex = Kardex()
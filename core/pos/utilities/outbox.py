@@ -0,0 +1,137 @@
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.pos.choices import VOUCHER_STAGE, INVOICE_STATUS, OUTBOX_STATUS, OUTBOX_VOUCHER
+from core.pos.utilities.sri import SRI
+from core.security.utilities.metrics import metrics_recorder
+
+
+class OutboxDispatcher:
+    """Drives the pending VoucherOutbox rows of the current schema through the stages of VOUCHER_STAGE."""
+
+    max_attempts = 12
+    retry_delay = 5
+    max_retry_delay = 3600
+    processing_timeout = 600
+    pdf_wait_delay = 60
+    max_pdf_waits = 10
+
+    def __init__(self):
+        self.sri = SRI()
+
+    def claim(self, limit, authorization=False):
+        from core.pos.models import VoucherOutbox
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.processing_timeout)
+        with transaction.atomic():
+            queryset = VoucherOutbox.objects.select_for_update(skip_locked=True).filter(Q(status=OUTBOX_STATUS[0][0], next_attempt__lte=now) | Q(status=OUTBOX_STATUS[1][0], datetime_updated__lt=stale))
+            if authorization:
+                queryset = queryset.filter(stage=VOUCHER_STAGE[3][0])
+            else:
+                queryset = queryset.exclude(stage=VOUCHER_STAGE[3][0])
+            entries = list(queryset.order_by('next_attempt')[:limit])
+            VoucherOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(status=OUTBOX_STATUS[1][0], datetime_updated=now)
+        return entries
+
+    def schedule_authorization(self, voucher_type, instance):
+        from core.pos.models import VoucherOutbox
+        entry = VoucherOutbox.objects.filter(voucher_type=voucher_type, voucher_id=instance.id).exclude(status=OUTBOX_STATUS[2][0]).first()
+        if entry is None:
+            entry = VoucherOutbox(voucher_type=voucher_type, voucher_id=instance.id)
+        entry.stage = VOUCHER_STAGE[3][0]
+        entry.status = OUTBOX_STATUS[0][0]
+        entry.attempts = 1
+        entry.next_attempt = timezone.now() + self.get_retry_delay(entry)
+        entry.save()
+        return entry
+
+    def dispatch(self, limit=50, authorization_limit=200):
+        response = {'processed': 0, 'done': 0, 'failed': 0}
+        entries = self.claim(limit) + self.claim(authorization_limit, authorization=True)
+        for entry in entries:
+            self.process(entry)
+            response['processed'] += 1
+            if entry.status == OUTBOX_STATUS[2][0]:
+                response['done'] += 1
+            elif entry.status == OUTBOX_STATUS[3][0]:
+                response['failed'] += 1
+        return response
+
+    def get_client(self, entry, instance):
+        if entry.voucher_type == OUTBOX_VOUCHER[1][0]:
+            return instance.sale.client
+        return instance.client
+
+    def run_stage(self, entry, instance):
+        if entry.stage == VOUCHER_STAGE[0][0]:
+            result = self.sri.create_xml(instance)
+            entry.xml = result.get('xml')
+        elif entry.stage == VOUCHER_STAGE[1][0]:
+            result = self.sri.firm_xml(instance=instance, xml=entry.xml)
+            entry.xml = result.get('xml')
+        elif entry.stage == VOUCHER_STAGE[2][0]:
+            result = self.sri.validate_xml(instance=instance, xml=entry.xml)
+        elif entry.stage == VOUCHER_STAGE[3][0]:
+            result = self.sri.authorize_xml(instance=instance)
+            if result['resp'] and entry.voucher_type == OUTBOX_VOUCHER[1][0]:
+                instance.sale.status = INVOICE_STATUS[3][0]
+                instance.sale.edit()
+        elif not instance.pdf_authorized and self.get_client(entry, instance).send_email_invoice and entry.errors.get('pdf_waits', 0) < self.max_pdf_waits:
+            result = {'resp': False, 'wait': True, 'stage': entry.stage, 'error': 'El PDF autorizado aún no ha sido generado'}
+        else:
+            result = self.sri.notify_by_email(instance=instance, company=instance.company, client=self.get_client(entry, instance))
+        return result
+
+    def get_next_stage(self, stage):
+        stages = [choice[0] for choice in VOUCHER_STAGE]
+        index = stages.index(stage) + 1
+        return stages[index] if index < len(stages) else None
+
+    def process(self, entry):
+        try:
+            instance = entry.get_voucher()
+            while True:
+                with metrics_recorder.retries(entry.attempts + 1):
+                    result = self.run_stage(entry, instance)
+                if result.get('wait'):
+                    self.wait(entry, result)
+                    break
+                if not result['resp']:
+                    self.retry(entry, instance, result)
+                    break
+                entry.errors = {}
+                next_stage = self.get_next_stage(entry.stage)
+                if next_stage is None:
+                    entry.status = OUTBOX_STATUS[2][0]
+                    entry.xml = None
+                    break
+                entry.stage = next_stage
+        except Exception as e:
+            self.retry(entry, None, {'error': str(e)})
+        entry.save()
+        return entry
+
+    def get_retry_delay(self, entry):
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** max(entry.attempts - 1, 0))
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    def wait(self, entry, result):
+        entry.errors = {'stage': entry.stage, 'error': result.get('error', ''), 'pdf_waits': entry.errors.get('pdf_waits', 0) + 1}
+        entry.status = OUTBOX_STATUS[0][0]
+        entry.next_attempt = timezone.now() + timedelta(seconds=self.pdf_wait_delay)
+
+    def retry(self, entry, instance, result):
+        entry.attempts += 1
+        entry.errors = {'stage': entry.stage, 'error': result.get('error', '')}
+        if result.get('rejected') or entry.attempts >= self.max_attempts or (instance is not None and instance.status == INVOICE_STATUS[4][0]):
+            entry.status = OUTBOX_STATUS[3][0]
+        else:
+            if entry.stage == VOUCHER_STAGE[2][0]:
+                entry.stage = VOUCHER_STAGE[0][0]
+                entry.xml = None
+            entry.status = OUTBOX_STATUS[0][0]
+            entry.next_attempt = timezone.now() + self.get_retry_delay(entry)
@@ -1,4 +1,7 @@
+import base64
 import mimetypes
+import os
+import threading
 from pathlib import Path
 from urllib.parse import urlparse
 
@@ -10,6 +13,7 @@ from django.template.loader import get_template
 from django.urls import get_script_prefix
 from weasyprint import CSS
 from weasyprint import HTML
+from weasyprint.text.fonts import FontConfiguration
 
 from config import settings
 
@@ -41,9 +45,85 @@ def url_fetcher(url, *args, **kwargs):
     return weasyprint.default_url_fetcher(url, *args, **kwargs)
 
 
+class FileCache:
+    """File contents encoded as data URIs, kept in the worker memory until the file changes on disk."""
+
+    def __init__(self):
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def get_data_uri(self, path):
+        cache_key = (path, os.path.getmtime(path))
+        item = self.files.get(path)
+        if item is None or item[0] != cache_key:
+            with open(path, 'rb') as file:
+                base64_data = base64.b64encode(file.read()).decode('utf-8')
+            content_type = f"image/{os.path.splitext(path)[1].lstrip('.')}"
+            item = (cache_key, f'data:{content_type};base64,{base64_data}')
+            with self.lock:
+                self.files[path] = item
+        return item[1]
+
+
+file_cache = FileCache()
+
+
+class PDFRenderer:
+    """WeasyPrint renderer that keeps the parsed stylesheets, the font configuration and the compiled templates of the worker in memory."""
+
+    def __init__(self, stylesheets=None):
+        self.stylesheet_paths = stylesheets or [f'{settings.BASE_DIR}{settings.STATIC_URL}lib/bootstrap-4.6.0/css/bootstrap.min.css']
+        self.font_config = None
+        self.stylesheets = {}
+        self.templates = {}
+        self.lock = threading.Lock()
+
+    def get_font_config(self):
+        if self.font_config is None:
+            self.font_config = FontConfiguration()
+        return self.font_config
+
+    def get_stylesheet(self, path):
+        cache_key = (path, os.path.getmtime(path))
+        item = self.stylesheets.get(path)
+        if item is None or item[0] != cache_key:
+            item = (cache_key, CSS(filename=path, font_config=self.get_font_config()))
+            with self.lock:
+                self.stylesheets[path] = item
+        return item[1]
+
+    def get_stylesheets(self):
+        return [self.get_stylesheet(path) for path in self.stylesheet_paths]
+
+    def get_template(self, template_name):
+        item = self.templates.get(template_name)
+        if item is not None and os.path.getmtime(item[0]) == item[1]:
+            return item[2]
+        template = get_template(template_name)
+        origin = template.origin.name
+        with self.lock:
+            self.templates[template_name] = (origin, os.path.getmtime(origin), template)
+        return template
+
+    def write_pdf(self, html, stylesheets):
+        return HTML(string=html, base_url='.').write_pdf(stylesheets=stylesheets, font_config=self.get_font_config(), presentational_hints=True)
+
+    def render(self, context, template_name):
+        html = self.get_template(template_name).render(context)
+        return self.write_pdf(html, self.get_stylesheets())
+
+    def render_many(self, contexts, template_name):
+        template = self.get_template(template_name)
+        stylesheets = self.get_stylesheets()
+        return [self.write_pdf(template.render(context), stylesheets) for context in contexts]
+
+
+pdf_renderer = PDFRenderer()
+
+
 def create_pdf(context, template_name):
-    template = get_template(template_name)
-    html_template = template.render(context).encode(encoding="UTF-8")
-    path_css = f'{settings.BASE_DIR}{settings.STATIC_URL}lib/bootstrap-4.6.0/css/bootstrap.min.css'
-    pdf_file = HTML(string=html_template, base_url='.').write_pdf(stylesheets=[CSS(path_css)], presentational_hints=True)
-    return pdf_file
+    return pdf_renderer.render(context, template_name)
+
+
+def create_pdfs(contexts, template_name):
+    return pdf_renderer.render_many(contexts, template_name)
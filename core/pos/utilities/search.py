@@ -0,0 +1,41 @@
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import models
+from django.db.models import Q, Case, When, Value
+from django.db.models.functions import Greatest
+
+
+class TrigramSearch:
+    """Ranked autocomplete where every word of the term must appear in one of the fields, using pg_trgm GIN indexes built on UPPER(field), the expression the icontains filters compare against."""
+
+    def __init__(self, fields, exact_fields=(), ordering=()):
+        self.fields = fields
+        self.exact_fields = exact_fields
+        self.ordering = ordering
+
+    def get_match(self, term):
+        conditions = [When(**{f'{field}__iexact': term, 'then': Value(2)}) for field in self.exact_fields]
+        conditions += [When(**{f'{field}__istartswith': term, 'then': Value(1)}) for field in self.fields]
+        return Case(*conditions, default=Value(0), output_field=models.IntegerField())
+
+    def get_rank(self, term):
+        similarities = [TrigramWordSimilarity(term, field) for field in self.fields]
+        if len(similarities) == 1:
+            return similarities[0]
+        return Greatest(*similarities)
+
+    def search(self, queryset, term):
+        term = term.strip()
+        if not len(term):
+            return queryset.order_by(*self.ordering)
+        for word in term.split():
+            condition = Q()
+            for field in self.fields:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        queryset = queryset.annotate(search_match=self.get_match(term), search_rank=self.get_rank(term))
+        return queryset.order_by('-search_match', '-search_rank', *self.ordering)
+
+
+product_search = TrigramSearch(fields=('name', 'code'), exact_fields=('code',), ordering=('name',))
+
+client_search = TrigramSearch(fields=('user__names', 'dni'), exact_fields=('dni',), ordering=('user__names',))
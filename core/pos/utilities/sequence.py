@@ -0,0 +1,83 @@
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connection, connections, transaction
+
+from config import settings
+
+
+class SequenceAllocator:
+    """Hands out the voucher numbers of a Receipt under a row lock or from blocks reserved per worker."""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self.blocks = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def get_block_size(self):
+        return max(self.block_size or settings.VOUCHER_SEQUENCE_BLOCK_SIZE, 1)
+
+    def get_key(self, receipt):
+        return getattr(connection, 'schema_name', None), receipt.pk
+
+    def get_connection(self):
+        if not hasattr(self.local, 'connection'):
+            self.local.connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        self.local.connection.close_if_unusable_or_obsolete()
+        return self.local.connection
+
+    def close(self):
+        if hasattr(self.local, 'connection'):
+            self.local.connection.close()
+            del self.local.connection
+
+    def allocate_locked(self, receipt):
+        with transaction.atomic():
+            sequence = type(receipt).objects.select_for_update().values_list('sequence', flat=True).get(pk=receipt.pk) + 1
+            type(receipt).objects.filter(pk=receipt.pk).update(sequence=sequence)
+        receipt.sequence = sequence
+        return sequence
+
+    def execute_reserve(self, receipt, size):
+        block_connection = self.get_connection()
+        if hasattr(block_connection, 'set_schema'):
+            block_connection.set_schema(connection.schema_name)
+        with block_connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {receipt._meta.db_table} SET sequence = sequence + %s WHERE id = %s RETURNING sequence', [size, receipt.pk])
+            last = cursor.fetchone()[0]
+        return [last - size + 1, last]
+
+    def reserve_block(self, receipt, size):
+        try:
+            return self.execute_reserve(receipt, size)
+        except (OperationalError, InterfaceError):
+            self.local.connection.close()
+            return self.execute_reserve(receipt, size)
+
+    def allocate_from_block(self, receipt):
+        key = self.get_key(receipt)
+        with self.lock:
+            block = self.blocks.get(key)
+            if block is None or block[0] > block[1]:
+                block = self.reserve_block(receipt, self.get_block_size())
+                self.blocks[key] = block
+            sequence = block[0]
+            block[0] += 1
+        receipt.sequence = sequence
+        return sequence
+
+    def allocate(self, receipt):
+        if self.get_block_size() > 1:
+            return self.allocate_from_block(receipt)
+        return self.allocate_locked(receipt)
+
+    def drop(self, receipt_id=None):
+        with self.lock:
+            if receipt_id is None:
+                self.blocks.clear()
+            else:
+                for key in [key for key in self.blocks if key[1] == receipt_id]:
+                    del self.blocks[key]
+
+
+sequence_allocator = SequenceAllocator()
@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import os
+import random
+import threading
+
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.serialization import pkcs12
+from django.utils import timezone
+from lxml import etree
+
+DS_NAMESPACE = 'http://www.w3.org/2000/09/xmldsig#'
+ETSI_NAMESPACE = 'http://uri.etsi.org/01903/v1.3.2#'
+NAMESPACES = {'ds': DS_NAMESPACE, 'etsi': ETSI_NAMESPACE}
+C14N_ALGORITHM = 'http://www.w3.org/TR/2001/REC-xml-c14n-20010315'
+SIGNATURE_ALGORITHM = f'{DS_NAMESPACE}rsa-sha1'
+DIGEST_ALGORITHM = f'{DS_NAMESPACE}sha1'
+ENVELOPED_ALGORITHM = f'{DS_NAMESPACE}enveloped-signature'
+SIGNED_PROPERTIES_TYPE = 'http://uri.etsi.org/01903#SignedProperties'
+
+
+class KeyStore:
+    def __init__(self, private_key, certificate):
+        self.private_key = private_key
+        self.certificate = certificate
+        self.certificate_der = certificate.public_bytes(serialization.Encoding.DER)
+        self.certificate_digest = base64.b64encode(hashlib.sha1(self.certificate_der).digest()).decode()
+        self.issuer_name = certificate.issuer.rfc4514_string()
+        self.serial_number = str(certificate.serial_number)
+        public_numbers = private_key.public_key().public_numbers()
+        self.modulus = self.int_to_base64(public_numbers.n)
+        self.exponent = self.int_to_base64(public_numbers.e)
+
+    def int_to_base64(self, number):
+        return base64.b64encode(number.to_bytes((number.bit_length() + 7) // 8, 'big')).decode()
+
+    @classmethod
+    def load(cls, data, password):
+        private_key, certificate, additional_certificates = pkcs12.load_key_and_certificates(data, password.encode())
+        if private_key is None:
+            raise ValueError('El archivo de la firma electrónica no contiene una clave privada')
+        public_key = private_key.public_key().public_numbers()
+        for item in [certificate] + list(additional_certificates):
+            if item is not None and item.public_key().public_numbers() == public_key:
+                certificate = item
+                break
+        if certificate is None:
+            raise ValueError('El archivo de la firma electrónica no contiene un certificado')
+        return cls(private_key, certificate)
+
+
+class KeyStoreCache:
+    """Decrypted PKCS#12 key stores per company, kept in the worker memory until the company is edited."""
+
+    def __init__(self):
+        self.key_stores = {}
+        self.lock = threading.Lock()
+
+    def get_cache_key(self, company, path):
+        return company.pk, path, os.path.getmtime(path), company.electronic_signature_key
+
+    def get(self, company, path):
+        cache_key = self.get_cache_key(company, path)
+        key_store = self.key_stores.get(company.pk)
+        if key_store is None or key_store[0] != cache_key:
+            with open(path, 'rb') as file:
+                key_store = (cache_key, KeyStore.load(file.read(), company.electronic_signature_key))
+            with self.lock:
+                self.key_stores[company.pk] = key_store
+        return key_store[1]
+
+    def drop(self, company_id=None):
+        with self.lock:
+            if company_id is None:
+                self.key_stores.clear()
+            else:
+                self.key_stores.pop(company_id, None)
+
+
+key_store_cache = KeyStoreCache()
+
+
+class XAdESSigner:
+    """Enveloped XAdES-BES signer (RSA-SHA1, C14N 1.0) with the layout expected by the SRI."""
+
+    def __init__(self, key_store):
+        self.key_store = key_store
+
+    def digest(self, element):
+        return base64.b64encode(hashlib.sha1(etree.tostring(element, method='c14n')).digest()).decode()
+
+    def ds(self, parent, tag, attrib=None, text=None):
+        element = etree.SubElement(parent, f'{{{DS_NAMESPACE}}}{tag}', attrib=attrib or {})
+        element.text = text
+        return element
+
+    def etsi(self, parent, tag, attrib=None, text=None):
+        element = etree.SubElement(parent, f'{{{ETSI_NAMESPACE}}}{tag}', attrib=attrib or {})
+        element.text = text
+        return element
+
+    def add_reference(self, signed_info, uri, attrib=None, transforms=None):
+        reference = self.ds(signed_info, 'Reference', attrib=dict(attrib or {}, URI=uri))
+        if transforms:
+            xml_transforms = self.ds(reference, 'Transforms')
+            for algorithm in transforms:
+                self.ds(xml_transforms, 'Transform', attrib={'Algorithm': algorithm})
+        self.ds(reference, 'DigestMethod', attrib={'Algorithm': DIGEST_ALGORITHM})
+        return self.ds(reference, 'DigestValue')
+
+    def sign(self, xml):
+        root = etree.fromstring(xml.encode('utf-8') if isinstance(xml, str) else xml)
+        number = random.randint(100000, 999999)
+        signature_id = f'Signature{number}'
+        signed_properties_id = f'{signature_id}-SignedProperties{random.randint(100000, 999999)}'
+        certificate_id = f'Certificate{random.randint(100000, 999999)}'
+        reference_id = f'Reference-ID-{random.randint(100000, 999999)}'
+        document_digest = self.digest(root)
+
+        signature = etree.SubElement(root, f'{{{DS_NAMESPACE}}}Signature', attrib={'Id': signature_id}, nsmap=NAMESPACES)
+        signed_info = self.ds(signature, 'SignedInfo', attrib={'Id': f'Signature-SignedInfo{random.randint(100000, 999999)}'})
+        self.ds(signed_info, 'CanonicalizationMethod', attrib={'Algorithm': C14N_ALGORITHM})
+        self.ds(signed_info, 'SignatureMethod', attrib={'Algorithm': SIGNATURE_ALGORITHM})
+        signed_properties_digest = self.add_reference(signed_info, f'#{signed_properties_id}', attrib={'Id': f'SignedPropertiesID{random.randint(100000, 999999)}', 'Type': SIGNED_PROPERTIES_TYPE})
+        certificate_digest = self.add_reference(signed_info, f'#{certificate_id}')
+        self.add_reference(signed_info, '#comprobante', attrib={'Id': reference_id}, transforms=[ENVELOPED_ALGORITHM]).text = document_digest
+        signature_value = self.ds(signature, 'SignatureValue', attrib={'Id': f'SignatureValue{random.randint(100000, 999999)}'})
+
+        key_info = self.ds(signature, 'KeyInfo', attrib={'Id': certificate_id})
+        x509_data = self.ds(key_info, 'X509Data')
+        self.ds(x509_data, 'X509Certificate', text=base64.b64encode(self.key_store.certificate_der).decode())
+        rsa_key_value = self.ds(self.ds(key_info, 'KeyValue'), 'RSAKeyValue')
+        self.ds(rsa_key_value, 'Modulus', text=self.key_store.modulus)
+        self.ds(rsa_key_value, 'Exponent', text=self.key_store.exponent)
+
+        xml_object = self.ds(signature, 'Object', attrib={'Id': f'{signature_id}-Object{random.randint(100000, 999999)}'})
+        qualifying_properties = self.etsi(xml_object, 'QualifyingProperties', attrib={'Target': f'#{signature_id}'})
+        signed_properties = self.etsi(qualifying_properties, 'SignedProperties', attrib={'Id': signed_properties_id})
+        signed_signature_properties = self.etsi(signed_properties, 'SignedSignatureProperties')
+        self.etsi(signed_signature_properties, 'SigningTime', text=timezone.localtime().isoformat(timespec='seconds'))
+        cert = self.etsi(self.etsi(signed_signature_properties, 'SigningCertificate'), 'Cert')
+        cert_digest = self.etsi(cert, 'CertDigest')
+        self.ds(cert_digest, 'DigestMethod', attrib={'Algorithm': DIGEST_ALGORITHM})
+        self.ds(cert_digest, 'DigestValue', text=self.key_store.certificate_digest)
+        issuer_serial = self.etsi(cert, 'IssuerSerial')
+        self.ds(issuer_serial, 'X509IssuerName', text=self.key_store.issuer_name)
+        self.ds(issuer_serial, 'X509SerialNumber', text=self.key_store.serial_number)
+        signed_data_object_properties = self.etsi(signed_properties, 'SignedDataObjectProperties')
+        data_object_format = self.etsi(signed_data_object_properties, 'DataObjectFormat', attrib={'ObjectReference': f'#{reference_id}'})
+        self.etsi(data_object_format, 'Description', text='contenido comprobante')
+        self.etsi(data_object_format, 'MimeType', text='text/xml')
+
+        signed_properties_digest.text = self.digest(signed_properties)
+        certificate_digest.text = self.digest(key_info)
+        signature_value.text = base64.b64encode(self.key_store.private_key.sign(etree.tostring(signed_info, method='c14n'), padding.PKCS1v15(), hashes.SHA1())).decode()
+        return f'<?xml version="1.0" encoding="UTF-8"?>\n{etree.tostring(root, encoding="unicode")}'
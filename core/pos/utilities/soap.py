@@ -0,0 +1,121 @@
+import threading
+from datetime import datetime
+from io import BytesIO
+
+import requests
+from suds.client import Client
+from suds.transport import Reply, Transport, TransportError
+
+from config import settings
+
+SRI_SERVICES = {
+    'receipt': {
+        1: 'https://celcer.sri.gob.ec/comprobantes-electronicos-ws/RecepcionComprobantesOffline?wsdl',
+        2: 'https://cel.sri.gob.ec/comprobantes-electronicos-ws/RecepcionComprobantesOffline?wsdl',
+    },
+    'authorization': {
+        1: 'https://celcer.sri.gob.ec/comprobantes-electronicos-ws/AutorizacionComprobantesOffline?wsdl',
+        2: 'https://cel.sri.gob.ec/comprobantes-electronicos-ws/AutorizacionComprobantesOffline?wsdl',
+    },
+}
+
+
+class SessionTransport(Transport):
+    """suds transport backed by a requests session so the TLS connection to SRI is kept alive between calls."""
+
+    def __init__(self, session, timeout):
+        Transport.__init__(self)
+        self.session = session
+        self.timeout = timeout
+
+    def open(self, request):
+        response = self.session.get(request.url, headers=request.headers, timeout=self.timeout)
+        if response.status_code >= 300:
+            raise TransportError(response.reason, response.status_code, BytesIO(response.content))
+        return BytesIO(response.content)
+
+    def send(self, request):
+        response = self.session.post(request.url, data=request.message, headers=request.headers, timeout=self.timeout)
+        if response.status_code >= 300:
+            raise TransportError(response.reason, response.status_code, BytesIO(response.content))
+        return Reply(response.status_code, response.headers, response.content)
+
+
+class SRIClientRegistry:
+    """Process wide registry of SOAP clients keyed by service and environment type, each WSDL is parsed only once."""
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout or getattr(settings, 'SRI_TIMEOUT', 30)
+        self.clients = {}
+        self.loaded_at = {}
+        self.errors = {}
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+
+    def get_url(self, service, environment_type):
+        environment_type = int(environment_type)
+        url = SRI_SERVICES[service].get(environment_type, SRI_SERVICES[service][1])
+        base_url = getattr(settings, 'SRI_BASE_URL', None)
+        if base_url:
+            return f"{base_url.rstrip('/')}/{url.rsplit('/', 1)[1]}"
+        return url
+
+    def get_client(self, service, environment_type):
+        key = (service, int(environment_type))
+        client = self.clients.get(key)
+        if client is None:
+            with self.lock:
+                client = self.clients.get(key)
+                if client is None:
+                    try:
+                        client = Client(self.get_url(*key), transport=SessionTransport(self.session, self.timeout))
+                    except Exception as e:
+                        self.errors[key] = str(e)
+                        raise
+                    self.clients[key] = client
+                    self.loaded_at[key] = datetime.now()
+                    self.errors.pop(key, None)
+        return client
+
+    def invalidate(self, service=None, environment_type=None):
+        with self.lock:
+            for key in list(self.clients.keys()):
+                if service in (None, key[0]) and environment_type in (None, key[1]):
+                    del self.clients[key]
+                    self.loaded_at.pop(key, None)
+
+    def warm_up(self, environment_types=None):
+        response = {}
+        for service in SRI_SERVICES:
+            for environment_type in environment_types or SRI_SERVICES[service].keys():
+                try:
+                    self.get_client(service, environment_type)
+                    response[f'{service}_{environment_type}'] = True
+                except Exception:
+                    response[f'{service}_{environment_type}'] = False
+        return response
+
+    def health(self):
+        response = []
+        for service in SRI_SERVICES:
+            for environment_type in SRI_SERVICES[service]:
+                url = self.get_url(service, environment_type)
+                key = (service, environment_type)
+                item = {
+                    'service': service,
+                    'environment_type': environment_type,
+                    'url': url,
+                    'loaded': key in self.clients,
+                    'loaded_at': self.loaded_at[key].strftime('%Y-%m-%d %H:%M:%S') if key in self.loaded_at else None,
+                    'available': False,
+                    'error': self.errors.get(key),
+                }
+                try:
+                    item['available'] = self.session.head(url, timeout=self.timeout).status_code < 500
+                except Exception as e:
+                    item['error'] = str(e)
+                response.append(item)
+        return response
+
+
+sri_clients = SRIClientRegistry()
@@ -1,7 +1,6 @@
 import base64
 import os.path
 import random
-import smtplib
 import string
 import subprocess
 from datetime import datetime
@@ -13,12 +12,17 @@ from pathlib import Path
 from tempfile import NamedTemporaryFile
 
 import requests
-from django.core.files import File
+from django.core.files.base import ContentFile
 from lxml import etree
-from suds.client import Client
 
 from config import settings
-from core.pos.choices import VOUCHER_STAGE, INVOICE_STATUS
+from core.pos.choices import VOUCHER_STAGE, INVOICE_STATUS, OUTBOX_VOUCHER
+from core.pos.utilities.signer import XAdESSigner, key_store_cache
+from core.pos.utilities.soap import sri_clients
+from core.pos.utilities.xsd import voucher_schema
+from core.security.choices import EMAIL_STATUS
+from core.security.utilities.mailer import EmailDispatcher
+from core.security.utilities.metrics import instrument
 
 
 class SRI:
@@ -54,14 +58,16 @@ class SRI:
         return None
 
     def get_receipt_url(self, instance):
-        if instance.company.environment_type == 2:
-            return 'https://cel.sri.gob.ec/comprobantes-electronicos-ws/RecepcionComprobantesOffline?wsdl'
-        return 'https://celcer.sri.gob.ec/comprobantes-electronicos-ws/RecepcionComprobantesOffline?wsdl'
+        return sri_clients.get_url('receipt', instance.company.environment_type)
 
     def get_authorization_url(self, instance):
-        if instance.company.environment_type == 2:
-            return 'https://cel.sri.gob.ec/comprobantes-electronicos-ws/AutorizacionComprobantesOffline?wsdl'
-        return 'https://celcer.sri.gob.ec/comprobantes-electronicos-ws/AutorizacionComprobantesOffline?wsdl'
+        return sri_clients.get_url('authorization', instance.company.environment_type)
+
+    def get_receipt_client(self, instance):
+        return sri_clients.get_client('receipt', instance.company.environment_type)
+
+    def get_authorization_client(self, instance):
+        return sri_clients.get_client('authorization', instance.company.environment_type)
 
     def check_sequential_error(self, errors):
         if 'error' in errors and isinstance(errors['error'], dict):
@@ -91,14 +97,20 @@ class SRI:
                 instance.status = INVOICE_STATUS[4][0]
                 instance.edit()
 
+    @instrument(VOUCHER_STAGE[0][0])
     def create_xml(self, instance):
         response = {'resp': False, 'stage': VOUCHER_STAGE[1][0]}
         try:
             xml, access_code = instance.generate_xml()
             instance.access_code = access_code
             instance.save()
-            response['resp'] = True
-            response['xml'] = xml
+            errors = voucher_schema.validate(xml) if settings.SRI_XSD_VALIDATION else []
+            if len(errors):
+                response['rejected'] = True
+                response['error'] = {'access_code': access_code, 'errors': errors}
+            else:
+                response['resp'] = True
+                response['xml'] = xml
         except Exception as e:
             response['error'] = str(e)
         finally:
@@ -106,8 +118,10 @@ class SRI:
                 self.create_voucher_errors(instance, response)
         return response
 
-    def firm_xml(self, instance, xml):
-        response = {'resp': False, 'stage': VOUCHER_STAGE[1][0]}
+    def get_key_store(self, company):
+        return key_store_cache.get(company, self.get_absolute_path(company.electronic_signature.path))
+
+    def sign_with_jar(self, instance, xml):
         file_temp_name = ''
         try:
             with NamedTemporaryFile(suffix='.xml', delete=False) as file_temp:
@@ -120,46 +134,119 @@ class SRI:
                 xml_name = f'{instance.voucher_number}.xml'
                 commands = ['java', '-jar', jar_path, certificate_path, certificate_key, file_temp.name, self.base_dir, xml_name]
                 procedure = subprocess.run(args=commands, capture_output=True)
-                if procedure.returncode == 0:
-                    error = procedure.stdout.decode('utf-8')
-                    if error.__contains__('Error'):
-                        response['error'] = error
-                    else:
-                        generated_xml_path = os.path.join(self.base_dir, xml_name)
-                        with open(generated_xml_path, 'rb') as file:
-                            response['resp'] = True
-                            response['xml'] = file.read().decode('utf-8')
-                        if os.path.exists(generated_xml_path):
-                            os.remove(generated_xml_path)
-                else:
-                    response['error'] = procedure.stderr.decode('utf-8')
-        except Exception as e:
-            response['error'] = str(e)
+                if procedure.returncode != 0:
+                    raise Exception(procedure.stderr.decode('utf-8'))
+                error = procedure.stdout.decode('utf-8')
+                if error.__contains__('Error'):
+                    raise Exception(error)
+                generated_xml_path = os.path.join(self.base_dir, xml_name)
+                with open(generated_xml_path, 'rb') as file:
+                    signed_xml = file.read().decode('utf-8')
+                if os.path.exists(generated_xml_path):
+                    os.remove(generated_xml_path)
+                return signed_xml
         finally:
             if os.path.exists(file_temp_name):
                 os.remove(file_temp_name)
+
+    @instrument(VOUCHER_STAGE[1][0])
+    def firm_xml(self, instance, xml):
+        response = {'resp': False, 'stage': VOUCHER_STAGE[1][0]}
+        try:
+            key_store = None
+            if settings.SRI_SIGNER == 'xades':
+                try:
+                    key_store = self.get_key_store(instance.company)
+                except Exception:
+                    key_store = None
+            if key_store is None:
+                response['xml'] = self.sign_with_jar(instance, xml)
+            else:
+                response['xml'] = XAdESSigner(key_store).sign(xml)
+            response['resp'] = True
+        except Exception as e:
+            response['error'] = str(e)
+        finally:
             if 'error' in response:
                 self.create_voucher_errors(instance, response)
         return response
 
+    def get_receipt_messages(self, receipt):
+        messages = []
+        for count, value in enumerate(receipt.mensajes):
+            message = value[1][count]
+            values = dict()
+            for name in ['identificador', 'informacionAdicional', 'mensaje', 'tipo']:
+                if name in message:
+                    values[name] = message[name]
+            messages.append(values)
+        return messages
+
+    def create_batch_xml(self, instance, xmls):
+        root = etree.Element('lote', version='1.0.0')
+        etree.SubElement(root, 'claveAcceso').text = self.create_access_key(instance)
+        etree.SubElement(root, 'ruc').text = instance.company.ruc
+        vouchers = etree.SubElement(root, 'comprobantes')
+        for xml in xmls:
+            etree.SubElement(vouchers, 'comprobante').text = etree.CDATA(xml.strip())
+        return '<?xml version="1.0" encoding="UTF-8"?>\n' + etree.tostring(root, encoding='unicode')
+
+    @instrument(VOUCHER_STAGE[2][0])
+    def validate_batch(self, items):
+        responses = {instance.id: {'resp': False, 'stage': VOUCHER_STAGE[2][0]} for instance, xml in items}
+        instances = {instance.access_code: instance for instance, xml in items}
+        try:
+            document = self.create_batch_xml(items[0][0], [xml for instance, xml in items]).encode('utf-8')
+            sri_client = self.get_receipt_client(items[0][0])
+            result = sri_client.service.validarComprobante(base64.b64encode(document).decode('utf-8'))
+            if result.estado == 'RECIBIDA':
+                for instance, xml in items:
+                    responses[instance.id]['resp'] = True
+                    responses[instance.id]['xml'] = xml
+            elif result.estado == 'DEVUELTA':
+                for receipt in result.comprobantes.comprobante:
+                    instance = instances.get(receipt.claveAcceso)
+                    if instance is not None:
+                        responses[instance.id]['error'] = {'access_code': receipt.claveAcceso, 'errors': self.get_receipt_messages(receipt)}
+                for instance, xml in items:
+                    if 'error' in responses[instance.id]:
+                        self.create_voucher_errors(instance, responses[instance.id])
+                    else:
+                        responses[instance.id] = self.validate_xml(instance=instance, xml=xml)
+        except Exception as e:
+            for instance, xml in items:
+                responses[instance.id]['error'] = str(e)
+                self.create_voucher_errors(instance, responses[instance.id])
+        return responses
+
+    def send_batch(self, instances):
+        responses = {}
+        groups = {}
+        for instance in instances:
+            result = self.create_xml(instance)
+            if result['resp']:
+                result = self.firm_xml(instance=instance, xml=result['xml'])
+            responses[instance.id] = result
+            if result['resp']:
+                groups.setdefault((instance.company.environment_type, instance.receipt.voucher_type), []).append((instance, result['xml']))
+        batch_size = settings.SRI_BATCH_SIZE
+        for items in groups.values():
+            for index in range(0, len(items), batch_size):
+                responses.update(self.validate_batch(items[index:index + batch_size]))
+        return responses
+
+    @instrument(VOUCHER_STAGE[2][0])
     def validate_xml(self, instance, xml):
         response = {'resp': False, 'stage': VOUCHER_STAGE[2][0]}
         try:
             document = xml.strip().encode('utf-8')
             base64_binary_xml = base64.b64encode(document).decode('utf-8')
-            sri_client = Client(self.get_receipt_url(instance))
+            sri_client = self.get_receipt_client(instance)
             result = sri_client.service.validarComprobante(base64_binary_xml)
             status = result.estado
             if status == 'DEVUELTA':
                 receipt = result.comprobantes.comprobante[0]
-                response['error'] = {'access_code': receipt.claveAcceso, 'errors': []}
-                for count, value in enumerate(receipt.mensajes):
-                    message = value[1][count]
-                    values = dict()
-                    for name in ['identificador', 'informacionAdicional', 'mensaje', 'tipo']:
-                        if name in message:
-                            values[name] = message[name]
-                    response['error']['errors'].append(values)
+                response['error'] = {'access_code': receipt.claveAcceso, 'errors': self.get_receipt_messages(receipt)}
             elif status == 'RECIBIDA':
                 response['resp'] = True
                 response['xml'] = xml
@@ -170,22 +257,20 @@ class SRI:
                 self.create_voucher_errors(instance, response)
         return response
 
+    @instrument(VOUCHER_STAGE[3][0])
     def authorize_xml(self, instance):
         response = {'resp': False, 'stage': VOUCHER_STAGE[3][0]}
         try:
-            sri_client = Client(self.get_authorization_url(instance))
+            sri_client = self.get_authorization_client(instance)
             result = sri_client.service.autorizacionComprobante(instance.access_code)
-            if len(result):
-                receipt = result[2].autorizacion[0]
+            authorizations = getattr(result[2], 'autorizacion', None) if len(result) > 2 else None
+            if not authorizations:
+                response['pending'] = True
+            else:
+                receipt = authorizations[0]
                 if receipt.estado == 'NO AUTORIZADO':
-                    response['error'] = {'access_code': instance.access_code, 'stage': receipt.estado, 'authorization_date': str(receipt.fechaAutorizacion), 'errors': []}
-                    for count, value in enumerate(receipt.mensajes):
-                        message = value[1][count]
-                        values = dict()
-                        for name in ['identificador', 'informacionAdicional', 'mensaje', 'tipo']:
-                            if name in message:
-                                values[name] = message[name]
-                        response['error']['errors'].append(values)
+                    response['rejected'] = True
+                    response['error'] = {'access_code': instance.access_code, 'stage': receipt.estado, 'authorization_date': str(receipt.fechaAutorizacion), 'errors': self.get_receipt_messages(receipt)}
                 else:
                     xml_authorization = etree.Element('autorizacion')
                     etree.SubElement(xml_authorization, 'estado').text = receipt.estado
@@ -194,16 +279,13 @@ class SRI:
                     voucher_sri = etree.SubElement(xml_authorization, 'comprobante')
                     voucher_sri.text = etree.CDATA(receipt.comprobante)
                     xml_text = etree.tostring(xml_authorization, encoding="utf8", xml_declaration=True).decode('utf8').replace("'", '"')
-                    with NamedTemporaryFile(delete=True) as file_temp:
-                        xml_path = f'{instance.company.scheme.schema_name}/xml/{self.current_date.year}/{self.current_date.month}/{self.current_date.day}/{instance.receipt.get_name_xml()}_{instance.access_code}.xml'
-                        file_temp.write(xml_text.encode())
-                        file_temp.flush()
-                        instance.xml_authorized.save(name=xml_path, content=File(file_temp))
-                        instance.authorization_date = receipt.fechaAutorizacion
-                        instance.generate_pdf_authorized()
-                        instance.status = INVOICE_STATUS[1][0]
-                        instance.save()
-                        response['resp'] = True
+                    current_date = datetime.now()
+                    xml_path = f'{instance.company.scheme.schema_name}/xml/{current_date.year}/{current_date.month}/{current_date.day}/{instance.receipt.get_name_xml()}_{instance.access_code}.xml'
+                    instance.xml_authorized.save(name=xml_path, content=ContentFile(xml_text.encode()), save=False)
+                    instance.authorization_date = receipt.fechaAutorizacion
+                    instance.status = INVOICE_STATUS[1][0]
+                    instance.save()
+                    response['resp'] = True
         except Exception as e:
             response['error'] = str(e)
         finally:
@@ -211,6 +293,10 @@ class SRI:
                 self.create_voucher_errors(instance, response)
         return response
 
+    def get_voucher_type(self, instance):
+        return OUTBOX_VOUCHER[1][0] if type(instance).__name__ == 'CreditNote' else OUTBOX_VOUCHER[0][0]
+
+    @instrument(VOUCHER_STAGE[4][0])
     def notify_by_email(self, instance, company, client):
         response = {'resp': False, 'stage': VOUCHER_STAGE[4][0]}
         try:
@@ -228,19 +314,17 @@ class SRI:
                 content += f'AUTORIZACIÓN: {instance.access_code}'
                 part = MIMEText(content)
                 message.attach(part)
-                with open(f'{settings.BASE_DIR}{instance.get_pdf_authorized()}', 'rb') as file:
+                if not instance.pdf_authorized:
+                    instance.generate_pdf_authorized()
+                with instance.pdf_authorized.open('rb') as file:
                     part = MIMEApplication(file.read())
                     part.add_header('Content-Disposition', 'attachment', filename=f'{instance.access_code}.pdf')
                     message.attach(part)
-                with open(f'{settings.BASE_DIR}{instance.get_xml_authorized()}', 'rb') as file:
+                with instance.xml_authorized.open('rb') as file:
                     part = MIMEApplication(file.read())
                     part.add_header('Content-Disposition', 'attachment', filename=f'{instance.access_code}.xml')
                     message.attach(part)
-                server = smtplib.SMTP(company.email_host, company.email_port)
-                server.starttls()
-                server.login(company.email_host_user, company.email_host_password)
-                server.sendmail(company.email_host_user, message['To'], message.as_string())
-                server.quit()
+                EmailDispatcher().enqueue(message, company, reference_type=self.get_voucher_type(instance), reference_id=instance.id)
             instance.status = INVOICE_STATUS[2][0]
             instance.save()
             response['resp'] = True
@@ -258,3 +342,11 @@ class SRI:
         else:
             response['error'] = r.json()['mensaje']
         return response
+
+
+def revert_email_status(sender, instance, **kwargs):
+    if instance.status != EMAIL_STATUS[3][0] or instance.reference_id is None:
+        return
+    from core.pos.models import Sale, CreditNote
+    model = CreditNote if instance.reference_type == OUTBOX_VOUCHER[1][0] else Sale
+    model.objects.filter(pk=instance.reference_id, status=INVOICE_STATUS[2][0]).update(status=INVOICE_STATUS[1][0])
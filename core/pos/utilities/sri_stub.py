@@ -0,0 +1,322 @@
+import base64
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape
+
+from lxml import etree
+
+SOAP_NAMESPACE = 'http://schemas.xmlsoap.org/soap/envelope/'
+RECEIPT_NAMESPACE = 'http://ec.gob.sri.ws.recepcion'
+AUTHORIZATION_NAMESPACE = 'http://ec.gob.sri.ws.autorizacion'
+
+MESSAGE_TYPE = """
+      <xs:complexType name="mensaje">
+        <xs:sequence>
+          <xs:element name="identificador" type="xs:string" minOccurs="0"/>
+          <xs:element name="mensaje" type="xs:string" minOccurs="0"/>
+          <xs:element name="informacionAdicional" type="xs:string" minOccurs="0"/>
+          <xs:element name="tipo" type="xs:string" minOccurs="0"/>
+        </xs:sequence>
+      </xs:complexType>"""
+
+RECEIPT_WSDL = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="http://ec.gob.sri.ws.recepcion" targetNamespace="http://ec.gob.sri.ws.recepcion" name="RecepcionComprobantesOfflineService">
+  <types>
+    <xs:schema targetNamespace="http://ec.gob.sri.ws.recepcion" version="1.0">
+      <xs:element name="validarComprobante" type="tns:validarComprobante"/>
+      <xs:element name="validarComprobanteResponse" type="tns:validarComprobanteResponse"/>
+      <xs:complexType name="validarComprobante">
+        <xs:sequence>
+          <xs:element name="xml" type="xs:base64Binary" minOccurs="0"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="validarComprobanteResponse">
+        <xs:sequence>
+          <xs:element name="RespuestaRecepcionComprobante" type="tns:respuestaSolicitud" minOccurs="0"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="respuestaSolicitud">
+        <xs:sequence>
+          <xs:element name="estado" type="xs:string" minOccurs="0"/>
+          <xs:element name="comprobantes" minOccurs="0">
+            <xs:complexType>
+              <xs:sequence>
+                <xs:element name="comprobante" type="tns:comprobante" minOccurs="0" maxOccurs="unbounded"/>
+              </xs:sequence>
+            </xs:complexType>
+          </xs:element>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="comprobante">
+        <xs:sequence>
+          <xs:element name="claveAcceso" type="xs:string" minOccurs="0"/>
+          <xs:element name="mensajes" minOccurs="0">
+            <xs:complexType>
+              <xs:sequence>
+                <xs:element name="mensaje" type="tns:mensaje" minOccurs="0" maxOccurs="unbounded"/>
+              </xs:sequence>
+            </xs:complexType>
+          </xs:element>
+        </xs:sequence>
+      </xs:complexType>{message_type}
+    </xs:schema>
+  </types>
+  <message name="validarComprobante">
+    <part name="parameters" element="tns:validarComprobante"/>
+  </message>
+  <message name="validarComprobanteResponse">
+    <part name="parameters" element="tns:validarComprobanteResponse"/>
+  </message>
+  <portType name="RecepcionComprobantesOffline">
+    <operation name="validarComprobante">
+      <input message="tns:validarComprobante"/>
+      <output message="tns:validarComprobanteResponse"/>
+    </operation>
+  </portType>
+  <binding name="RecepcionComprobantesOfflinePortBinding" type="tns:RecepcionComprobantesOffline">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http" style="document"/>
+    <operation name="validarComprobante">
+      <soap:operation soapAction=""/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="RecepcionComprobantesOfflineService">
+    <port name="RecepcionComprobantesOfflinePort" binding="tns:RecepcionComprobantesOfflinePortBinding">
+      <soap:address location="{location}"/>
+    </port>
+  </service>
+</definitions>
+"""
+
+AUTHORIZATION_WSDL = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/" xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/" xmlns:xs="http://www.w3.org/2001/XMLSchema" xmlns:tns="http://ec.gob.sri.ws.autorizacion" targetNamespace="http://ec.gob.sri.ws.autorizacion" name="AutorizacionComprobantesOfflineService">
+  <types>
+    <xs:schema targetNamespace="http://ec.gob.sri.ws.autorizacion" version="1.0">
+      <xs:element name="autorizacionComprobante" type="tns:autorizacionComprobante"/>
+      <xs:element name="autorizacionComprobanteResponse" type="tns:autorizacionComprobanteResponse"/>
+      <xs:complexType name="autorizacionComprobante">
+        <xs:sequence>
+          <xs:element name="claveAccesoComprobante" type="xs:string" minOccurs="0"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="autorizacionComprobanteResponse">
+        <xs:sequence>
+          <xs:element name="RespuestaAutorizacionComprobante" type="tns:respuestaComprobante" minOccurs="0"/>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="respuestaComprobante">
+        <xs:sequence>
+          <xs:element name="claveAccesoConsultada" type="xs:string" minOccurs="0"/>
+          <xs:element name="numeroComprobantes" type="xs:string" minOccurs="0"/>
+          <xs:element name="autorizaciones" minOccurs="0">
+            <xs:complexType>
+              <xs:sequence>
+                <xs:element name="autorizacion" type="tns:autorizacion" minOccurs="0" maxOccurs="unbounded"/>
+              </xs:sequence>
+            </xs:complexType>
+          </xs:element>
+        </xs:sequence>
+      </xs:complexType>
+      <xs:complexType name="autorizacion">
+        <xs:sequence>
+          <xs:element name="estado" type="xs:string" minOccurs="0"/>
+          <xs:element name="numeroAutorizacion" type="xs:string" minOccurs="0"/>
+          <xs:element name="fechaAutorizacion" type="xs:dateTime" minOccurs="0"/>
+          <xs:element name="ambiente" type="xs:string" minOccurs="0"/>
+          <xs:element name="comprobante" type="xs:string" minOccurs="0"/>
+          <xs:element name="mensajes" minOccurs="0">
+            <xs:complexType>
+              <xs:sequence>
+                <xs:element name="mensaje" type="tns:mensaje" minOccurs="0" maxOccurs="unbounded"/>
+              </xs:sequence>
+            </xs:complexType>
+          </xs:element>
+        </xs:sequence>
+      </xs:complexType>{message_type}
+    </xs:schema>
+  </types>
+  <message name="autorizacionComprobante">
+    <part name="parameters" element="tns:autorizacionComprobante"/>
+  </message>
+  <message name="autorizacionComprobanteResponse">
+    <part name="parameters" element="tns:autorizacionComprobanteResponse"/>
+  </message>
+  <portType name="AutorizacionComprobantesOffline">
+    <operation name="autorizacionComprobante">
+      <input message="tns:autorizacionComprobante"/>
+      <output message="tns:autorizacionComprobanteResponse"/>
+    </operation>
+  </portType>
+  <binding name="AutorizacionComprobantesOfflinePortBinding" type="tns:AutorizacionComprobantesOffline">
+    <soap:binding transport="http://schemas.xmlsoap.org/soap/http" style="document"/>
+    <operation name="autorizacionComprobante">
+      <soap:operation soapAction=""/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="AutorizacionComprobantesOfflineService">
+    <port name="AutorizacionComprobantesOfflinePort" binding="tns:AutorizacionComprobantesOfflinePortBinding">
+      <soap:address location="{location}"/>
+    </port>
+  </service>
+</definitions>
+"""
+
+
+class SRIStubConfig:
+    """Behaviour of the stand-in: latency in milliseconds and the rate of returned, rejected and failed calls."""
+
+    def __init__(self, latency=50, jitter=0, devuelta_rate=0.00, rejected_rate=0.00, outage_rate=0.00, pending_polls=0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.devuelta_rate = devuelta_rate
+        self.rejected_rate = rejected_rate
+        self.outage_rate = outage_rate
+        self.pending_polls = pending_polls
+        self.random = random.Random(seed)
+
+
+class SRIStub:
+    """In-memory state of the stand-in: the vouchers received and the number of authorization queries of each one."""
+
+    def __init__(self, config):
+        self.config = config
+        self.vouchers = {}
+        self.lock = threading.Lock()
+
+    def sleep(self):
+        delay = self.config.latency + self.config.random.uniform(-self.config.jitter, self.config.jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def is_outage(self):
+        return self.config.random.random() < self.config.outage_rate
+
+    def get_access_key(self, voucher):
+        return voucher.findtext('infoTributaria/claveAcceso') or ''
+
+    def get_vouchers(self, document):
+        root = etree.fromstring(document)
+        if root.tag == 'lote':
+            return [etree.fromstring(node.text.encode('utf-8')) for node in root.iterfind('comprobantes/comprobante')]
+        return [root]
+
+    def receive(self, document):
+        returned = []
+        for voucher in self.get_vouchers(document):
+            access_key = self.get_access_key(voucher)
+            with self.lock:
+                if access_key in self.vouchers or self.config.random.random() < self.config.devuelta_rate:
+                    error = 'ERROR SECUENCIAL REGISTRADO' if access_key in self.vouchers else 'ERROR EN LA ESTRUCTURA DEL COMPROBANTE'
+                    returned.append((access_key, error))
+                    continue
+                self.vouchers[access_key] = {
+                    'xml': etree.tostring(voucher, encoding='unicode'),
+                    'rejected': self.config.random.random() < self.config.rejected_rate,
+                    'polls': 0,
+                }
+        return returned
+
+    def authorize(self, access_key):
+        with self.lock:
+            voucher = self.vouchers.get(access_key)
+            if voucher is None:
+                return None
+            voucher['polls'] += 1
+            if voucher['polls'] <= self.config.pending_polls:
+                return None
+            return voucher
+
+    def render_message(self, identifier, message):
+        return f'<mensaje><identificador>{identifier}</identificador><mensaje>{escape(message)}</mensaje><tipo>ERROR</tipo></mensaje>'
+
+    def render_receipt(self, returned):
+        if not returned:
+            content = '<estado>RECIBIDA</estado><comprobantes/>'
+        else:
+            vouchers = ''.join(f'<comprobante><claveAcceso>{escape(access_key)}</claveAcceso><mensajes>{self.render_message(45 if "SECUENCIAL" in error else 35, error)}</mensajes></comprobante>' for access_key, error in returned)
+            content = f'<estado>DEVUELTA</estado><comprobantes>{vouchers}</comprobantes>'
+        return f'<ns2:validarComprobanteResponse xmlns:ns2="{RECEIPT_NAMESPACE}"><RespuestaRecepcionComprobante>{content}</RespuestaRecepcionComprobante></ns2:validarComprobanteResponse>'
+
+    def render_authorization(self, access_key, voucher):
+        authorizations = ''
+        if voucher is not None:
+            date = datetime.now().astimezone().isoformat(timespec='seconds')
+            if voucher['rejected']:
+                authorizations = f'<autorizacion><estado>NO AUTORIZADO</estado><fechaAutorizacion>{date}</fechaAutorizacion><ambiente>PRUEBAS</ambiente><comprobante>{escape(voucher["xml"])}</comprobante><mensajes>{self.render_message(39, "FIRMA INVALIDA")}</mensajes></autorizacion>'
+            else:
+                authorizations = f'<autorizacion><estado>AUTORIZADO</estado><numeroAutorizacion>{escape(access_key)}</numeroAutorizacion><fechaAutorizacion>{date}</fechaAutorizacion><ambiente>PRUEBAS</ambiente><comprobante>{escape(voucher["xml"])}</comprobante><mensajes/></autorizacion>'
+        count = 1 if voucher is not None else 0
+        return f'<ns2:autorizacionComprobanteResponse xmlns:ns2="{AUTHORIZATION_NAMESPACE}"><RespuestaAutorizacionComprobante><claveAccesoConsultada>{escape(access_key)}</claveAccesoConsultada><numeroComprobantes>{count}</numeroComprobantes><autorizaciones>{authorizations}</autorizaciones></RespuestaAutorizacionComprobante></ns2:autorizacionComprobanteResponse>'
+
+    def handle(self, path, body):
+        request = etree.fromstring(body).find(f'{{{SOAP_NAMESPACE}}}Body')[0]
+        if path.endswith('RecepcionComprobantesOffline'):
+            document = base64.b64decode(request.findtext('xml') or '')
+            return self.render_receipt(self.receive(document))
+        access_key = request.findtext('claveAccesoComprobante') or ''
+        return self.render_authorization(access_key, self.authorize(access_key))
+
+
+class SRIStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, content, content_type='text/xml; charset=utf-8'):
+        data = content.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        location = f'http://{self.headers["Host"]}{url.path}'
+        if url.path.endswith('RecepcionComprobantesOffline'):
+            self.reply(200, RECEIPT_WSDL.format(location=location, message_type=MESSAGE_TYPE))
+        elif url.path.endswith('AutorizacionComprobantesOffline'):
+            self.reply(200, AUTHORIZATION_WSDL.format(location=location, message_type=MESSAGE_TYPE))
+        else:
+            self.reply(404, 'Not Found', 'text/plain')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        stub = self.server.stub
+        stub.sleep()
+        if stub.is_outage():
+            self.reply(503, 'Service Unavailable', 'text/plain')
+            return
+        try:
+            content = stub.handle(urlparse(self.path).path, body)
+            self.reply(200, f'<?xml version="1.0" ?><S:Envelope xmlns:S="{SOAP_NAMESPACE}"><S:Body>{content}</S:Body></S:Envelope>')
+        except Exception as e:
+            fault = f'<S:Fault><faultcode>S:Server</faultcode><faultstring>{escape(str(e))}</faultstring></S:Fault>'
+            self.reply(500, f'<?xml version="1.0" ?><S:Envelope xmlns:S="{SOAP_NAMESPACE}"><S:Body>{fault}</S:Body></S:Envelope>')
+
+
+def create_server(host='127.0.0.1', port=8089, config=None):
+    server = ThreadingHTTPServer((host, port), SRIStubHandler)
+    server.daemon_threads = True
+    server.stub = SRIStub(config or SRIStubConfig())
+    return server
+
+
+def start_server(host='127.0.0.1', port=8089, config=None):
+    server = create_server(host, port, config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,124 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.backends.utils import format_number
+from django.db.models import Count, Sum, F
+from django.db.models.functions import ExtractMonth
+
+
+class DailySummaries:
+    """Per-day totals of sales, credit notes, purchases and expenses, updated with the differences of each saved or deleted voucher once its transaction commits."""
+
+    fields = {
+        'Sale': ('sale_count', {'sale_subtotal': ('subtotal_0', 'subtotal_12'), 'sale_dscto': ('total_dscto',), 'sale_iva': ('total_iva',), 'sale_total': ('total',)}),
+        'CreditNote': ('credit_note_count', {'credit_note_total': ('total',)}),
+        'Purchase': ('purchase_count', {'purchase_total': ('subtotal',)}),
+        'Expenses': ('expenses_count', {'expenses_total': ('valor',)}),
+    }
+
+    def get_sources(self):
+        from core.pos.models import Sale, CreditNote, Purchase, Expenses
+        return [
+            (Sale, {'sale_count': Count('id'), 'sale_subtotal': Sum(F('subtotal_0') + F('subtotal_12')), 'sale_dscto': Sum('total_dscto'), 'sale_iva': Sum('total_iva'), 'sale_total': Sum('total')}),
+            (CreditNote, {'credit_note_count': Count('id'), 'credit_note_total': Sum('total')}),
+            (Purchase, {'purchase_count': Count('id'), 'purchase_total': Sum('subtotal')}),
+            (Expenses, {'expenses_count': Count('id'), 'expenses_total': Sum('valor')}),
+        ]
+
+    def get_names(self):
+        from core.pos.models import DailySummary
+        return [field.name for field in DailySummary._meta.concrete_fields if field.name not in ['id', 'date_joined']]
+
+    def get_values(self, **filters):
+        values = {}
+        for model, aggregates in self.get_sources():
+            for item in model.objects.filter(**filters).values('date_joined').annotate(**aggregates).order_by():
+                date_joined = item.pop('date_joined')
+                values.setdefault(date_joined, {}).update({name: value for name, value in item.items() if value is not None})
+        return values
+
+    def get_state(self, sender, instance):
+        values = instance.__dict__
+        state = {}
+        for name, sources in self.fields[sender.__name__][1].items():
+            if all(values.get(source) is not None for source in sources):
+                state[name] = sum(self.round_value(sender._meta.get_field(source), values[source]) for source in sources)
+        return values.get('date_joined'), state
+
+    def round_value(self, field, value):
+        return Decimal(format_number(field.to_python(value), field.max_digits, field.decimal_places))
+
+    def update(self, sender, previous, current):
+        count_name = self.fields[sender.__name__][0]
+        (previous_date, previous_values), (current_date, current_values) = previous, current
+        if previous_date is not None and current_date is not None and self.get_date(previous_date) == self.get_date(current_date):
+            self.register(current_date, {name: value - previous_values[name] for name, value in current_values.items() if name in previous_values})
+            return
+        if previous_date is not None:
+            self.register(previous_date, {count_name: -1, **{name: -value for name, value in previous_values.items()}})
+        if current_date is not None:
+            self.register(current_date, {count_name: 1, **current_values})
+
+    def register(self, date_joined, deltas):
+        deltas = {name: value for name, value in deltas.items() if value}
+        if len(deltas):
+            date_joined = self.get_date(date_joined)
+            transaction.on_commit(lambda: self.apply(date_joined, deltas))
+
+    def apply(self, date_joined, deltas):
+        from core.pos.models import DailySummary
+        DailySummary.objects.get_or_create(date_joined=date_joined)
+        DailySummary.objects.filter(date_joined=date_joined).update(**{name: F(name) + value for name, value in deltas.items()})
+
+    def rebuild(self, start_date=None, end_date=None):
+        from core.pos.models import DailySummary
+        filters = {}
+        if start_date and end_date:
+            filters['date_joined__range'] = [start_date, end_date]
+        values = self.get_values(**filters)
+        with transaction.atomic():
+            DailySummary.objects.filter(**filters).delete()
+            DailySummary.objects.bulk_create([DailySummary(date_joined=date_joined, **item) for date_joined, item in sorted(values.items())], batch_size=1000)
+        return len(values)
+
+    def get_totals(self, start_date=None, end_date=None):
+        from core.pos.models import DailySummary
+        queryset = DailySummary.objects.filter()
+        if start_date and end_date:
+            queryset = queryset.filter(date_joined__range=[start_date, end_date])
+        result = queryset.aggregate(**{f'result_{name}': Sum(name) for name in self.get_names()})
+        return {name: result[f'result_{name}'] or 0 for name in self.get_names()}
+
+    def get_monthly(self, year, *names):
+        from core.pos.models import DailySummary
+        response = {name: [0.00] * 12 for name in names}
+        queryset = DailySummary.objects.filter(date_joined__year=year).annotate(month=ExtractMonth('date_joined')).values('month')
+        for item in queryset.annotate(**{f'result_{name}': Sum(name) for name in names}).order_by('month'):
+            for name in names:
+                response[name][item['month'] - 1] = float(item[f'result_{name}'] or 0)
+        return response
+
+    def get_date(self, value):
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+daily_summary = DailySummaries()
+
+
+def remember_summary_state(sender, instance, **kwargs):
+    instance.summary_state = daily_summary.get_state(sender, instance)
+
+
+def save_summary(sender, instance, created=False, **kwargs):
+    current = daily_summary.get_state(sender, instance)
+    daily_summary.update(sender, (None, {}) if created else getattr(instance, 'summary_state', (None, {})), current)
+    instance.summary_state = current
+
+
+def delete_summary(sender, instance, **kwargs):
+    daily_summary.update(sender, getattr(instance, 'summary_state', (None, {})), (None, {}))
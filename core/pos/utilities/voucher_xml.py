@@ -0,0 +1,256 @@
+import abc
+from datetime import datetime
+from io import BytesIO
+
+from core.pos.choices import TAX_CODES
+from core.tenant.choices import RETENTION_AGENT
+
+
+def escape_text(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text.replace("'", '"')
+
+
+def escape_attrib(text):
+    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+    return text.replace('\r', '&#13;').replace('\n', '&#10;').replace('\t', '&#09;').replace("'", '&quot;')
+
+
+class XMLWriter:
+    """Streaming XML writer with the same serialization as xml.etree.ElementTree.tostring followed by replace("'", '"')."""
+
+    buffer_size = 512
+
+    def __init__(self, stream, encoding='utf-8'):
+        self.stream = stream
+        self.encoding = encoding
+        self.buffer = []
+        self.pending = None
+
+    def write(self, text):
+        self.buffer.append(text)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(''.join(self.buffer).encode(self.encoding))
+            self.buffer = []
+
+    def declaration(self):
+        self.write(f'<?xml version="1.0" encoding="{self.encoding}"?>\n')
+
+    def open_pending(self):
+        if self.pending is not None:
+            self.write(f'{self.pending}>')
+            self.pending = None
+
+    def start(self, tag, attrib=None):
+        self.open_pending()
+        start_tag = f'<{tag}'
+        if attrib:
+            for name, value in attrib.items():
+                start_tag += f' {name}="{escape_attrib(value)}"'
+        self.pending = start_tag
+
+    def end(self, tag):
+        if self.pending is not None:
+            self.write(f'{self.pending} />')
+            self.pending = None
+        else:
+            self.write(f'</{tag}>')
+
+    def element(self, tag, text=None, attrib=None):
+        self.start(tag, attrib)
+        if text:
+            self.open_pending()
+            self.write(escape_text(text))
+        self.end(tag)
+
+    def close(self):
+        self.open_pending()
+        self.flush()
+
+
+class VoucherXMLSerializer(abc.ABC):
+    """Writes the SRI document of a voucher from its header and the detail rows with their product already loaded."""
+
+    root_tag = None
+    version = None
+    encoding = 'utf-8'
+    code_tag = 'codigoPrincipal'
+    retention_agent = False
+
+    def __init__(self, instance, access_key):
+        self.instance = instance
+        self.access_key = access_key
+        self.company = instance.company
+
+    def write_tax_info(self, writer):
+        writer.start('infoTributaria')
+        writer.element('ambiente', str(self.company.environment_type))
+        writer.element('tipoEmision', str(self.company.emission_type))
+        writer.element('razonSocial', self.company.business_name)
+        writer.element('nombreComercial', self.company.tradename)
+        writer.element('ruc', self.company.ruc)
+        writer.element('claveAcceso', self.access_key)
+        writer.element('codDoc', self.instance.receipt.voucher_type)
+        writer.element('estab', self.instance.receipt.establishment_code)
+        writer.element('ptoEmi', self.instance.receipt.issuing_point_code)
+        writer.element('secuencial', self.instance.voucher_number)
+        writer.element('dirMatriz', self.company.main_address)
+        if self.retention_agent and self.company.retention_agent == RETENTION_AGENT[0][0]:
+            writer.element('agenteRetencion', '1')
+        writer.end('infoTributaria')
+
+    def write_total_taxes(self, writer, zero_value):
+        writer.start('totalConImpuestos')
+        if self.instance.subtotal_0 != 0.0000:
+            writer.start('totalImpuesto')
+            writer.element('codigo', str(TAX_CODES[0][0]))
+            writer.element('codigoPorcentaje', '0')
+            writer.element('baseImponible', f'{self.instance.subtotal_0:.2f}')
+            writer.element('valor', zero_value)
+            writer.end('totalImpuesto')
+        if self.instance.subtotal_12 != 0.0000:
+            writer.start('totalImpuesto')
+            writer.element('codigo', str(TAX_CODES[0][0]))
+            writer.element('codigoPorcentaje', str(self.company.vat_percentage))
+            writer.element('baseImponible', f'{self.instance.subtotal_12:.2f}')
+            writer.element('valor', f'{self.instance.total_iva:.2f}')
+            writer.end('totalImpuesto')
+        writer.end('totalConImpuestos')
+
+    @abc.abstractmethod
+    def write_info(self, writer):
+        pass
+
+    def write_details(self, writer, details):
+        writer.start('detalles')
+        for detail in details:
+            product = detail.product
+            writer.start('detalle')
+            writer.element(self.code_tag, product.code)
+            writer.element('descripcion', product.name)
+            writer.element('cantidad', f'{detail.cant:.2f}')
+            writer.element('precioUnitario', f'{detail.price:.2f}')
+            writer.element('descuento', f'{detail.total_dscto:.2f}')
+            writer.element('precioTotalSinImpuesto', f'{detail.total:.2f}')
+            writer.start('impuestos')
+            writer.start('impuesto')
+            writer.element('codigo', str(TAX_CODES[0][0]))
+            if product.with_tax:
+                writer.element('codigoPorcentaje', str(product.vat_percentage))
+                writer.element('tarifa', f'{detail.iva * 100:.2f}')
+                writer.element('baseImponible', f'{detail.total:.2f}')
+                writer.element('valor', f'{detail.total_iva:.2f}')
+            else:
+                writer.element('codigoPorcentaje', '0')
+                writer.element('tarifa', '0')
+                writer.element('baseImponible', f'{detail.total:.2f}')
+                writer.element('valor', '0')
+            writer.end('impuesto')
+            writer.end('impuestos')
+            writer.end('detalle')
+        writer.end('detalles')
+
+    @abc.abstractmethod
+    def write_additional_info(self, writer):
+        pass
+
+    def write(self, stream, details):
+        writer = XMLWriter(stream, self.encoding)
+        writer.declaration()
+        writer.start(self.root_tag, {'id': 'comprobante', 'version': self.version})
+        self.write_tax_info(writer)
+        self.write_info(writer)
+        self.write_details(writer, details)
+        self.write_additional_info(writer)
+        writer.end(self.root_tag)
+        writer.close()
+        return stream
+
+    def to_string(self, details):
+        return self.write(BytesIO(), details).getvalue().decode(self.encoding)
+
+
+class InvoiceXMLSerializer(VoucherXMLSerializer):
+    root_tag = 'factura'
+    version = '1.0.0'
+
+    def write_info(self, writer):
+        sale = self.instance
+        writer.start('infoFactura')
+        writer.element('fechaEmision', datetime.now().strftime('%d/%m/%Y'))
+        writer.element('dirEstablecimiento', self.company.establishment_address)
+        writer.element('obligadoContabilidad', self.company.obligated_accounting)
+        writer.element('tipoIdentificacionComprador', sale.client.identification_type)
+        writer.element('razonSocialComprador', sale.client.user.names)
+        writer.element('identificacionComprador', sale.client.dni)
+        writer.element('direccionComprador', sale.client.address)
+        writer.element('totalSinImpuestos', f'{sale.get_full_subtotal():.2f}')
+        writer.element('totalDescuento', f'{sale.total_dscto:.2f}')
+        self.write_total_taxes(writer, '0.00')
+        writer.element('propina', '0.00')
+        writer.element('importeTotal', f'{sale.total:.2f}')
+        writer.element('moneda', 'DOLAR')
+        writer.start('pagos')
+        writer.start('pago')
+        writer.element('formaPago', sale.payment_method)
+        writer.element('total', f'{sale.total:.2f}')
+        writer.element('plazo', str(sale.time_limit))
+        writer.element('unidadTiempo', 'dias')
+        writer.end('pago')
+        writer.end('pagos')
+        writer.end('infoFactura')
+
+    def write_additional_info(self, writer):
+        if len(self.instance.additional_info):
+            writer.start('infoAdicional')
+            for additional_info in self.instance.additional_info:
+                writer.element('campoAdicional', additional_info['value'], {'nombre': additional_info['name']})
+            writer.end('infoAdicional')
+
+
+class CreditNoteXMLSerializer(VoucherXMLSerializer):
+    root_tag = 'notaCredito'
+    version = '1.1.0'
+    encoding = 'UTF-8'
+    code_tag = 'codigoInterno'
+    retention_agent = True
+
+    def write_info(self, writer):
+        credit_note = self.instance
+        sale = credit_note.sale
+        writer.start('infoNotaCredito')
+        writer.element('fechaEmision', datetime.now().strftime('%d/%m/%Y'))
+        writer.element('dirEstablecimiento', self.company.establishment_address)
+        writer.element('tipoIdentificacionComprador', sale.client.identification_type)
+        writer.element('razonSocialComprador', sale.client.user.names)
+        writer.element('identificacionComprador', sale.client.dni)
+        if not self.company.special_taxpayer == '000':
+            writer.element('contribuyenteEspecial', self.company.special_taxpayer)
+        writer.element('obligadoContabilidad', self.company.obligated_accounting)
+        writer.element('rise', 'Contribuyente Régimen Simplificado RISE')
+        writer.element('codDocModificado', sale.receipt.voucher_type)
+        writer.element('numDocModificado', sale.voucher_number_full)
+        writer.element('fechaEmisionDocSustento', sale.date_joined.strftime('%d/%m/%Y'))
+        writer.element('totalSinImpuestos', f'{credit_note.get_full_subtotal():.2f}')
+        writer.element('valorModificacion', f'{credit_note.total:.2f}')
+        writer.element('moneda', 'DOLAR')
+        self.write_total_taxes(writer, f'{0:.2f}')
+        writer.element('motivo', credit_note.motive)
+        writer.end('infoNotaCredito')
+
+    def write_additional_info(self, writer):
+        client = self.instance.sale.client
+        writer.start('infoAdicional')
+        writer.element('campoAdicional', client.address, {'nombre': 'dirCliente'})
+        writer.element('campoAdicional', client.mobile, {'nombre': 'telfCliente'})
+        writer.element('campoAdicional', f'NOTA_CREDITO # {self.instance.voucher_number}', {'nombre': 'Observacion'})
+        writer.end('infoAdicional')
@@ -0,0 +1,66 @@
+import os
+import threading
+
+from lxml import etree
+
+from config import settings
+
+
+class LocalSchemaResolver(etree.Resolver):
+    """Resolves the imports of the SRI schemas, such as the xmldsig schema, to files of the schemas directory instead of downloading them."""
+
+    def __init__(self, schemas_dir):
+        super().__init__()
+        self.schemas_dir = schemas_dir
+
+    def resolve(self, system_url, public_id, context):
+        name = 'xmldsig-core-schema.xsd' if 'xmldsig' in system_url else os.path.basename(system_url)
+        path = os.path.join(self.schemas_dir, name)
+        if os.path.exists(path):
+            return self.resolve_filename(path, context)
+        return None
+
+
+class VoucherSchemaValidator:
+    """Validates the voucher XML against the official SRI schemas copied into SRI_XSD_DIR, compiling each XSD once per thread because the error log of a schema is shared."""
+
+    schema_names = {
+        'factura': 'factura_V1.0.0.xsd',
+        'notaCredito': 'notaCredito_V1.1.0.xsd',
+    }
+
+    def __init__(self, schemas_dir=None):
+        self.schemas_dir = schemas_dir or settings.SRI_XSD_DIR
+        self.local = threading.local()
+
+    def get_schema(self, root_tag):
+        if not hasattr(self.local, 'schemas'):
+            self.local.schemas = {}
+        schema = self.local.schemas.get(root_tag)
+        if schema is None:
+            path = os.path.join(self.schemas_dir, self.schema_names[root_tag])
+            if not os.path.exists(path):
+                raise FileNotFoundError(f'No existe el esquema oficial {path}, cópielo en SRI_XSD_DIR o desactive SRI_XSD_VALIDATION')
+            parser = etree.XMLParser(no_network=True)
+            parser.resolvers.add(LocalSchemaResolver(self.schemas_dir))
+            schema = etree.XMLSchema(etree.parse(path, parser))
+            self.local.schemas[root_tag] = schema
+        return schema
+
+    def get_message(self, information):
+        return {'identificador': '35', 'informacionAdicional': information, 'mensaje': 'ARCHIVO NO CUMPLE ESTRUCTURA XML', 'tipo': 'ERROR'}
+
+    def validate(self, xml):
+        try:
+            document = etree.fromstring(xml.encode('utf-8') if isinstance(xml, str) else xml)
+        except etree.XMLSyntaxError as e:
+            return [self.get_message(str(e))]
+        if document.tag not in self.schema_names:
+            return [self.get_message(f'No existe un esquema para el comprobante {document.tag}')]
+        schema = self.get_schema(document.tag)
+        if schema.validate(document):
+            return []
+        return [self.get_message(f'Línea {error.line}: {error.message}') for error in schema.error_log]
+
+
+voucher_schema = VoucherSchemaValidator()
@@ -8,8 +8,11 @@ from django.views.generic import CreateView, UpdateView, DeleteView, TemplateVie
 
 from config import settings
 from core.pos.forms import ClientForm, Client, ClientUserForm
+from core.pos.serializers import ClientSerializer
 from core.pos.utilities.sri import SRI
 from core.security.mixins import GroupModuleMixin, GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class ClientListView(GroupPermissionMixin, TemplateView):
@@ -21,14 +24,12 @@ class ClientListView(GroupPermissionMixin, TemplateView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
-                for i in Client.objects.filter():
-                    data.append(i.toJSON())
+                data = DataTable(request, Client.objects.filter(), ClientSerializer, ordering=('-id',), search_fields=('user__names', 'dni', 'user__email')).get_response()
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -6,7 +6,7 @@ from django.http import HttpResponse
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView, FormView
 
-from core.pos.forms import CreditNoteForm, CreditNote, CreditNoteDetail, Sale, Receipt, SaleDetail, VOUCHER_TYPE, INVOICE_STATUS, IDENTIFICATION_TYPE
+from core.pos.forms import CreditNoteForm, CreditNote, CreditNoteDetail, Sale, Receipt, SaleDetail, VoucherOutbox, VOUCHER_TYPE, INVOICE_STATUS, IDENTIFICATION_TYPE, OUTBOX_VOUCHER
 from core.pos.mixins import ValidateInvoicePlanMixin
 from core.pos.utilities.sri import SRI
 from core.reports.forms import ReportForm
@@ -76,11 +76,11 @@ class CreditNoteCreateView(GroupPermissionMixin, ValidateInvoicePlanMixin, Creat
                     credit_note.company = company
                     credit_note.environment_type = credit_note.company.environment_type
                     credit_note.receipt = Receipt.objects.get(voucher_type=VOUCHER_TYPE[1][0], establishment_code=credit_note.company.establishment_code, issuing_point_code=credit_note.company.issuing_point_code)
-                    credit_note.voucher_number = credit_note.generate_voucher_number()
-                    credit_note.voucher_number_full = credit_note.get_voucher_number_full()
+                    credit_note.allocate_voucher_number()
                     credit_note.iva = iva
                     credit_note.create_electronic_invoice = 'create_electronic_invoice' in request.POST
                     credit_note.save()
+                    details = []
                     for i in json.loads(request.POST['products']):
                         sale_detail = SaleDetail.objects.get(id=i['id'])
                         detail = CreditNoteDetail()
@@ -92,18 +92,12 @@ class CreditNoteCreateView(GroupPermissionMixin, ValidateInvoicePlanMixin, Creat
                         detail.dscto = float(i['dscto']) / 100
                         detail.save()
                         credit_note.calculate_detail()
-                        detail.product.stock += detail.cant
-                        detail.product.save()
+                        details.append(detail)
+                    credit_note.increase_stock(details)
                     credit_note.calculate_invoice()
                     if credit_note.create_electronic_invoice:
-                        data = credit_note.generate_electronic_invoice()
-                        if not data['resp']:
-                            transaction.set_rollback(True)
-                        else:
-                            credit_note.sale.status = INVOICE_STATUS[3][0]
-                            credit_note.sale.save()
-                if 'error' in data:
-                    SRI().create_voucher_errors(credit_note, data)
+                        outbox = VoucherOutbox.objects.create(voucher_type=OUTBOX_VOUCHER[1][0], voucher_id=credit_note.id)
+                        data['status_url'] = str(reverse_lazy('voucher_outbox_status', kwargs={'pk': outbox.id}))
             elif action == 'search_sale':
                 data = []
                 term = request.POST['term']
@@ -7,8 +7,11 @@ from django.urls import reverse_lazy
 from django.views.generic import DeleteView, CreateView, FormView
 
 from core.pos.forms import PaymentsDebtsPayForm, DebtsPay, PaymentsDebtsPay
+from core.pos.serializers import DebtsPaySerializer
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class DebtsPayListView(GroupPermissionMixin, FormView):
@@ -21,14 +24,12 @@ class DebtsPayListView(GroupPermissionMixin, FormView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
                 queryset = DebtsPay.objects.filter()
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
                 if len(start_date) and len(end_date):
                     queryset = queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                data = DataTable(request, queryset, DebtsPaySerializer, search_fields=('purchase__number', 'purchase__provider__name', 'purchase__provider__ruc')).get_response()
             elif action == 'search_pays':
                 data = []
                 for count, i in enumerate(PaymentsDebtsPay.objects.filter(debts_pay_id=request.POST['id']).order_by('id')):
@@ -45,7 +46,7 @@ class DebtsPayListView(GroupPermissionMixin, FormView):
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -5,8 +5,11 @@ from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView, DeleteView, FormView
 
 from core.pos.forms import ExpensesForm, Expenses
+from core.pos.serializers import ExpensesSerializer
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class ExpensesListView(GroupPermissionMixin, FormView):
@@ -19,19 +22,17 @@ class ExpensesListView(GroupPermissionMixin, FormView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
                 queryset =  Expenses.objects.filter()
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
                 if len(start_date) and len(end_date):
                     queryset =  queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                data = DataTable(request, queryset, ExpensesSerializer, search_fields=('type_expense__name', 'description')).get_response()
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -5,7 +5,6 @@ from io import BytesIO
 import xlsxwriter
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
-from django.db.models import Q
 from django.http import HttpResponse, HttpResponseRedirect
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView, DeleteView, TemplateView
@@ -13,7 +12,12 @@ from django.views.generic.base import View
 from openpyxl import load_workbook
 
 from core.pos.forms import ProductForm, Product, Category
+from core.pos.serializers import ProductSerializer
+from core.pos.utilities.kardex import kardex
+from core.pos.utilities.search import product_search
 from core.security.mixins import GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class ProductListView(GroupPermissionMixin, TemplateView):
@@ -25,9 +29,9 @@ class ProductListView(GroupPermissionMixin, TemplateView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
-                for i in Product.objects.filter():
-                    data.append(i.toJSON())
+                data = DataTable(request, Product.objects.filter(), ProductSerializer, ordering=('-id',), search_fields=('name', 'code', 'category__name')).get_response()
+            elif action == 'search_movements':
+                data = kardex.get_movements(int(request.POST['id']), request.POST['start_date'], request.POST['end_date'])
             elif action == 'upload_excel':
                 with transaction.atomic():
                     archive = request.FILES['archive']
@@ -44,15 +48,20 @@ class ProductListView(GroupPermissionMixin, TemplateView):
                         product.category = Category.objects.get_or_create(name=wb.cell(row=row, column=4).value)[0]
                         product.price = float(wb.cell(row=row, column=5).value)
                         product.pvp = float(wb.cell(row=row, column=6).value)
-                        product.stock = int(wb.cell(row=row, column=7).value)
+                        stock = int(wb.cell(row=row, column=7).value)
                         product.inventoried = wb.cell(row=row, column=8).value.lower() == 'si'
                         product.with_tax = wb.cell(row=row, column=9).value.lower() == 'si'
-                        product.save()
+                        if product.pk is None:
+                            product.stock = stock
+                            product.save()
+                        else:
+                            product.save()
+                            kardex.adjust(product.id, stock)
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -177,7 +186,7 @@ class ProductStockAdjustmentView(GroupPermissionMixin, TemplateView):
                 term = request.POST['term']
                 queryset = Product.objects.filter(inventoried=True).exclude(id__in=ids).order_by('name')
                 if len(term):
-                    queryset = queryset.filter(Q(name__icontains=term) | Q(code__icontains=term))
+                    queryset = product_search.search(queryset, term)
                     queryset = queryset[0:10]
                 for i in queryset:
                     item = i.toJSON()
@@ -186,9 +195,7 @@ class ProductStockAdjustmentView(GroupPermissionMixin, TemplateView):
             elif action == 'create':
                 with transaction.atomic():
                     for i in json.loads(request.POST['products']):
-                        product = Product.objects.get(pk=i['id'])
-                        product.stock = int(i['newstock'])
-                        product.save()
+                        kardex.adjust(int(i['id']), int(i['newstock']))
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
@@ -2,12 +2,12 @@ import json
 from datetime import datetime
 
 from django.db import transaction
-from django.db.models import Q
 from django.http import HttpResponse
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, UpdateView, DeleteView, FormView
 
 from core.pos.forms import Promotions, PromotionsForm, Product, PromotionsDetail
+from core.pos.utilities.search import product_search
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupPermissionMixin
 
@@ -41,10 +41,6 @@ class PromotionsListView(GroupPermissionMixin, FormView):
         return HttpResponse(json.dumps(data), content_type='application/json')
 
     def get_queryset(self):
-        date_now = datetime.now().date()
-        promotions = Promotions.objects.filter(end_date__lte=date_now, state=True)
-        if promotions.exists():
-            promotions.update(state=False)
         return Promotions.objects.all()
 
     def get_context_data(self, **kwargs):
@@ -73,6 +69,7 @@ class PromotionsCreateView(GroupPermissionMixin, CreateView):
                     promotion.save()
                     promotion.state = promotion.end_date.date() > promotion.start_date.date()
                     promotion.save()
+                    product_ids = []
                     for i in json.loads(request.POST['products']):
                         product = Product.objects.get(pk=i['id'])
                         promotionsdetail = PromotionsDetail()
@@ -83,6 +80,8 @@ class PromotionsCreateView(GroupPermissionMixin, CreateView):
                         promotionsdetail.total_dscto = promotionsdetail.get_dscto_real()
                         promotionsdetail.price_final = float(promotionsdetail.price_current) - float(promotionsdetail.total_dscto)
                         promotionsdetail.save()
+                        product_ids.append(product.id)
+                    Promotions.update_prices(product_ids)
             elif action == 'search_product':
                 data = []
                 ids = json.loads(request.POST['ids'])
@@ -90,7 +89,7 @@ class PromotionsCreateView(GroupPermissionMixin, CreateView):
                 ids = ids + list(PromotionsDetail.objects.filter(promotion__state=True).values_list('product_id', flat=True))
                 queryset = Product.objects.filter().exclude(id__in=ids).order_by('name')
                 if len(term):
-                    queryset = queryset.filter(Q(name__icontains=term) | Q(code__icontains=term))
+                    queryset = product_search.search(queryset, term)
                     queryset = queryset[0:10]
                 for i in queryset:
                     item = i.toJSON()
@@ -144,6 +143,7 @@ class PromotionsUpdateView(GroupPermissionMixin, UpdateView):
                     promotion.save()
                     promotion.state = promotion.end_date.date() > promotion.start_date.date()
                     promotion.save()
+                    product_ids = promotion.get_product_ids()
                     promotion.promotionsdetail_set.all().delete()
                     for i in json.loads(request.POST['products']):
                         product = Product.objects.get(pk=i['id'])
@@ -155,6 +155,8 @@ class PromotionsUpdateView(GroupPermissionMixin, UpdateView):
                         promotionsdetail.total_dscto = promotionsdetail.get_dscto_real()
                         promotionsdetail.price_final = float(promotionsdetail.price_current) - float(promotionsdetail.total_dscto)
                         promotionsdetail.save()
+                        product_ids.append(product.id)
+                    Promotions.update_prices(product_ids)
             elif action == 'search_product':
                 data = []
                 ids = json.loads(request.POST['ids'])
@@ -162,7 +164,7 @@ class PromotionsUpdateView(GroupPermissionMixin, UpdateView):
                 ids = ids + list(PromotionsDetail.objects.filter(promotion__state=True).values_list('product_id', flat=True))
                 queryset = Product.objects.filter().exclude(id__in=ids).order_by('name')
                 if len(term):
-                    queryset = queryset.filter(Q(name__icontains=term) | Q(code__icontains=term))
+                    queryset = product_search.search(queryset, term)
                     queryset = queryset[0:10]
                 for i in queryset:
                     item = i.toJSON()
@@ -1,14 +1,17 @@
 import json
 
 from django.db import transaction
-from django.db.models import Q
 from django.http import HttpResponse
 from django.urls import reverse_lazy
 from django.views.generic import CreateView, DeleteView, FormView
 
 from core.pos.forms import PurchaseForm, Purchase, PurchaseDetail, Product, Provider, DebtsPay, ProviderForm, PAYMENT_TYPE
+from core.pos.serializers import PurchaseSerializer, PurchaseDetailSerializer
+from core.pos.utilities.search import product_search
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class PurchaseListView(GroupPermissionMixin, FormView):
@@ -21,23 +24,19 @@ class PurchaseListView(GroupPermissionMixin, FormView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
                 queryset = Purchase.objects.filter()
                 if len(start_date) and len(end_date):
                     queryset = queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                data = DataTable(request, queryset, PurchaseSerializer, search_fields=('number', 'provider__name', 'provider__ruc')).get_response()
             elif action == 'search_detail_products':
-                data = []
-                for i in PurchaseDetail.objects.filter(purchase_id=request.POST['id']):
-                    data.append(i.toJSON())
+                data = PurchaseDetailSerializer().serialize(PurchaseDetail.objects.filter(purchase_id=request.POST['id']))
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -66,6 +65,7 @@ class PurchaseCreateView(GroupPermissionMixin, CreateView):
                     purchase.date_joined = request.POST['date_joined']
                     purchase.save()
 
+                    details = []
                     for i in json.loads(request.POST['products']):
                         product = Product.objects.get(pk=i['id'])
                         detail = PurchaseDetail()
@@ -75,8 +75,8 @@ class PurchaseCreateView(GroupPermissionMixin, CreateView):
                         detail.price = float(i['price'])
                         detail.subtotal = detail.cant * float(detail.price)
                         detail.save()
-                        detail.product.stock += detail.cant
-                        detail.product.save()
+                        details.append(detail)
+                    purchase.increase_stock(details)
 
                     purchase.calculate_invoice()
 
@@ -96,7 +96,7 @@ class PurchaseCreateView(GroupPermissionMixin, CreateView):
                 term = request.POST['term']
                 queryset = Product.objects.filter(inventoried=True).exclude(id__in=ids).order_by('name')
                 if len(term):
-                    queryset = queryset.filter(Q(name__icontains=term) | Q(code__icontains=term))
+                    queryset = product_search.search(queryset, term)
                     queryset = queryset[0:10]
                 for i in queryset:
                     item = i.toJSON()
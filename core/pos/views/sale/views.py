@@ -12,12 +12,17 @@ from django.views import View
 from django.views.generic import CreateView, DeleteView, FormView
 
 from config import settings
-from core.pos.forms import SaleForm, ClientForm, ClientUserForm, Sale, SaleDetail, Client, Product, Receipt, CreditNote, CreditNoteDetail, CtasCollect, INVOICE_STATUS, PAYMENT_TYPE, VOUCHER_TYPE
+from core.pos.forms import SaleForm, ClientForm, ClientUserForm, Sale, SaleDetail, Client, Product, Receipt, CreditNote, CreditNoteDetail, CtasCollect, VoucherOutbox, PAYMENT_TYPE, VOUCHER_TYPE, OUTBOX_VOUCHER
 from core.pos.mixins import ValidateInvoicePlanMixin
+from core.pos.serializers import SaleSerializer, SaleDetailSerializer
 from core.pos.utilities import printer
+from core.pos.utilities.catalog import product_catalog
+from core.pos.utilities.search import product_search, client_search
 from core.pos.utilities.sri import SRI
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class SaleListView(GroupPermissionMixin, FormView):
@@ -30,18 +35,14 @@ class SaleListView(GroupPermissionMixin, FormView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
                 queryset = Sale.objects.filter()
                 if len(start_date) and len(end_date):
                     queryset = queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                data = DataTable(request, queryset, SaleSerializer, search_fields=('voucher_number_full', 'client__user__names', 'client__dni')).get_response()
             elif action == 'search_detail_products':
-                data = []
-                for i in SaleDetail.objects.filter(sale_id=request.POST['id']):
-                    data.append(i.toJSON())
+                data = SaleDetailSerializer().serialize(SaleDetail.objects.filter(sale_id=request.POST['id']))
             elif action == 'generate_invoice':
                 sale = Sale.objects.get(pk=request.POST['id'])
                 data = sale.generate_electronic_invoice()
@@ -56,10 +57,10 @@ class SaleListView(GroupPermissionMixin, FormView):
                     credit_note.company = company
                     credit_note.environment_type = credit_note.company.environment_type
                     credit_note.receipt = Receipt.objects.get(voucher_type=VOUCHER_TYPE[1][0], establishment_code=sale.company.establishment_code, issuing_point_code=sale.company.issuing_point_code)
-                    credit_note.voucher_number = credit_note.generate_voucher_number()
-                    credit_note.voucher_number_full = credit_note.get_voucher_number_full()
+                    credit_note.allocate_voucher_number()
                     credit_note.iva = iva
                     credit_note.save()
+                    details = []
                     for sale_detail in sale.saledetail_set.all():
                         detail = CreditNoteDetail()
                         detail.credit_note_id = credit_note.id
@@ -70,17 +71,11 @@ class SaleListView(GroupPermissionMixin, FormView):
                         detail.dscto = sale_detail.dscto
                         detail.save()
                         credit_note.calculate_detail()
-                        detail.product.stock += detail.cant
-                        detail.product.save()
+                        details.append(detail)
+                    credit_note.increase_stock(details)
                     credit_note.calculate_invoice()
-                    data = credit_note.generate_electronic_invoice()
-                    if not data['resp']:
-                        transaction.set_rollback(True)
-                    else:
-                        sale.status = INVOICE_STATUS[3][0]
-                        sale.save()
-                if 'error' in data:
-                    SRI().create_voucher_errors(credit_note, data)
+                    outbox = VoucherOutbox.objects.create(voucher_type=OUTBOX_VOUCHER[1][0], voucher_id=credit_note.id)
+                    data = {'status_url': str(reverse_lazy('voucher_outbox_status', kwargs={'pk': outbox.id}))}
             elif action == 'send_invoice_by_email':
                 sale = Sale.objects.get(pk=request.POST['id'])
                 xml_electronic_signature = SRI()
@@ -89,7 +84,7 @@ class SaleListView(GroupPermissionMixin, FormView):
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -130,8 +125,7 @@ class SaleCreateView(GroupPermissionMixin, ValidateInvoicePlanMixin, CreateView)
                     sale.company = request.tenant.company
                     sale.environment_type = sale.company.environment_type
                     sale.receipt = Receipt.objects.get(voucher_type=request.POST['receipt'], establishment_code=sale.company.establishment_code, issuing_point_code=sale.company.issuing_point_code)
-                    sale.voucher_number = sale.generate_voucher_number()
-                    sale.voucher_number_full = sale.get_voucher_number_full()
+                    sale.allocate_voucher_number()
                     sale.employee_id = request.user.id
                     sale.client_id = int(request.POST['client'])
                     sale.payment_type = request.POST['payment_type']
@@ -157,21 +151,7 @@ class SaleCreateView(GroupPermissionMixin, ValidateInvoicePlanMixin, CreateView)
                         sale.end_credit = request.POST['end_credit']
                         sale.cash = 0.00
                         sale.change = 0.00
-                    sale.save()
-                    for i in json.loads(request.POST['products']):
-                        product = Product.objects.get(pk=i['id'])
-                        detail = SaleDetail()
-                        detail.sale_id = sale.id
-                        detail.product_id = product.id
-                        detail.cant = int(i['cant'])
-                        detail.price = float(i['price_current'])
-                        detail.dscto = float(i['dscto']) / 100
-                        detail.save()
-                        if detail.product.inventoried:
-                            detail.product.stock -= detail.cant
-                            detail.product.save()
-                    sale.calculate_detail()
-                    sale.calculate_invoice()
+                    sale.save_with_details(json.loads(request.POST['products']))
                     if sale.payment_type == PAYMENT_TYPE[1][0]:
                         ctas_collect = CtasCollect()
                         ctas_collect.sale_id = sale.id
@@ -182,18 +162,15 @@ class SaleCreateView(GroupPermissionMixin, ValidateInvoicePlanMixin, CreateView)
                         ctas_collect.save()
                     data = {'print_url': str(reverse_lazy('sale_admin_print_invoice', kwargs={'pk': sale.id}))}
                     if sale.create_electronic_invoice:
-                        data = sale.generate_electronic_invoice()
-                        if not data['resp']:
-                            transaction.set_rollback(True)
-                if 'error' in data:
-                    SRI().create_voucher_errors(sale, data)
+                        outbox = VoucherOutbox.objects.create(voucher_type=OUTBOX_VOUCHER[0][0], voucher_id=sale.id)
+                        data['status_url'] = str(reverse_lazy('voucher_outbox_status', kwargs={'pk': outbox.id}))
             elif action == 'search_product':
                 ids = json.loads(request.POST['ids'])
                 data = []
                 term = request.POST['term']
                 queryset = Product.objects.filter(Q(stock__gt=0) | Q(inventoried=False)).exclude(id__in=ids).order_by('name')
                 if len(term):
-                    queryset = queryset.filter(Q(name__icontains=term) | Q(code__icontains=term))
+                    queryset = product_search.search(queryset, term)
                     queryset = queryset[:10]
                 for i in queryset:
                     item = i.toJSON()
@@ -206,15 +183,15 @@ class SaleCreateView(GroupPermissionMixin, ValidateInvoicePlanMixin, CreateView)
                 data = {}
                 code = request.POST['code']
                 if len(code):
-                    product = Product.objects.filter(code=code).first()
+                    product = product_catalog.get(request.tenant.schema_name, code)
                     if product:
-                        data = product.toJSON()
+                        data = product
                         data['dscto'] = 0.00
                         data['total_dscto'] = 0.00
             elif action == 'search_client':
                 data = []
                 term = request.POST['term']
-                for i in Client.objects.filter(Q(user__names__icontains=term) | Q(dni__icontains=term)).order_by('user__names')[0:10]:
+                for i in client_search.search(Client.objects.filter(), term)[0:10]:
                     data.append(i.toJSON())
             elif action == 'search_voucher_number':
                 data['voucher_number'] = ''
@@ -319,23 +296,19 @@ class SaleClientListView(GroupPermissionMixin, FormView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
                 queryset = Sale.objects.filter(client__user_id=request.user.id)
                 if len(start_date) and len(end_date):
                     queryset = queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                data = DataTable(request, queryset, SaleSerializer, search_fields=('voucher_number_full',)).get_response()
             elif action == 'search_detail_products':
-                data = []
-                for i in SaleDetail.objects.filter(sale_id=request.POST['id']):
-                    data.append(i.toJSON())
+                data = SaleDetailSerializer().serialize(SaleDetail.objects.filter(sale_id=request.POST['id']))
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -0,0 +1,25 @@
+import mimetypes
+import os
+import posixpath
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import connection
+from django.http import HttpResponse, Http404
+from django.views import View
+
+from core.pos.utilities.archive import archive_storage
+
+
+class VoucherArchiveView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        name = self.kwargs['name']
+        if '..' in name.replace('\\', '/').split('/'):
+            raise Http404('No existe el archivo')
+        name = posixpath.normpath(name)
+        segments = name.split('/')
+        if len(segments) < 2 or segments[0] != connection.schema_name or not archive_storage.exists(name):
+            raise Http404('No existe el archivo')
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        response = HttpResponse(archive_storage.read(name), content_type=content_type)
+        response['Content-Disposition'] = f'inline; filename="{os.path.basename(name)}"'
+        return response
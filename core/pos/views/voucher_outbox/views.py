@@ -0,0 +1,28 @@
+import json
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import HttpResponse
+from django.views import View
+
+from core.pos.models import VoucherOutbox, Sale, CreditNote, OUTBOX_VOUCHER, INVOICE_STATUS
+from core.pos.utilities.archive import archive_storage
+
+
+class VoucherOutboxStatusView(LoginRequiredMixin, View):
+    def get(self, request, *args, **kwargs):
+        data = {}
+        try:
+            outbox = VoucherOutbox.objects.filter(id=self.kwargs['pk']).values('voucher_type', 'voucher_id', 'stage', 'status', 'attempts', 'errors').first()
+            if outbox:
+                model = CreditNote if outbox['voucher_type'] == OUTBOX_VOUCHER[1][0] else Sale
+                voucher = model.objects.filter(id=outbox['voucher_id']).values('status', 'pdf_authorized').first()
+                data = outbox
+                data['voucher_status'] = voucher['status']
+                data['print_url'] = None
+                if voucher['status'] in [INVOICE_STATUS[1][0], INVOICE_STATUS[2][0]] and voucher['pdf_authorized']:
+                    data['print_url'] = archive_storage.url(voucher['pdf_authorized'])
+            else:
+                data['error'] = 'No existe el registro'
+        except Exception as e:
+            data['error'] = str(e)
+        return HttpResponse(json.dumps(data), content_type='application/json')
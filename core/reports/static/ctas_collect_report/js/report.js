@@ -25,21 +25,23 @@ var report = {
         tblReport = $('#tblReport').DataTable({
             destroy: true,
             autoWidth: false,
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                headers: {
-                    'X-CSRFToken': csrftoken
-                },
-                data: parameters,
-                dataSrc: ''
-            },
+            serverSide: true,
+            ajax: server_side_ajax(parameters),
             order: [[0, 'asc']],
-            paging: false,
+            pageLength: 25,
+            lengthMenu: [[25, 50, 100, -1], [25, 50, 100, 'Todos']],
             ordering: true,
             searching: false,
-            dom: 'Bfrtip',
+            dom: 'Blfrtip',
             buttons: [
+                {
+                    text: '<i class="fas fa-file-csv"></i> Descargar Csv',
+                    titleAttr: 'CSV',
+                    className: 'btn btn-info btn-flat btn-sm',
+                    action: function (e, dt, node, config) {
+                        submit_download($.extend({}, parameters, {'action': 'export_csv'}));
+                    }
+                },
                 {
                     extend: 'excelHtml5',
                     text: ' <i class="fas fa-file-excel"></i> Descargar Excel',
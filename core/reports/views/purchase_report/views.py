@@ -1,35 +1,55 @@
-import json
+from datetime import datetime
 
 from django.http import HttpResponse
 from django.views.generic import FormView
 
+from config import settings
 from core.pos.models import Purchase
+from core.pos.serializers import PurchaseSerializer
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupModuleMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
+from core.security.utilities.streaming import csv_streaming_response
 
 
 class PurchaseReportView(GroupModuleMixin, FormView):
     template_name = 'purchase_report/report.html'
     form_class = ReportForm
+    columns = (
+        ('Número de factura', 'number'),
+        ('Fecha de registro', 'date_joined'),
+        ('Proveedor', 'provider.name'),
+        ('Ruc', 'provider.ruc'),
+        ('Forma de pago', 'payment_type.name'),
+        ('Subtotal', 'subtotal'),
+    )
+
+    def get_queryset(self):
+        queryset = Purchase.objects.filter()
+        start_date = self.request.POST['start_date']
+        end_date = self.request.POST['end_date']
+        if len(start_date) and len(end_date):
+            queryset = queryset.filter(date_joined__range=[start_date, end_date])
+        return queryset
 
     def post(self, request, *args, **kwargs):
         action = request.POST['action']
         data = {}
         try:
             if action == 'search_report':
-                data = []
-                start_date = request.POST['start_date']
-                end_date = request.POST['end_date']
-                queryset =  Purchase.objects.filter()
-                if len(start_date) and len(end_date):
-                    queryset =  queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                table = DataTable(request, self.get_queryset(), PurchaseSerializer, search_fields=('number', 'provider__name', 'provider__ruc'))
+                if table.is_streaming():
+                    return table.get_streaming_response()
+                data = table.get_response()
+            elif action == 'export_csv':
+                queryset = self.get_queryset().order_by('date_joined', 'id')
+                return csv_streaming_response(PurchaseSerializer().iterate(queryset, settings.STREAMING_CHUNK_SIZE), self.columns, f"COMPRAS_{datetime.now().date().strftime('%d_%m_%Y')}.csv")
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
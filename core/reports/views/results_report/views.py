@@ -1,11 +1,9 @@
 import json
 
-from django.db.models import Sum, FloatField
-from django.db.models.functions import Coalesce
 from django.http import HttpResponse
 from django.views.generic import FormView
 
-from core.pos.models import Purchase, Sale, Expenses
+from core.pos.utilities.summary import daily_summary
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupModuleMixin
 
@@ -23,20 +21,10 @@ class ResultsReportView(GroupModuleMixin, FormView):
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
 
-                purchase = Purchase.objects.all()
-                if len(start_date) and len(end_date):
-                    purchase = purchase.filter(date_joined__range=[start_date, end_date])
-                purchase = float(purchase.aggregate(result=Coalesce(Sum('subtotal'), 0.00, output_field=FloatField()))['result'])
-
-                sale = Sale.objects.all()
-                if len(start_date) and len(end_date):
-                    sale = sale.filter(date_joined__range=[start_date, end_date])
-                sale = float(sale.aggregate(result=Coalesce(Sum('total'), 0.00, output_field=FloatField()))['result'])
-
-                expenses = Expenses.objects.all()
-                if len(start_date) and len(end_date):
-                    expenses = expenses.filter(date_joined__range=[start_date, end_date])
-                expenses = float(expenses.aggregate(result=Coalesce(Sum('valor'), 0.00, output_field=FloatField()))['result'])
+                totals = daily_summary.get_totals(start_date, end_date)
+                purchase = float(totals['purchase_total'])
+                sale = float(totals['sale_total'])
+                expenses = float(totals['expenses_total'])
 
                 data.append({'name': 'Compras', 'y': purchase})
                 data.append({'name': 'Ventas', 'y': sale})
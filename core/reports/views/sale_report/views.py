@@ -1,35 +1,56 @@
-import json
+from datetime import datetime
 
 from django.http import HttpResponse
 from django.views.generic import FormView
 
+from config import settings
 from core.pos.models import Sale
+from core.pos.serializers import SaleSerializer
 from core.reports.forms import ReportForm
 from core.security.mixins import GroupModuleMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
+from core.security.utilities.streaming import csv_streaming_response
 
 
 class SaleReportView(GroupModuleMixin, FormView):
     template_name = 'sale_report/report.html'
     form_class = ReportForm
+    columns = (
+        ('Cliente', 'client.user.names'),
+        ('Fecha de registro', 'date_joined'),
+        ('Forma de pago', 'payment_type.name'),
+        ('Subtotal', 'subtotal'),
+        ('Descuento', 'total_dscto'),
+        ('IVA', 'total_iva'),
+        ('Total', 'total'),
+    )
+
+    def get_queryset(self):
+        queryset = Sale.objects.filter()
+        start_date = self.request.POST['start_date']
+        end_date = self.request.POST['end_date']
+        if len(start_date) and len(end_date):
+            queryset = queryset.filter(date_joined__range=[start_date, end_date])
+        return queryset
 
     def post(self, request, *args, **kwargs):
         action = request.POST['action']
         data = {}
         try:
             if action == 'search_report':
-                data = []
-                start_date = request.POST['start_date']
-                end_date = request.POST['end_date']
-                queryset =  Sale.objects.filter()
-                if len(start_date) and len(end_date):
-                    queryset =  queryset.filter(date_joined__range=[start_date, end_date])
-                for i in queryset:
-                    data.append(i.toJSON())
+                table = DataTable(request, self.get_queryset(), SaleSerializer, search_fields=('voucher_number_full', 'client__user__names', 'client__dni'))
+                if table.is_streaming():
+                    return table.get_streaming_response()
+                data = table.get_response()
+            elif action == 'export_csv':
+                queryset = self.get_queryset().order_by('date_joined', 'id')
+                return csv_streaming_response(SaleSerializer().iterate(queryset, settings.STREAMING_CHUNK_SIZE), self.columns, f"VENTAS_{datetime.now().date().strftime('%d_%m_%Y')}.csv")
             else:
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
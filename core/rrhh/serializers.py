@@ -0,0 +1,34 @@
+from core.rrhh.models import Position, Area, Employee, Assistance, AssistanceDetail
+from core.security.utilities.serializers import Serializer, Nested, Choice
+from core.user.serializers import UserSerializer
+
+
+class PositionSerializer(Serializer):
+    model = Position
+    fields = ('id', 'name')
+
+
+class AreaSerializer(Serializer):
+    model = Area
+    fields = ('id', 'name')
+
+
+class EmployeeSerializer(Serializer):
+    model = Employee
+    fields = ('id', 'code', 'dni', 'hiring_date', 'remuneration')
+    user = Nested(UserSerializer)
+    position = Nested(PositionSerializer)
+    area = Nested(AreaSerializer)
+
+
+class AssistanceSerializer(Serializer):
+    model = Assistance
+    fields = ('id', 'date_joined', 'year', 'day')
+    month = Choice()
+
+
+class AssistanceDetailSerializer(Serializer):
+    model = AssistanceDetail
+    fields = ('id', 'description', 'state')
+    assistance = Nested(AssistanceSerializer)
+    employee = Nested(EmployeeSerializer)
@@ -11,15 +11,9 @@ var assistance = {
         tblAssistance = $('#tblAssistance').DataTable({
             autoWidth: false,
             destroy: true,
-            ajax: {
-                url: pathname,
-                type: 'POST',
-                data: parameters,
-                dataSrc: "",
-                headers: {
-                    'X-CSRFToken': csrftoken
-                }
-            },
+            serverSide: true,
+            ajax: server_side_ajax(parameters),
+            order: [[0, "asc"]],
             columns: [
                 {data: "assistance.date_joined"},
                 {data: "employee.user.names"},
@@ -10,7 +10,10 @@ from django.urls import reverse_lazy
 from django.views.generic import FormView, CreateView, TemplateView
 
 from core.rrhh.forms import AssistanceForm, Assistance, Employee, AssistanceDetail
+from core.rrhh.serializers import AssistanceDetailSerializer
 from core.security.mixins import GroupPermissionMixin
+from core.security.utilities.datatables import DataTable
+from core.security.utilities.serializers import json_dumps
 
 
 class AssistanceListView(GroupPermissionMixin, FormView):
@@ -23,14 +26,12 @@ class AssistanceListView(GroupPermissionMixin, FormView):
         data = {}
         try:
             if action == 'search':
-                data = []
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
                 queryset = AssistanceDetail.objects.all()
                 if len(start_date) and len(end_date):
                     queryset = queryset.filter(assistance__date_joined__range=[start_date, end_date])
-                for i in queryset.order_by('assistance__date_joined'):
-                    data.append(i.toJSON())
+                data = DataTable(request, queryset, AssistanceDetailSerializer, ordering=('assistance__date_joined', 'id'), search_fields=('employee__user__names', 'employee__dni', 'description')).get_response()
             elif action == 'export_assistences_excel':
                 start_date = request.POST['start_date']
                 end_date = request.POST['end_date']
@@ -75,7 +76,7 @@ class AssistanceListView(GroupPermissionMixin, FormView):
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
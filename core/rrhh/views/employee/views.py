@@ -13,7 +13,9 @@ from openpyxl import load_workbook
 
 from config import settings
 from core.rrhh.forms import EmployeeForm, User, Employee, EmployeeUserForm
+from core.rrhh.serializers import EmployeeSerializer
 from core.security.mixins import GroupModuleMixin, GroupPermissionMixin
+from core.security.utilities.serializers import json_dumps
 
 
 class EmployeeListView(GroupPermissionMixin, TemplateView):
@@ -25,9 +27,7 @@ class EmployeeListView(GroupPermissionMixin, TemplateView):
         action = request.POST['action']
         try:
             if action == 'search':
-                data = []
-                for i in Employee.objects.filter():
-                    data.append(i.toJSON())
+                data = EmployeeSerializer().serialize(Employee.objects.filter())
             elif action == 'upload_excel':
                 with transaction.atomic():
                     archive = request.FILES['archive']
@@ -63,7 +63,7 @@ class EmployeeListView(GroupPermissionMixin, TemplateView):
                 data['error'] = 'No ha seleccionado ninguna opción'
         except Exception as e:
             data['error'] = str(e)
-        return HttpResponse(json.dumps(data), content_type='application/json')
+        return HttpResponse(json_dumps(data), content_type='application/json')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1,3 +1,5 @@
+from core.pos.choices import VOUCHER_STAGE
+
 LAYOUT_OPTIONS = (
     (1, 'Vertical'),
     (2, 'Horizontal')
@@ -138,3 +140,21 @@ SIDEBAR = (
     ('sidebar-light-teal', 'sidebar-light-teal'),
     ('sidebar-light-olive', 'sidebar-light-olive'),
 )
+
+EMAIL_STATUS = (
+    ('pending', 'Pendiente'),
+    ('processing', 'En proceso'),
+    ('sent', 'Enviado'),
+    ('failed', 'Fallido'),
+)
+
+METRIC_STAGE = VOUCHER_STAGE + (
+    ('smtp_delivery', 'Entrega SMTP'),
+)
+
+METRIC_OUTCOME = (
+    ('success', 'Exitoso'),
+    ('pending', 'Pendiente'),
+    ('rejected', 'Rechazado'),
+    ('error', 'Error'),
+)
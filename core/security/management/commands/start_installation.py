@@ -94,6 +94,14 @@ class Command(BaseCommand):
                     'moduletype': moduletype,
                     'permissions': list(Permission.objects.filter(content_type__model=UserAccess._meta.label.split('.')[1].lower()))
                 },
+                {
+                    'name': 'Métricas SRI',
+                    'url': '/security/pipeline/metrics/',
+                    'icon': 'fas fa-chart-line',
+                    'description': 'Permite revisar la latencia y los resultados de cada etapa de la facturación electrónica',
+                    'moduletype': moduletype,
+                    'permissions': list(Permission.objects.filter(content_type__model=PipelineMetric._meta.label.split('.')[1].lower()))
+                },
                 {
                     'name': 'Usuarios',
                     'url': '/user/',
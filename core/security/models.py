@@ -5,6 +5,7 @@ from django.contrib.auth.models import Group
 from django.contrib.auth.models import Permission
 from django.db import models
 from django.forms.models import model_to_dict
+from django.utils import timezone
 
 from config import settings
 from core.security.choices import *
@@ -230,6 +231,72 @@ class UserAccess(models.Model):
         )
 
 
+class EmailOutbox(models.Model):
+    company = models.ForeignKey('tenant.Company', on_delete=models.CASCADE, null=True, blank=True, verbose_name='Compañia')
+    email_from = models.CharField(max_length=100, verbose_name='Remitente')
+    email_to = models.CharField(max_length=250, verbose_name='Destinatario')
+    subject = models.CharField(max_length=250, verbose_name='Asunto')
+    message = models.TextField(verbose_name='Mensaje')
+    status = models.CharField(max_length=20, choices=EMAIL_STATUS, default=EMAIL_STATUS[0][0], verbose_name='Estado')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    next_attempt = models.DateTimeField(default=timezone.now, verbose_name='Próximo intento')
+    error = models.TextField(null=True, blank=True, verbose_name='Error')
+    reference_type = models.CharField(max_length=20, null=True, blank=True, verbose_name='Tipo de referencia')
+    reference_id = models.PositiveIntegerField(null=True, blank=True, verbose_name='Referencia')
+    datetime_joined = models.DateTimeField(default=timezone.now, verbose_name='Fecha y hora de registro')
+    datetime_updated = models.DateTimeField(auto_now=True, verbose_name='Fecha y hora de actualización')
+
+    def __str__(self):
+        return f'{self.email_to} {self.subject}'
+
+    def toJSON(self):
+        item = model_to_dict(self, exclude=['message'])
+        item['status'] = {'id': self.status, 'name': self.get_status_display()}
+        item['next_attempt'] = timezone.localtime(self.next_attempt).strftime('%Y-%m-%d %H:%M:%S')
+        item['datetime_joined'] = timezone.localtime(self.datetime_joined).strftime('%Y-%m-%d %H:%M:%S')
+        return item
+
+    class Meta:
+        verbose_name = 'Correo Saliente'
+        verbose_name_plural = 'Correos Salientes'
+        default_permissions = ()
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+
+class PipelineMetric(models.Model):
+    date_joined = models.DateField(default=datetime.now, verbose_name='Fecha')
+    schema_name = models.CharField(max_length=100, verbose_name='Esquema')
+    stage = models.CharField(max_length=20, choices=METRIC_STAGE, verbose_name='Etapa')
+    outcome = models.CharField(max_length=20, choices=METRIC_OUTCOME, verbose_name='Resultado')
+    count = models.PositiveIntegerField(default=0, verbose_name='Llamadas')
+    total_ms = models.FloatField(default=0.00, verbose_name='Tiempo total (ms)')
+    max_ms = models.FloatField(default=0.00, verbose_name='Tiempo máximo (ms)')
+    payload_bytes = models.BigIntegerField(default=0, verbose_name='Tamaño del contenido (bytes)')
+    retries = models.PositiveIntegerField(default=0, verbose_name='Reintentos')
+    buckets = models.JSONField(default=list, verbose_name='Histograma')
+
+    def __str__(self):
+        return f'{self.schema_name} {self.stage} {self.date_joined}'
+
+    def toJSON(self):
+        item = model_to_dict(self)
+        item['date_joined'] = self.date_joined.strftime('%Y-%m-%d')
+        item['stage'] = {'id': self.stage, 'name': self.get_stage_display()}
+        item['outcome'] = {'id': self.outcome, 'name': self.get_outcome_display()}
+        return item
+
+    class Meta:
+        verbose_name = 'Métrica del SRI'
+        verbose_name_plural = 'Métricas del SRI'
+        default_permissions = ()
+        permissions = (
+            ('view_pipeline_metric', 'Can view Métricas del SRI'),
+        )
+        unique_together = ('date_joined', 'schema_name', 'stage', 'outcome')
+
+
 def get_session_module_types(self):
     ids = list(self.groupmodule_set.all().values_list('module__module_type_id', flat=True).distinct())
     return ModuleType.objects.filter(id__in=ids).order_by('name')
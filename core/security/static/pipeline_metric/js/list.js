@@ -0,0 +1,146 @@
+var input_date_range;
+var report = {
+    list: function (all) {
+        var parameters = {
+            'action': 'search_report',
+            'start_date': input_date_range.data('daterangepicker').startDate.format('YYYY-MM-DD'),
+            'end_date': input_date_range.data('daterangepicker').endDate.format('YYYY-MM-DD'),
+        };
+
+        if (all) {
+            parameters['start_date'] = '';
+            parameters['end_date'] = '';
+        }
+
+        $.ajax({
+            url: pathname,
+            type: 'POST',
+            headers: {
+                'X-CSRFToken': csrftoken
+            },
+            data: parameters,
+            dataType: 'json',
+            success: function (request) {
+                if (!request.hasOwnProperty('error')) {
+                    report.chart_stages(request.stages);
+                    report.chart_days(request.stages, request.days);
+                    report.table(request.stages);
+                    return false;
+                }
+                message_error(request.error);
+            },
+            error: function (jqXHR, textStatus, errorThrown) {
+                message_error(errorThrown + ' ' + textStatus);
+            }
+        });
+    },
+    chart_stages: function (stages) {
+        Highcharts.chart('container_stages', {
+            chart: {
+                type: 'column'
+            },
+            exporting: {
+                enabled: false
+            },
+            title: {
+                text: 'Latencia por etapa'
+            },
+            xAxis: {
+                categories: stages.map(function (item) {
+                    return item.name;
+                })
+            },
+            yAxis: {
+                min: 0,
+                title: {
+                    text: 'Milisegundos'
+                }
+            },
+            tooltip: {
+                shared: true,
+                valueSuffix: ' ms'
+            },
+            series: ['p50', 'p95', 'p99'].map(function (percentile) {
+                return {
+                    name: percentile,
+                    data: stages.map(function (item) {
+                        return item[percentile];
+                    })
+                };
+            })
+        });
+    },
+    chart_days: function (stages, days) {
+        var dates = [];
+        $.each(days, function (index, item) {
+            if (dates.indexOf(item.date) === -1) {
+                dates.push(item.date);
+            }
+        });
+        Highcharts.chart('container_days', {
+            exporting: {
+                enabled: false
+            },
+            title: {
+                text: 'p95 diario por etapa'
+            },
+            xAxis: {
+                categories: dates
+            },
+            yAxis: {
+                min: 0,
+                title: {
+                    text: 'Milisegundos'
+                }
+            },
+            tooltip: {
+                valueSuffix: ' ms'
+            },
+            series: stages.map(function (stage) {
+                return {
+                    name: stage.name,
+                    data: dates.map(function (date) {
+                        var item = days.find(function (value) {
+                            return value.date === date && value.stage === stage.stage;
+                        });
+                        return item ? item.p95 : null;
+                    })
+                };
+            })
+        });
+    },
+    table: function (stages) {
+        var tbody = $('#data tbody');
+        tbody.empty();
+        $.each(stages, function (index, item) {
+            tbody.append('<tr><td>' + item.name + '</td><td>' + item.count + '</td><td>' + item.errors + '</td><td>' + item.retries + '</td><td>' + item.average + '</td><td>' + item.max + '</td><td>' + item.payload + '</td><td>' + item.p50 + '</td><td>' + item.p95 + '</td><td>' + item.p99 + '</td></tr>');
+        });
+    }
+};
+
+$(function () {
+
+    input_date_range = $('input[name="date_range"]');
+
+    input_date_range
+        .daterangepicker({
+                language: 'auto',
+                startDate: new Date(),
+                locale: {
+                    format: 'YYYY-MM-DD',
+                },
+                autoApply: true,
+            }
+        )
+        .on('change.daterangepicker apply.daterangepicker', function (ev, picker) {
+            report.list(false);
+        });
+
+    $('.drp-buttons').hide();
+
+    $('.btnSearchAll').on('click', function () {
+        report.list(true);
+    });
+
+    report.list(false);
+});
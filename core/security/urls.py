@@ -5,6 +5,7 @@ from .views.module.views import *
 from .views.group.views import *
 from .views.user_access.views import *
 from .views.database_backups.views import *
+from .views.pipeline_metric.views import *
 
 urlpatterns = [
     # module_type
@@ -29,6 +30,8 @@ urlpatterns = [
     path('database/backups/', DatabaseBackupsListView.as_view(), name='database_backups_list'),
     path('database/backups/add/', DatabaseBackupsCreateView.as_view(), name='database_backups_create'),
     path('database/backups/delete/<int:pk>/', DatabaseBackupsDeleteView.as_view(), name='database_backups_delete'),
+    # pipeline
+    path('pipeline/metrics/', PipelineMetricListView.as_view(), name='pipeline_metric_list'),
     # dashboard
     path('dashboard/update/', DashboardUpdateView.as_view(), name='dashboard_update'),
 ]
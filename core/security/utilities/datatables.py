@@ -0,0 +1,162 @@
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.db.models import Q
+
+from config import settings
+from core.security.utilities.serializers import json_dumps
+from core.security.utilities.streaming import json_streaming_response, to_bytes
+
+
+def get_cursor_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def get_seek(ordering, values, forward):
+    condition = Q()
+    equal = {}
+    for (lookup, descending), value in zip(ordering, values):
+        condition |= Q(**equal, **{f"{lookup}__{'lt' if descending == forward else 'gt'}": value})
+        equal[lookup] = value
+    return condition
+
+
+class DataTable:
+    """Server-side processing of DataTables: sorting and search in the database, keyset pagination on the ordering columns when the table moves one page forward or back, and row counts cached from an estimate."""
+
+    def __init__(self, request, queryset, serializer_class, ordering=('-date_joined', '-id'), search_fields=()):
+        self.params = request.POST
+        self.queryset = queryset
+        self.serializer = serializer_class()
+        self.ordering = [(lookup.lstrip('-'), lookup.startswith('-')) for lookup in ordering]
+        self.search_fields = search_fields
+
+    def get_ordering(self):
+        column = self.params.get('order[0][column]')
+        if column is None:
+            return self.ordering
+        lookup = self.serializer.get_lookup(self.params.get(f'columns[{column}][data]', ''))
+        if lookup is None:
+            return self.ordering
+        descending = self.params.get('order[0][dir]') == 'desc'
+        ordering = [(lookup, descending)]
+        if lookup != 'id':
+            ordering.append(('id', descending))
+        return ordering
+
+    def is_seekable(self, ordering):
+        for lookup, descending in ordering:
+            model = self.queryset.model
+            for name in lookup.split('__'):
+                model_field = model._meta.get_field(name)
+                if model_field.null:
+                    return False
+                model = model_field.related_model
+        return True
+
+    def get_order_by(self, ordering, reverse=False):
+        return [f"{'-' if descending != reverse else ''}{lookup}" for lookup, descending in ordering]
+
+    def filter(self, queryset, term):
+        for word in term.split():
+            condition = Q()
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__icontains': word})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def get_estimate(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def get_count(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        key = f"datatables_{hashlib.md5(f'{connection.schema_name}:{sql}:{params}'.encode()).hexdigest()}"
+        count = cache.get(key)
+        if count is None:
+            count = self.get_estimate(queryset)
+            if count < settings.DATATABLES_EXACT_COUNT:
+                return queryset.count()
+            cache.set(key, count, settings.DATATABLES_COUNT_TIMEOUT)
+        return count
+
+    def get_cursor(self, key, start):
+        try:
+            cursor = json.loads(self.params.get('cursor', 'null'))
+        except ValueError:
+            return None
+        if not isinstance(cursor, dict) or cursor.get('key') != key or not isinstance(cursor.get('start'), int):
+            return None
+        return cursor
+
+    def get_page(self, queryset, ordering, key, start, length):
+        lookups = [lookup for lookup, descending in ordering]
+        if length < 0:
+            return list(self.serializer.get_rows(queryset.order_by(*self.get_order_by(ordering)), *lookups))
+        cursor = self.get_cursor(key, start) if self.is_seekable(ordering) else None
+        if cursor is not None and start == cursor['start'] + length and len(cursor['last']):
+            queryset = queryset.filter(get_seek(ordering, cursor['last'], True)).order_by(*self.get_order_by(ordering))[:length]
+        elif cursor is not None and start == cursor['start'] - length and len(cursor['first']):
+            queryset = queryset.filter(get_seek(ordering, cursor['first'], False)).order_by(*self.get_order_by(ordering, True))[:length]
+            return list(reversed(list(self.serializer.get_rows(queryset, *lookups))))
+        else:
+            queryset = queryset.order_by(*self.get_order_by(ordering))[start:start + length]
+        return list(self.serializer.get_rows(queryset, *lookups))
+
+    def get_filtered(self, term):
+        queryset = self.queryset
+        records_total = self.get_count(queryset)
+        records_filtered = records_total
+        if len(term) and len(self.search_fields):
+            queryset = self.filter(queryset, term)
+            records_filtered = self.get_count(queryset)
+        return queryset, records_total, records_filtered
+
+    def is_streaming(self):
+        return int(self.params.get('length', 10)) < 0
+
+    def get_streaming_response(self):
+        term = self.params.get('search[value]', '').strip()
+        ordering = self.get_ordering()
+        queryset, records_total, records_filtered = self.get_filtered(term)
+        header = {
+            'draw': int(self.params.get('draw', 0)),
+            'recordsTotal': records_total,
+            'recordsFiltered': records_filtered,
+            'cursor': {'key': json.dumps([self.get_order_by(ordering), term]), 'start': 0, 'first': [], 'last': []},
+        }
+        items = self.serializer.iterate(queryset.order_by(*self.get_order_by(ordering)), settings.STREAMING_CHUNK_SIZE)
+        return json_streaming_response(items, prefix=to_bytes(json_dumps(header))[:-1] + b',"data":[', suffix=b']}')
+
+    def get_response(self):
+        start = int(self.params.get('start', 0))
+        length = int(self.params.get('length', 10))
+        term = self.params.get('search[value]', '').strip()
+        ordering = self.get_ordering()
+        key = json.dumps([self.get_order_by(ordering), term])
+        queryset, records_total, records_filtered = self.get_filtered(term)
+        rows = self.get_page(queryset, ordering, key, start, length)
+        cursor = {'key': key, 'start': start, 'first': [], 'last': []}
+        if len(rows):
+            cursor['first'] = [get_cursor_value(value) for value in rows[0][1]]
+            cursor['last'] = [get_cursor_value(value) for value in rows[-1][1]]
+        return {
+            'draw': int(self.params.get('draw', 0)),
+            'recordsTotal': records_total,
+            'recordsFiltered': records_filtered,
+            'data': [item for item, values in rows],
+            'cursor': cursor,
+        }
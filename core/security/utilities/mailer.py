@@ -0,0 +1,172 @@
+import random
+import smtplib
+import threading
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from config import settings
+from core.security.choices import EMAIL_STATUS, METRIC_STAGE, METRIC_OUTCOME
+from core.security.utilities.metrics import metrics_recorder
+
+
+class SMTPSession:
+    """Authenticated SMTP connection that is reopened when the server closes it or it stays idle too long."""
+
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+        self.sent = 0
+        self.last_used = 0.00
+
+    def open(self):
+        self.close()
+        host, port, user, password = self.config
+        self.server = smtplib.SMTP(host, port, timeout=settings.EMAIL_TIMEOUT)
+        self.server.starttls()
+        self.server.login(user, password)
+        self.sent = 0
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+    def is_expired(self):
+        return self.sent >= settings.EMAIL_SESSION_MAX_MESSAGES or time.monotonic() - self.last_used > settings.EMAIL_SESSION_IDLE_TIMEOUT
+
+    def send(self, email_from, email_to, message):
+        if self.server is None or self.is_expired():
+            self.open()
+        try:
+            self.server.sendmail(email_from, email_to, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+            self.open()
+            self.server.sendmail(email_from, email_to, message)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """One SMTP session per mail account and worker thread, shared by every message sent from that thread."""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def get_sessions(self):
+        if not hasattr(self.local, 'sessions'):
+            self.local.sessions = {}
+        return self.local.sessions
+
+    def get_config(self, company=None):
+        if company is None:
+            return settings.EMAIL_HOST, int(settings.EMAIL_PORT), settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD
+        return company.email_host, company.email_port, company.email_host_user, company.email_host_password
+
+    def get_session(self, company=None):
+        sessions = self.get_sessions()
+        key = company.pk if company is not None else None
+        config = self.get_config(company)
+        session = sessions.get(key)
+        if session is None or session.config != config:
+            if session is not None:
+                session.close()
+            session = SMTPSession(config)
+            sessions[key] = session
+        return session
+
+    def send(self, email_from, email_to, message, company=None):
+        self.get_session(company).send(email_from, email_to, message)
+
+    def close_all(self):
+        sessions = self.get_sessions()
+        for session in sessions.values():
+            session.close()
+        sessions.clear()
+
+
+smtp_pool = SMTPPool()
+
+
+class EmailDispatcher:
+    """Sends the pending EmailOutbox rows of the current schema in batches through the pooled SMTP sessions."""
+
+    max_attempts = 8
+    retry_delay = 30
+    max_retry_delay = 3600
+    processing_timeout = 600
+
+    def enqueue(self, message, company=None, reference_type=None, reference_id=None):
+        from core.security.models import EmailOutbox
+        return EmailOutbox.objects.create(company=company, email_from=message['From'], email_to=message['To'], subject=message['Subject'], message=message.as_string(), reference_type=reference_type, reference_id=reference_id)
+
+    def claim(self, limit):
+        from core.security.models import EmailOutbox
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.processing_timeout)
+        with transaction.atomic():
+            queryset = EmailOutbox.objects.select_for_update(skip_locked=True).filter(Q(status=EMAIL_STATUS[0][0], next_attempt__lte=now) | Q(status=EMAIL_STATUS[1][0], datetime_updated__lt=stale))
+            entries = list(queryset.order_by('company_id', 'next_attempt')[:limit])
+            EmailOutbox.objects.filter(id__in=[entry.id for entry in entries]).update(status=EMAIL_STATUS[1][0], datetime_updated=now)
+        return entries
+
+    def get_companies(self, entries):
+        from core.tenant.models import Company
+        return Company.objects.in_bulk({entry.company_id for entry in entries if entry.company_id is not None})
+
+    def dispatch(self, limit=100):
+        response = {'processed': 0, 'sent': 0, 'failed': 0}
+        entries = self.claim(limit)
+        companies = self.get_companies(entries)
+        for entry in entries:
+            self.send(entry, companies.get(entry.company_id))
+            response['processed'] += 1
+            if entry.status == EMAIL_STATUS[2][0]:
+                response['sent'] += 1
+            elif entry.status == EMAIL_STATUS[3][0]:
+                response['failed'] += 1
+        return response
+
+    def flush(self, limit=100):
+        response = {'processed': 0, 'sent': 0, 'failed': 0}
+        while True:
+            result = self.dispatch(limit=limit)
+            for key in response:
+                response[key] += result[key]
+            if result['processed'] < limit:
+                break
+        return response
+
+    def send(self, entry, company=None):
+        start_time = time.perf_counter()
+        with metrics_recorder.retries(entry.attempts + 1):
+            try:
+                smtp_pool.send(entry.email_from, [email.strip() for email in entry.email_to.split(',')], entry.message, company=company)
+                entry.status = EMAIL_STATUS[2][0]
+                entry.error = None
+                outcome = METRIC_OUTCOME[0][0]
+            except Exception as e:
+                self.retry(entry, e)
+                outcome = METRIC_OUTCOME[2][0] if entry.status == EMAIL_STATUS[3][0] else METRIC_OUTCOME[3][0]
+            metrics_recorder.record(METRIC_STAGE[-1][0], time.perf_counter() - start_time, outcome, len(entry.message))
+        entry.save()
+        return entry
+
+    def get_retry_delay(self, entry):
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** max(entry.attempts - 1, 0))
+        return timedelta(seconds=random.uniform(delay / 2, delay))
+
+    def retry(self, entry, error):
+        entry.attempts += 1
+        entry.error = str(error)
+        if isinstance(error, smtplib.SMTPRecipientsRefused) or entry.attempts >= self.max_attempts:
+            entry.status = EMAIL_STATUS[3][0]
+        else:
+            entry.status = EMAIL_STATUS[0][0]
+            entry.next_attempt = timezone.now() + self.get_retry_delay(entry)
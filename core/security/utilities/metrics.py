@@ -0,0 +1,177 @@
+import atexit
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+
+from django.db import connection, transaction
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+
+
+class Histogram:
+    """Latency histogram with fixed buckets in milliseconds plus the counters of payload size and retries."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total_ms = 0.00
+        self.max_ms = 0.00
+        self.payload_bytes = 0
+        self.retries = 0
+
+    def add(self, duration_ms, payload_bytes=0, retries=0):
+        index = 0
+        while index < len(LATENCY_BUCKETS) and duration_ms > LATENCY_BUCKETS[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.payload_bytes += payload_bytes
+        self.retries += retries
+
+    def merge(self, histogram):
+        self.buckets = merge_buckets(self.buckets, histogram.buckets)
+        self.count += histogram.count
+        self.total_ms += histogram.total_ms
+        self.max_ms = max(self.max_ms, histogram.max_ms)
+        self.payload_bytes += histogram.payload_bytes
+        self.retries += histogram.retries
+
+
+def merge_buckets(first, second):
+    size = max(len(first), len(second))
+    first = list(first) + [0] * (size - len(first))
+    return [value + (second[index] if index < len(second) else 0) for index, value in enumerate(first)]
+
+
+def get_percentile(buckets, percent):
+    count = sum(buckets)
+    if count == 0:
+        return 0.00
+    rank = percent / 100 * count
+    accumulated = 0
+    for index, value in enumerate(buckets):
+        accumulated += value
+        if accumulated >= rank:
+            return float(LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1])
+    return float(LATENCY_BUCKETS[-1])
+
+
+class MetricsRecorder:
+    """Keeps the histograms of the worker in memory and adds them to the PipelineMetric rows of the public schema every flush interval."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.last_flush = time.monotonic()
+
+    def get_retries(self):
+        return getattr(self.local, 'retries', 0)
+
+    @contextmanager
+    def retries(self, attempts):
+        previous = self.get_retries()
+        self.local.retries = max(attempts - 1, 0)
+        try:
+            yield
+        finally:
+            self.local.retries = previous
+
+    def record(self, stage, duration, outcome, payload_bytes=0, schema_name=None):
+        key = (date.today(), schema_name or getattr(connection, 'schema_name', settings.DEFAULT_SCHEMA), stage, outcome)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.add(duration * 1000, payload_bytes, self.get_retries())
+            must_flush = time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL
+        if must_flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            histograms = self.histograms
+            self.histograms = {}
+            self.last_flush = time.monotonic()
+        if not histograms:
+            return
+        try:
+            from django_tenants.utils import schema_context
+            from core.security.models import PipelineMetric
+            with schema_context(settings.DEFAULT_SCHEMA):
+                with transaction.atomic():
+                    for (date_joined, schema_name, stage, outcome), histogram in histograms.items():
+                        metric = PipelineMetric.objects.select_for_update().get_or_create(date_joined=date_joined, schema_name=schema_name, stage=stage, outcome=outcome)[0]
+                        metric.count += histogram.count
+                        metric.total_ms += histogram.total_ms
+                        metric.max_ms = max(metric.max_ms, histogram.max_ms)
+                        metric.payload_bytes += histogram.payload_bytes
+                        metric.retries += histogram.retries
+                        metric.buckets = merge_buckets(metric.buckets, histogram.buckets)
+                        metric.save()
+        except Exception:
+            logger.exception('No se pudieron guardar las métricas del pipeline')
+            self.restore(histograms)
+
+    def restore(self, histograms):
+        with self.lock:
+            for key, histogram in histograms.items():
+                current = self.histograms.get(key)
+                if current is None:
+                    self.histograms[key] = histogram
+                else:
+                    current.merge(histogram)
+
+
+metrics_recorder = MetricsRecorder()
+atexit.register(metrics_recorder.flush)
+
+
+def get_outcome(response):
+    if not isinstance(response, dict):
+        return 'error'
+    if 'resp' not in response:
+        if response and all(isinstance(item, dict) and item.get('resp') for item in response.values()):
+            return 'success'
+        return 'error'
+    if response['resp']:
+        return 'success'
+    if response.get('pending'):
+        return 'pending'
+    if response.get('rejected'):
+        return 'rejected'
+    return 'error'
+
+
+def get_payload_bytes(kwargs, response):
+    for source in (kwargs, response if isinstance(response, dict) else {}):
+        xml = source.get('xml')
+        if isinstance(xml, (str, bytes)):
+            return len(xml)
+    return 0
+
+
+def instrument(stage):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start_time = time.perf_counter()
+            response = None
+            try:
+                response = function(*args, **kwargs)
+                return response
+            finally:
+                metrics_recorder.record(stage, time.perf_counter() - start_time, get_outcome(response), get_payload_bytes(kwargs, response))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,196 @@
+import copy
+import json
+
+from django.db import models
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data)
+
+
+class Field:
+    """Value read from one column of the .values_list() row, converted according to the model field it points to."""
+
+    def __init__(self, source=None):
+        self.source = source
+
+    def bind(self, name, model, prefix, columns):
+        field = copy.copy(self)
+        field.name = name
+        field.source = field.source or name
+        field.model_field = field.get_model_field(model, field.source)
+        field.lookup = f'{prefix}{field.source}'
+        field.index = columns.add(field.lookup)
+        return field
+
+    def get_model_field(self, model, source):
+        for name in source.split('__'):
+            model_field = model._meta.get_field(name)
+            model = model_field.related_model
+        return model_field
+
+    def to_value(self, value):
+        if value is None:
+            return None
+        if isinstance(self.model_field, models.DecimalField):
+            return float(value)
+        if isinstance(self.model_field, models.DateTimeField):
+            return value.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(self.model_field, models.DateField):
+            return value.strftime('%Y-%m-%d')
+        if isinstance(self.model_field, models.FileField):
+            return self.model_field.storage.url(value) if value else None
+        return value
+
+    def get(self, row):
+        return self.to_value(row[self.index])
+
+    def get_lookup(self, path):
+        if len(path):
+            return None
+        return self.lookup
+
+
+class Choice(Field):
+    """Choice column emitted as {'id': value, 'name': display}."""
+
+    def bind(self, name, model, prefix, columns):
+        field = super().bind(name, model, prefix, columns)
+        field.choices = {key: str(value) for key, value in field.model_field.flatchoices}
+        return field
+
+    def to_value(self, value):
+        return {'id': value, 'name': self.choices.get(value, value)}
+
+    def get_lookup(self, path):
+        if path == ['id']:
+            return self.lookup
+        return None
+
+
+class Method(Field):
+    """Value computed by a function from several columns of the row."""
+
+    def __init__(self, function, *sources):
+        super().__init__()
+        self.function = function
+        self.sources = sources
+
+    def bind(self, name, model, prefix, columns):
+        field = copy.copy(self)
+        field.name = name
+        field.indexes = [columns.add(f'{prefix}{source}') for source in field.sources]
+        return field
+
+    def get(self, row):
+        return self.function(*[row[index] for index in self.indexes])
+
+    def get_lookup(self, path):
+        return None
+
+
+class Nested(Field):
+    """Forward relation emitted with its own serializer, read from the same row through the joins of .values_list()."""
+
+    def __init__(self, serializer_class, source=None):
+        super().__init__(source)
+        self.serializer_class = serializer_class
+
+    def bind(self, name, model, prefix, columns):
+        field = copy.copy(self)
+        field.name = name
+        field.source = field.source or name
+        field.index = columns.add(f'{prefix}{field.source}')
+        field.fields = field.serializer_class.bind_fields(f'{prefix}{field.source}__', columns)
+        return field
+
+    def get(self, row):
+        if row[self.index] is None:
+            return None
+        return {field.name: field.get(row) for field in self.fields}
+
+    def get_lookup(self, path):
+        for field in self.fields:
+            if len(path) and field.name == path[0]:
+                return field.get_lookup(path[1:])
+        return None
+
+
+class Columns:
+    """Ordered set of the lookups passed to .values_list()."""
+
+    def __init__(self):
+        self.indexes = {}
+
+    def add(self, lookup):
+        if lookup not in self.indexes:
+            self.indexes[lookup] = len(self.indexes)
+        return self.indexes[lookup]
+
+    def get_lookups(self):
+        return list(self.indexes.keys())
+
+
+class Serializer:
+    """Declarative serializer: plain model columns in fields and Field attributes for choices, computed values and forward relations, all read with a single .values_list() query."""
+
+    model = None
+    fields = ()
+    declared_fields = {}
+    compiled = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        declared = {}
+        for base in reversed(cls.__mro__[1:]):
+            declared.update(getattr(base, 'declared_fields', {}))
+        declared.update({name: value for name, value in vars(cls).items() if isinstance(value, Field)})
+        cls.declared_fields = declared
+        cls.compiled = None
+
+    @classmethod
+    def bind_fields(cls, prefix, columns):
+        fields = [Field().bind(name, cls.model, prefix, columns) for name in cls.fields if name not in cls.declared_fields]
+        fields += [field.bind(name, cls.model, prefix, columns) for name, field in cls.declared_fields.items()]
+        return fields
+
+    @classmethod
+    def compile(cls):
+        if cls.compiled is None:
+            columns = Columns()
+            fields = cls.bind_fields('', columns)
+            cls.compiled = (columns.get_lookups(), fields)
+        return cls.compiled
+
+    @classmethod
+    def get_lookup(cls, data):
+        path = data.split('.')
+        for field in cls.compile()[1]:
+            if field.name == path[0]:
+                return field.get_lookup(path[1:])
+        return None
+
+    def get_rows(self, queryset, *extra_lookups, chunk_size=None):
+        lookups, fields = self.compile()
+        rows = queryset.values_list(*lookups, *extra_lookups)
+        if chunk_size is not None:
+            rows = rows.iterator(chunk_size=chunk_size)
+        for row in rows:
+            yield {field.name: field.get(row) for field in fields}, row[len(lookups):]
+
+    def serialize(self, queryset):
+        return [item for item, extra in self.get_rows(queryset)]
+
+    def iterate(self, queryset, chunk_size):
+        for item, extra in self.get_rows(queryset, chunk_size=chunk_size):
+            yield item
+
+    def dumps(self, queryset):
+        return json_dumps(self.serialize(queryset))
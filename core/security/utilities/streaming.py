@@ -0,0 +1,68 @@
+import csv
+
+from django.http import StreamingHttpResponse
+
+from config import settings
+from core.security.utilities.serializers import json_dumps
+
+
+class Echo:
+    """File-like object for csv.writer that returns each written line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def to_bytes(value):
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    return value
+
+
+def get_path(item, path):
+    for name in path.split('.'):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(name)
+    return item
+
+
+def buffered(chunks):
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= settings.STREAMING_BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if len(buffer):
+        yield b''.join(buffer)
+
+
+def iter_json(items, prefix=b'[', suffix=b']'):
+    yield to_bytes(prefix)
+    for index, item in enumerate(items):
+        if index:
+            yield b','
+        yield to_bytes(json_dumps(item))
+    yield to_bytes(suffix)
+
+
+def iter_csv(items, columns):
+    writer = csv.writer(Echo())
+    yield b'\xef\xbb\xbf'
+    yield writer.writerow([header for header, path in columns]).encode('utf-8')
+    for item in items:
+        yield writer.writerow([get_path(item, path) for header, path in columns]).encode('utf-8')
+
+
+def json_streaming_response(items, prefix=b'[', suffix=b']'):
+    return StreamingHttpResponse(buffered(iter_json(items, prefix, suffix)), content_type='application/json')
+
+
+def csv_streaming_response(items, columns, filename):
+    response = StreamingHttpResponse(buffered(iter_csv(items, columns)), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,80 @@
+import json
+
+from django.db import connection
+from django.http import HttpResponse
+from django.views.generic import FormView
+from django_tenants.utils import schema_context
+
+from config import settings
+from core.reports.forms import ReportForm
+from core.security.mixins import GroupPermissionMixin
+from core.security.models import PipelineMetric, METRIC_STAGE
+from core.security.utilities.metrics import merge_buckets, get_percentile
+
+
+class PipelineMetricListView(GroupPermissionMixin, FormView):
+    template_name = 'pipeline_metric/list.html'
+    form_class = ReportForm
+    permission_required = 'view_pipeline_metric'
+
+    def get_metrics(self, start_date, end_date):
+        schema_name = connection.schema_name
+        with schema_context(settings.DEFAULT_SCHEMA):
+            queryset = PipelineMetric.objects.filter()
+            if schema_name != settings.DEFAULT_SCHEMA:
+                queryset = queryset.filter(schema_name=schema_name)
+            if len(start_date) and len(end_date):
+                queryset = queryset.filter(date_joined__range=[start_date, end_date])
+            return list(queryset.order_by('date_joined'))
+
+    def post(self, request, *args, **kwargs):
+        data = {}
+        action = request.POST['action']
+        try:
+            if action == 'search_report':
+                data = {'stages': [], 'days': []}
+                stages = {}
+                days = {}
+                for metric in self.get_metrics(request.POST['start_date'], request.POST['end_date']):
+                    for key, values in ((metric.stage, stages), ((metric.date_joined, metric.stage), days)):
+                        item = values.setdefault(key, {'count': 0, 'errors': 0, 'total_ms': 0.00, 'max_ms': 0.00, 'payload_bytes': 0, 'retries': 0, 'buckets': []})
+                        item['count'] += metric.count
+                        item['errors'] += metric.count if metric.outcome != 'success' else 0
+                        item['total_ms'] += metric.total_ms
+                        item['max_ms'] = max(item['max_ms'], metric.max_ms)
+                        item['payload_bytes'] += metric.payload_bytes
+                        item['retries'] += metric.retries
+                        item['buckets'] = merge_buckets(item['buckets'], metric.buckets)
+                for stage, name in METRIC_STAGE:
+                    item = stages.get(stage)
+                    if item is None:
+                        continue
+                    data['stages'].append({
+                        'stage': stage,
+                        'name': name,
+                        'count': item['count'],
+                        'errors': item['errors'],
+                        'retries': item['retries'],
+                        'average': round(item['total_ms'] / item['count'], 2) if item['count'] else 0.00,
+                        'max': round(item['max_ms'], 2),
+                        'payload': round(item['payload_bytes'] / item['count']) if item['count'] else 0,
+                        'p50': get_percentile(item['buckets'], 50),
+                        'p95': get_percentile(item['buckets'], 95),
+                        'p99': get_percentile(item['buckets'], 99),
+                    })
+                for (date_joined, stage), item in sorted(days.items()):
+                    data['days'].append({
+                        'date': date_joined.strftime('%Y-%m-%d'),
+                        'stage': stage,
+                        'p95': get_percentile(item['buckets'], 95),
+                    })
+            else:
+                data['error'] = 'No ha seleccionado ninguna opción'
+        except Exception as e:
+            data['error'] = str(e)
+        return HttpResponse(json.dumps(data), content_type='application/json')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['title'] = 'Métricas del SRI'
+        return context
@@ -1,4 +1,3 @@
-import base64
 import os
 import random
 import shutil
@@ -14,6 +13,8 @@ from django_tenants.utils import schema_rename, schema_context
 
 from config import settings
 from core.pos.choices import VOUCHER_TYPE, VAT_PERCENTAGE
+from core.pos.utilities.printer import file_cache
+from core.pos.utilities.signer import key_store_cache
 from core.security.fields import CustomImageField, CustomFileField
 from core.tenant.choices import OBLIGATED_ACCOUNTING, ENVIRONMENT_TYPE, RETENTION_AGENT, EMISSION_TYPE
 
@@ -99,11 +100,7 @@ class Company(models.Model):
     def image_base64(self):
         try:
             if self.image:
-                with open(self.image.path, 'rb') as image_file:
-                    base64_data = base64.b64encode(image_file.read()).decode('utf-8')
-                    extension = os.path.splitext(self.image.name)[1]
-                    content_type = f'image/{extension.lstrip(".")}'
-                    return f"data:{content_type};base64,{base64_data}"
+                return file_cache.get_data_uri(self.image.path)
         except:
             pass
         return None
@@ -605,6 +602,7 @@ class Company(models.Model):
 
     def edit(self):
         super(Company, self).save()
+        key_store_cache.drop(self.pk)
 
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
@@ -616,6 +614,7 @@ class Company(models.Model):
             if scheme.schema_name != self.schema_name:
                 self.rename_schema()
         super(Company, self).save()
+        key_store_cache.drop(self.pk)
 
     def delete(self, using=None, keep_parents=False):
         path_dir = f'{settings.BASE_DIR}{settings.MEDIA_URL}{self.scheme.schema_name}'
@@ -3,7 +3,9 @@ import uuid
 from crum import get_current_request
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin, UserManager
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.forms.models import model_to_dict
 from django.utils import timezone
 
@@ -94,3 +96,6 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            GinIndex(OpClass(Upper('names'), name='gin_trgm_ops'), name='user_user_names_trgm'),
+        ]
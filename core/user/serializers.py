@@ -0,0 +1,15 @@
+from config import settings
+from core.security.utilities.serializers import Serializer, Method
+from core.user.models import User
+
+
+def get_image(image):
+    if image:
+        return f'{settings.MEDIA_URL}/{image}'
+    return f'{settings.STATIC_URL}img/default/empty.png'
+
+
+class UserSerializer(Serializer):
+    model = User
+    fields = ('id', 'names', 'username', 'email', 'is_active')
+    image = Method(get_image, 'image')
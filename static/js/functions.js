@@ -380,4 +380,36 @@ function validate_dni_ruc(numero) {
     return true;
 }
 
+function server_side_ajax(parameters) {
+    var cursor = null;
+    return {
+        url: pathname,
+        type: 'POST',
+        headers: {
+            'X-CSRFToken': csrftoken
+        },
+        data: function (data) {
+            $.extend(data, parameters);
+            if (cursor !== null) {
+                data.cursor = JSON.stringify(cursor);
+            }
+        },
+        dataSrc: function (json) {
+            if (json.hasOwnProperty('error')) {
+                message_error(json.error);
+                return [];
+            }
+            cursor = json.cursor;
+            return json.data;
+        }
+    };
+}
 
+function submit_download(parameters) {
+    var form = $('<form>', {'method': 'POST', 'action': pathname, 'css': {'display': 'none'}});
+    form.append($('<input>', {'type': 'hidden', 'name': 'csrfmiddlewaretoken', 'value': csrftoken}));
+    $.each(parameters, function (key, value) {
+        form.append($('<input>', {'type': 'hidden', 'name': key, 'value': value}));
+    });
+    form.appendTo('body').submit().remove();
+}